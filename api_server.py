@@ -2,7 +2,7 @@
 FastAPI server for MiniApp backend API
 Provides endpoints for user authentication, data synchronization, and transaction management
 """
-from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -17,7 +17,11 @@ from datetime import datetime
 from config import Config
 from database.user_repository import UserRepository
 from database.transaction_repository import TransactionRepository
-from database.rate_repository import RateRepository
+from database.rate_repository import RateRepository, DEFAULT_RATE
+from utils.money import from_minor
+from services.payment_callbacks import (
+    payment_callbacks, InvalidCallback, InvalidSignature, CallbackQueueFull
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # transaction history paging
 )
 
 
@@ -239,7 +244,7 @@ async def sync_user(auth_request: AuthRequest):
             is_premium=bool(user_dict.get('is_premium', 0)),
             vip_level=user_dict.get('vip_level', 0),
             total_transactions=user_dict.get('total_transactions', 0),
-            total_amount=float(user_dict.get('total_amount', 0)),
+            total_amount=float(from_minor(user_dict.get('total_amount_minor', 0))),
             created_at=user_dict.get('created_at', ''),
             last_active_at=user_dict.get('last_active_at', '')
         )
@@ -274,7 +279,7 @@ async def get_current_user(user_data: dict = Depends(verify_auth)):
             is_premium=bool(user_dict.get('is_premium', 0)),
             vip_level=user_dict.get('vip_level', 0),
             total_transactions=user_dict.get('total_transactions', 0),
-            total_amount=float(user_dict.get('total_amount', 0)),
+            total_amount=float(from_minor(user_dict.get('total_amount_minor', 0))),
             created_at=user_dict.get('created_at', ''),
             last_active_at=user_dict.get('last_active_at', '')
         )
@@ -303,7 +308,7 @@ async def get_user_statistics(user_data: dict = Depends(verify_auth)):
         total_trans = TransactionRepository.get_transaction_count(user_id)
         total_receive = TransactionRepository.get_transaction_count(user_id, "receive")
         total_pay = TransactionRepository.get_transaction_count(user_id, "pay")
-        total_amount = float(user_dict.get('total_amount', 0))
+        total_amount = float(from_minor(user_dict.get('total_amount_minor', 0)))
         vip_level = user_dict.get('vip_level', 0)
         
         return StatisticsResponse(
@@ -323,27 +328,47 @@ async def get_user_statistics(user_data: dict = Depends(verify_auth)):
 
 @app.get("/api/transactions", response_model=List[TransactionResponse])
 async def get_transactions(
+    response: Response,
     limit: int = 10,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     transaction_type: Optional[str] = None,
     status: Optional[str] = None,
+    offset: Optional[int] = None,
     user_data: dict = Depends(verify_auth)
 ):
     """
-    Get user's transaction history.
+    Get user's transaction history, newest first.
+    
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to get the
+    next page; the header is absent on the last page. The former ``offset``
+    parameter is rejected rather than ignored, so clients still paging by
+    offset fail instead of getting the first page again and again.
     """
     try:
         user_id = user_data.get('id')
         if not user_id:
             raise HTTPException(status_code=400, detail="Invalid user data")
         
-        transactions = TransactionRepository.get_user_transactions(
-            user_id=user_id,
-            limit=limit,
-            offset=offset,
-            transaction_type=transaction_type,
-            status=status
-        )
+        if offset is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="offset is no longer supported, page with the X-Next-Cursor header as cursor"
+            )
+        
+        try:
+            page = await TransactionRepository.get_user_transactions_page_async(
+                user_id=user_id,
+                limit=max(1, min(limit, 100)),
+                cursor=cursor,
+                transaction_type=transaction_type,
+                status=status
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        transactions = page['transactions']
+        if page['next_cursor']:
+            response.headers["X-Next-Cursor"] = page['next_cursor']
         
         result = []
         for t in transactions:
@@ -352,9 +377,9 @@ async def get_transactions(
                 order_id=t['order_id'],
                 transaction_type=t['transaction_type'],
                 payment_channel=t['payment_channel'],
-                amount=float(t['amount']),
-                fee=float(t['fee']),
-                actual_amount=float(t['actual_amount']),
+                amount=float(from_minor(t['amount_minor'], t['currency'])),
+                fee=float(from_minor(t['fee_minor'], t['currency'])),
+                actual_amount=float(from_minor(t['actual_amount_minor'], t['currency'])),
                 currency=t['currency'],
                 status=t['status'],
                 description=t.get('description'),
@@ -386,28 +411,74 @@ async def get_rates(user_data: dict = Depends(verify_auth)):
             if user_dict:
                 vip_level = user_dict.get('vip_level', 0)
         
-        # Get rates for user's VIP level
-        rates = RateRepository.get_rate_by_channel_and_vip('alipay', vip_level)
-        
-        return {
-            "alipay": {
-                "fee_rate": rates.get('fee_rate', 0) if rates else 0,
-                "min_amount": rates.get('min_amount', 0) if rates else 0,
-                "max_amount": rates.get('max_amount', 0) if rates else 0,
-            },
-            "wechat": {
-                "fee_rate": rates.get('fee_rate', 0) if rates else 0,
-                "min_amount": rates.get('min_amount', 0) if rates else 0,
-                "max_amount": rates.get('max_amount', 0) if rates else 0,
-            },
-            "vip_level": vip_level
-        }
+        # Get each channel's rates for the user's VIP level
+        rates = RateRepository.get_channel_rates(vip_level)
+        
+        result = {}
+        for channel in ("alipay", "wechat"):
+            rate = rates.get(channel)
+            result[channel] = {
+                "fee_rate": rate['rate_percentage'] if rate else DEFAULT_RATE,
+                "min_amount": float(rate['min_amount']) if rate else 0,
+                "max_amount": float(rate['max_amount']) if rate else 0,
+            }
+        result["vip_level"] = vip_level
+        
+        return result
         
     except Exception as e:
         logger.error(f"Error getting rates: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.post("/api/payments/callback")
+async def payment_callback(
+    request: Request,
+    x_signature: Optional[str] = Header(None, alias="X-Signature"),
+    x_timestamp: Optional[str] = Header(None, alias="X-Timestamp")
+):
+    """
+    Payment gateway status notification.
+
+    Signed with HMAC-SHA256 over "<X-Timestamp>.<body>". Idempotent per
+    (order_id, status): a retried callback is acknowledged as "duplicate".
+    A status the order cannot move to yet answers 409 so the gateway retries.
+    Answers 503 with Retry-After when the apply queue is full.
+    """
+    if not Config.PAYMENT_CALLBACK_SECRET:
+        raise HTTPException(status_code=503, detail="Payment callbacks are not configured")
+
+    body = await request.body()
+    try:
+        result = await payment_callbacks.ingest(body, x_timestamp, x_signature)
+    except InvalidSignature as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except InvalidCallback as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CallbackQueueFull:
+        raise HTTPException(status_code=503, detail="Busy, retry later", headers={"Retry-After": "1"})
+
+    if result == "unknown_order":
+        raise HTTPException(status_code=404, detail="Unknown order")
+    if result == "rejected":
+        raise HTTPException(status_code=409, detail="Status transition not allowed, retry later")
+    if result == "error":
+        raise HTTPException(status_code=500, detail="Could not apply callback")
+    return {"result": result}
+
+
+@app.on_event("startup")
+async def on_startup():
+    """Start background workers"""
+    payment_callbacks.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Stop background workers"""
+    await payment_callbacks.stop()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
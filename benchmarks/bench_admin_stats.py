@@ -0,0 +1,114 @@
+"""
+Admin statistics benchmark: source-table scans vs pre-aggregated rollups.
+
+Seeds ``--rows`` transactions (inserted through the rollup triggers, so the
+insert time includes maintenance) and ``--users`` users, then times the
+original time-statistics queries against ``StatsRepository.get_time_stats``.
+
+Usage:
+    python -m benchmarks.bench_admin_stats --rows 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_stats.db")
+
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database.stats_repository import StatsRepository  # noqa: E402
+
+
+def _timestamp(rng: random.Random, now: datetime) -> str:
+    return (now - timedelta(minutes=rng.randrange(365 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def seed(rows: int, users: int) -> float:
+    """Insert users and transactions spread over a year; returns insert seconds"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db.executemany(
+        "INSERT INTO users (user_id, vip_level, created_at) VALUES (?, ?, ?)",
+        ((user_id, rng.randrange(4), _timestamp(rng, now)) for user_id in range(1, users + 1))
+    )
+    start = time.perf_counter()
+    db.executemany("""
+        INSERT INTO transactions
+        (user_id, order_id, transaction_type, payment_channel, amount, fee,
+         actual_amount, status, created_at)
+        VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)
+    """, (
+        (rng.randint(1, users), f"B{i}", rng.choice(("receive", "pay")),
+         rng.choice(("alipay", "wechat")), amount, amount,
+         rng.choice(("paid", "paid", "pending", "failed")), _timestamp(rng, now))
+        for i, amount in ((i, round(rng.uniform(1, 5000), 2)) for i in range(rows))
+    ))
+    db.commit()
+    return time.perf_counter() - start
+
+
+async def scan_time_stats() -> dict:
+    """The original handle_admin_stats_time queries"""
+    stats = {}
+    for key, condition in (
+        ('today', "DATE(created_at) = DATE('now')"),
+        ('yesterday', "DATE(created_at) = DATE('now', '-1 day')"),
+        ('week', "DATE(created_at) >= DATE('now', '-7 days')"),
+        ('month', "DATE(created_at) >= DATE('now', 'start of month')"),
+    ):
+        row = await db.fetch_one(f"""
+            SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total
+            FROM transactions
+            WHERE {condition} AND status = 'paid'
+        """)
+        stats[key] = {'count': row['count'], 'total': float(row['total'])}
+    for key, condition in (
+        ('today_users', "DATE(created_at) = DATE('now')"),
+        ('week_users', "DATE(created_at) >= DATE('now', '-7 days')"),
+        ('month_users', "DATE(created_at) >= DATE('now', 'start of month')"),
+    ):
+        stats[key] = await db.fetch_value(f"SELECT COUNT(*) FROM users WHERE {condition}")
+    return stats
+
+
+async def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+async def run(args):
+    init_database()
+    insert_seconds = seed(args.rows, args.users)
+    print(f"inserted {args.rows} transactions in {insert_seconds:.2f} s (triggers included)")
+
+    for name, fn in (("scan", scan_time_stats), ("rollups", StatsRepository.get_time_stats)):
+        samples, result = await timed(fn, args.repeat)
+        print(f"{name:>8}: median {statistics.median(samples) * 1000:8.2f} ms  "
+              f"month {result['month']['count']} / {result['month']['total']:.2f}  "
+              f"week users {result['week_users']}")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+AI service latency/throughput benchmark against local fake providers.
+
+Fires N concurrent chat requests at AIService backed by a primary fake
+provider with a slow tail and a fallback fake provider, with and without
+hedging, and reports p50/p99 latency and throughput. The streaming runs
+report the latency of the first chunk instead, read by a consumer that
+spends ``--consumer-delay`` seconds on every chunk (like a Telegram edit).
+
+Usage:
+    python -m benchmarks.bench_ai_service --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.ai_service import AIService, FakeAIProvider  # noqa: E402
+
+
+async def run(args, hedge_delay: float, stream: bool = False) -> tuple:
+    primary = FakeAIProvider(latency=args.latency, jitter=args.latency / 2,
+                             tail_rate=args.tail_rate, tail_latency=args.tail_latency, seed=1)
+    fallback = FakeAIProvider(latency=args.latency * 1.5, jitter=args.latency / 2, seed=2)
+    service = AIService(
+        providers=[("primary", primary), ("fallback", fallback)],
+        max_concurrency=args.concurrency,
+        request_timeout=args.tail_latency * 2,
+        hedge_delay=hedge_delay
+    )
+
+    latencies = []
+
+    async def one(i: int):
+        start = time.perf_counter()
+        if not stream:
+            await service.generate_response(f"question {i}", None, "zh-CN")
+            latencies.append(time.perf_counter() - start)
+            return
+        first = None
+        async for _ in service.stream_response(f"question {i}", None, "zh-CN"):
+            if first is None:
+                first = time.perf_counter() - start
+            await asyncio.sleep(args.consumer_delay)
+        latencies.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed, primary.calls, fallback.calls
+
+
+def report(name: str, latencies: list, elapsed: float, primary_calls: int, fallback_calls: int):
+    ordered = sorted(latencies)
+    p99 = ordered[max(0, int(round(len(ordered) * 0.99)) - 1)]
+    print(
+        f"{name:<10} p50={statistics.median(ordered) * 1000:8.1f} ms  p99={p99 * 1000:8.1f} ms  "
+        f"throughput={len(ordered) / elapsed:7.1f} req/s  calls={primary_calls}+{fallback_calls}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-latency", type=float, default=3.0)
+    parser.add_argument("--hedge-delay", type=float, default=0.5)
+    parser.add_argument("--consumer-delay", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report("no-hedge", *asyncio.run(run(args, hedge_delay=0)))
+    report("hedged", *asyncio.run(run(args, hedge_delay=args.hedge_delay)))
+    print("streaming, latency of the first chunk:")
+    report("no-hedge", *asyncio.run(run(args, hedge_delay=0, stream=True)))
+    report("hedged", *asyncio.run(run(args, hedge_delay=args.hedge_delay, stream=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Conversation memory benchmark: unbounded per-user dict vs ConversationStore.
+
+Simulates a week of chats with a fake clock; every hour ``--users-per-hour``
+new users each exchange a few messages. Prints memory after every day.
+
+Usage:
+    python -m benchmarks.bench_conversation_store --users-per-hour 2000
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import services.conversation_store as conversation_module  # noqa: E402
+from services.conversation_store import ConversationStore, _message_bytes  # noqa: E402
+
+
+class FakeClock:
+    """Stands in for the ``time`` module inside the store"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+async def run(args):
+    rng = random.Random(42)
+    clock = FakeClock()
+    conversation_module.time = clock
+
+    store = ConversationStore(
+        max_users=args.max_users,
+        max_bytes=args.max_mb * 1024 * 1024,
+        idle_ttl=args.idle_ttl,
+        token_budget=args.token_budget
+    )
+    unbounded = {}
+    unbounded_bytes = 0
+    next_user = 0
+
+    print(f"{'day':>4} {'dict users':>11} {'dict MB':>8} {'store users':>12} {'store MB':>9}")
+    for hour in range(7 * 24):
+        for _ in range(args.users_per_hour):
+            user_id = next_user
+            next_user += 1
+            clock.now = hour * 3600 + rng.uniform(0, 3600)
+            for _ in range(rng.randint(1, args.max_turns)):
+                for role in ("user", "assistant"):
+                    content = "问" * rng.randint(5, 60) if role == "user" else "答" * rng.randint(50, 400)
+                    await store.append(user_id, role, content)
+                    # The original handler kept the last 10 messages forever
+                    messages = unbounded.setdefault(user_id, [])
+                    messages.append(content)
+                    unbounded_bytes += _message_bytes(content)
+                    if len(messages) > 10:
+                        unbounded_bytes -= _message_bytes(messages.pop(0))
+        if (hour + 1) % 24 == 0:
+            print(f"{(hour + 1) // 24:>4} {len(unbounded):>11} {unbounded_bytes / 2**20:>8.1f} "
+                  f"{len(store):>12} {store.memory_bytes / 2**20:>9.1f}")
+
+    print(f"store stats: {store.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users-per-hour", type=int, default=2000)
+    parser.add_argument("--max-turns", type=int, default=8)
+    parser.add_argument("--max-users", type=int, default=10000)
+    parser.add_argument("--max-mb", type=int, default=16)
+    parser.add_argument("--idle-ttl", type=float, default=3600)
+    parser.add_argument("--token-budget", type=int, default=1500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Handler latency benchmark: shared sync connection vs pooled async database layer.
+
+Simulates N concurrent callback updates. A share of them open the wallet
+screen (load every paid transaction of a user), the rest are cheap menu
+callbacks that never touch the database. Latency is measured from the moment
+all updates are dispatched, so the menu callbacks show how long the event
+loop was stalled behind database work.
+
+Usage:
+    python -m benchmarks.bench_db_latency --updates 500 --users 200 --rows 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import Database  # noqa: E402
+
+WALLET_QUERY = """
+    SELECT transaction_type, actual_amount
+    FROM transactions
+    WHERE user_id = ? AND status = 'paid'
+"""
+
+
+def seed(database: Database, users: int, rows: int):
+    """Create a transactions table with ``rows`` rows spread over ``users`` users"""
+    conn = database.get_connection()
+    conn.execute("""
+        CREATE TABLE transactions (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id BIGINT NOT NULL,
+            transaction_type VARCHAR(20) NOT NULL,
+            actual_amount DECIMAL(15,2) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX idx_transactions_user_status ON transactions(user_id, status)")
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO transactions (user_id, transaction_type, actual_amount, status) VALUES (?, ?, ?, ?)",
+        (
+            (rng.randrange(users), rng.choice(("receive", "pay")),
+             round(rng.uniform(1, 5000), 2), rng.choice(("paid", "paid", "pending")))
+            for _ in range(rows)
+        )
+    )
+    conn.commit()
+
+
+def balance_of(rows) -> float:
+    balance = 0.0
+    for row in rows:
+        if row["transaction_type"] == "receive":
+            balance += float(row["actual_amount"])
+        else:
+            balance -= float(row["actual_amount"])
+    return balance
+
+
+async def handler_sync(database: Database, user_id: int) -> float:
+    rows = database.execute(WALLET_QUERY, (user_id,)).fetchall()
+    await asyncio.sleep(0)
+    return balance_of(rows)
+
+
+async def handler_async(database: Database, user_id: int) -> float:
+    rows = await database.fetch_all(WALLET_QUERY, (user_id,))
+    await asyncio.sleep(0)
+    return balance_of(rows)
+
+
+async def handler_menu(database: Database, user_id: int) -> float:
+    await asyncio.sleep(0)
+    return 0.0
+
+
+async def run(database: Database, handler, updates: int, users: int, wallet_ratio: float) -> dict:
+    latencies = {"wallet": [], "menu": []}
+    start = time.perf_counter()
+
+    async def one(kind: str, user_id: int):
+        await (handler if kind == "wallet" else handler_menu)(database, user_id)
+        latencies[kind].append(time.perf_counter() - start)
+
+    rng = random.Random(7)
+    await asyncio.gather(*(
+        one("wallet" if rng.random() < wallet_ratio else "menu", rng.randrange(users))
+        for _ in range(updates)
+    ))
+    return latencies
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * pct)) - 1)] * 1000
+
+
+def report(name: str, latencies: dict):
+    combined = latencies["wallet"] + latencies["menu"]
+    for kind, values in (("all", combined), ("wallet", latencies["wallet"]), ("menu", latencies["menu"])):
+        if not values:
+            continue
+        print(
+            f"{name:<6} {kind:<7} n={len(values):<4} "
+            f"p50={statistics.median(values) * 1000:8.1f} ms  p99={percentile(values, 0.99):8.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--wallet-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, "bench.db"), read_pool_size=args.pool)
+        seed(database, args.users, args.rows)
+
+        for name, handler in (("sync", handler_sync), ("async", handler_async)):
+            report(name, asyncio.run(run(database, handler, args.updates, args.users, args.wallet_ratio)))
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+FSM storage benchmark: abandoned flows are reclaimed, SQLite writes are batched.
+
+``--users`` users each start a payment flow (state plus channel, type, amount
+and VIP level) and abandon it, while as many other users only send messages
+(the dispatcher reads their state). Memory held by the flows is measured
+with tracemalloc for the old module dict, aiogram's MemoryStorage and
+``TTLMemoryStorage``, and the rows left in ``fsm_states`` for
+``SQLiteStorage``, right after the flows and again once ``--ttl`` has passed
+and another flow was written. The TTL storages must end at 0 flows, the
+capacity-bound one must never hold more than ``--capacity``.
+
+Then the same flows run concurrently against ``SQLiteStorage`` once with a
+write transaction per FSM write and once with the write buffer.
+
+Usage:
+    python -m benchmarks.bench_fsm_storage --users 20000 --ttl 10
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_fsm.db")
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from database.db import db  # noqa: E402
+from database.fsm_repository import FSMRepository  # noqa: E402
+from database.models import init_database  # noqa: E402
+from handlers.payment_handlers import PaymentFlow  # noqa: E402
+from services import fsm_storage  # noqa: E402
+from services.fsm_storage import SQLiteStorage, TTLMemoryStorage  # noqa: E402
+
+BOT_ID = 123456
+
+
+def key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+
+
+async def abandon_flow(storage, user_id: int):
+    """What the payment handlers write before the user walks away"""
+    k = key(user_id)
+    await storage.get_state(k)
+    await storage.set_state(k, PaymentFlow.choosing_type)
+    await storage.set_data(k, {"channel": "alipay"})
+    await storage.update_data(k, {"type": "receive"})
+    await storage.update_data(k, {"amount": 100.0 + user_id % 500, "vip_level": user_id % 4})
+    await storage.set_state(k, PaymentFlow.confirming)
+
+
+async def browse(storage, user_id: int):
+    """A message from a user outside any flow"""
+    await storage.get_state(key(user_id))
+
+
+def abandon_dict(states: dict, user_id: int):
+    """The old ``_payment_states`` handlers"""
+    states[user_id] = {"channel": "alipay"}
+    states[user_id]["type"] = "receive"
+    states[user_id]["amount"] = 100.0 + user_id % 500
+    states[user_id]["calc_result"] = {"vip_level": user_id % 4, "fee": 0.6, "actual_amount": 99.4}
+
+
+def measure() -> float:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / 1024 / 1024
+
+
+async def memory_case(name: str, storage, args) -> tuple:
+    """Flows held right after abandoning, and after the TTL"""
+    base = measure()
+    peak = 0
+    for user_id in range(1, args.users + 1):
+        await abandon_flow(storage, user_id)
+        await browse(storage, args.users + user_id)
+        peak = max(peak, len(getattr(storage, "_records", getattr(storage, "storage", ()))))
+    after = measure() - base
+    held = len(getattr(storage, "_records", getattr(storage, "storage", ())))
+    await asyncio.sleep(args.ttl + 0.1)
+    # Expired keys are reclaimed as other flows are written
+    await abandon_flow(storage, 10 * args.users)
+    await storage.set_state(key(10 * args.users), None)
+    await storage.set_data(key(10 * args.users), {})
+    later = measure() - base
+    left = len(getattr(storage, "_records", getattr(storage, "storage", ())))
+    print(f"{name:>34}: {held:7d} flows / {after:7.1f} MiB after abandoning "
+          f"(peak {peak}), {left:7d} flows / {later:7.1f} MiB after the TTL")
+    return left, peak
+
+
+async def memory_cases(args) -> bool:
+    tracemalloc.start()
+    base = measure()
+    states: dict = {}
+    for user_id in range(1, args.users + 1):
+        abandon_dict(states, user_id)
+    held = measure() - base
+    await asyncio.sleep(args.ttl + 0.1)
+    print(f"{'module dict (old)':>34}: {len(states):7d} flows / {held:7.1f} MiB after abandoning, "
+          f"{len(states):7d} flows / {measure() - base:7.1f} MiB after the TTL")
+    del states
+
+    await memory_case("aiogram MemoryStorage", MemoryStorage(), args)
+    ttl_left, _ = await memory_case("TTLMemoryStorage", TTLMemoryStorage(ttl=args.ttl), args)
+    _, bounded_peak = await memory_case(
+        f"TTLMemoryStorage capacity {args.capacity}",
+        TTLMemoryStorage(ttl=args.ttl, capacity=args.capacity), args
+    )
+    tracemalloc.stop()
+
+    fsm_storage.PURGE_INTERVAL = args.ttl
+    storage = SQLiteStorage(ttl=args.ttl, cache_size=0)
+    for user_id in range(1, args.users + 1):
+        await abandon_flow(storage, user_id)
+        await browse(storage, args.users + user_id)
+    await storage.flush()
+    held = await FSMRepository.count()
+    await asyncio.sleep(args.ttl + 0.1)
+    await abandon_flow(storage, 10 * args.users)
+    await storage.close()
+    left = await FSMRepository.count()
+    print(f"{'SQLiteStorage':>34}: {held:7d} rows after abandoning, "
+          f"{left:7d} rows after the TTL (purged {storage.stats['purged']})")
+
+    ok = ttl_left == 0 and bounded_peak <= args.capacity and left == 1
+    print(f"reclaimed: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+async def write_case(name: str, storage: SQLiteStorage, users: range, per_write: bool) -> float:
+    async def flow(user_id: int):
+        k = key(user_id)
+        await storage.set_state(k, PaymentFlow.choosing_type)
+        for data in ({"channel": "wechat"}, {"channel": "wechat", "type": "pay"}):
+            await storage.set_data(k, data)
+            if per_write:
+                await storage.flush()
+        await storage.update_data(k, {"amount": 88.0, "vip_level": 1})
+        if per_write:
+            await storage.flush()
+        await storage.set_state(k, None)
+        await storage.set_data(k, {})
+        if per_write:
+            await storage.flush()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(flow(user_id) for user_id in users))
+    await storage.close()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>34}: {len(users) / elapsed:8.0f} flows/s, "
+          f"{storage.stats['flushes']} transactions for {storage.stats['rows_written']} rows")
+    return elapsed
+
+
+async def write_cases(args):
+    users = args.users // 10
+    await write_case("SQLite, transaction per write", SQLiteStorage(ttl=60),
+                     range(10**7, 10**7 + users), per_write=True)
+    await write_case("SQLite, batched writes", SQLiteStorage(ttl=60),
+                     range(2 * 10**7, 2 * 10**7 + users), per_write=False)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--ttl", type=float, default=10.0)
+    parser.add_argument("--capacity", type=int, default=10000)
+    args = parser.parse_args()
+
+    init_database()
+    ok = asyncio.run(memory_cases(args))
+    asyncio.run(write_cases(args))
+    db.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Payment callback ingestion benchmark: one commit per callback vs group commit.
+
+Seeds ``--orders`` pending orders per run and has a local fake gateway fire
+signed "paid" callbacks for all of them (plus ``--duplicates`` retries)
+through ``PaymentCallbackProcessor.ingest`` with ``--concurrency`` requests
+in flight. A full queue is retried after a short pause, like a gateway
+honouring 503 + Retry-After. Afterwards every order must be paid exactly
+once and the wallet ledger must match the transactions.
+
+Usage:
+    python -m benchmarks.bench_payment_callbacks --orders 5000 --concurrency 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_callbacks.db")
+os.environ["PAYMENT_CALLBACK_SECRET"] = "bench-secret"
+
+from config import Config  # noqa: E402
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database.wallet_repository import WalletRepository  # noqa: E402
+from services.payment_callbacks import (  # noqa: E402
+    CallbackQueueFull, PaymentCallbackProcessor, sign
+)
+from utils.money import to_minor  # noqa: E402
+
+USERS = 500
+# Pause before retrying a refused callback
+RETRY_DELAY = 0.01
+
+
+def seed_users():
+    """Insert the order owners"""
+    db.executemany("INSERT INTO users (user_id) VALUES (?)", ((i,) for i in range(1, USERS + 1)))
+    db.commit()
+
+
+def seed_orders(prefix: str, orders: int, rng: random.Random) -> list:
+    """Insert pending orders; returns their order ids"""
+    rows = []
+    for i in range(orders):
+        amount = round(rng.uniform(1, 5000), 2)
+        fee = round(amount * 0.006, 2)
+        rows.append((rng.randint(1, USERS), f"{prefix}{i}", rng.choice(("receive", "pay")),
+                     amount, fee, amount - fee, to_minor(amount), to_minor(fee),
+                     to_minor(amount) - to_minor(fee)))
+    db.executemany("""
+        INSERT INTO transactions
+        (user_id, order_id, transaction_type, payment_channel, amount, fee, actual_amount,
+         amount_minor, fee_minor, actual_amount_minor, status)
+        VALUES (?, ?, ?, 'alipay', ?, ?, ?, ?, ?, ?, 'pending')
+    """, rows)
+    db.commit()
+    return [row[1] for row in rows]
+
+
+async def fire(processor: PaymentCallbackProcessor, order_ids: list, duplicates: float,
+               concurrency: int, rng: random.Random) -> dict:
+    """Fake gateway: send signed callbacks concurrently and collect outcomes"""
+    callbacks = order_ids + rng.sample(order_ids, int(len(order_ids) * duplicates))
+    rng.shuffle(callbacks)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, results = [], {}
+    retries = 0
+
+    async def send(order_id: str):
+        nonlocal retries
+        body = json.dumps({"order_id": order_id, "status": "paid"}).encode()
+        async with semaphore:
+            while True:
+                timestamp = str(int(time.time()))
+                signature = sign(body, timestamp, Config.PAYMENT_CALLBACK_SECRET)
+                start = time.perf_counter()
+                try:
+                    result = await processor.ingest(body, timestamp, signature)
+                except CallbackQueueFull:
+                    retries += 1
+                    await asyncio.sleep(RETRY_DELAY)
+                    continue
+                latencies.append(time.perf_counter() - start)
+                results[result] = results.get(result, 0) + 1
+                return
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(order_id) for order_id in callbacks))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "callbacks": len(callbacks),
+        "elapsed": elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "results": results,
+        "retries": retries,
+    }
+
+
+async def run(args):
+    init_database()
+    seed_users()
+    rng = random.Random(42)
+
+    modes = (("per-callback", 1), ("grouped", args.batch))
+    for name, batch_size in modes:
+        order_ids = seed_orders(f"{name[0].upper()}", args.orders, rng)
+        processor = PaymentCallbackProcessor(batch_size=batch_size,
+                                             max_delay=Config.PAYMENT_CALLBACK_MAX_DELAY,
+                                             queue_size=args.queue)
+        processor.start()
+        outcome = await fire(processor, order_ids, args.duplicates, args.concurrency, rng)
+        await processor.stop()
+
+        paid = (await db.fetch_one(
+            "SELECT COUNT(*) AS n FROM transactions WHERE order_id LIKE ? AND status = 'paid'",
+            (f"{name[0].upper()}%",)
+        ))['n']
+        print(f"{name:>13} (batch {batch_size:>4}): "
+              f"{outcome['callbacks'] / outcome['elapsed']:9.0f} callbacks/s, "
+              f"p50 {outcome['p50_ms']:7.2f} ms, p99 {outcome['p99_ms']:7.2f} ms, "
+              f"{processor.stats['batches']} commits, {outcome['retries']} retried after 503")
+        print(f"{'':>13} results {outcome['results']}, paid {paid}/{len(order_ids)}")
+
+    mismatches = await WalletRepository.find_mismatches()
+    print(f"wallet ledger mismatches: {len(mismatches)}")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--batch", type=int, default=Config.PAYMENT_CALLBACK_BATCH)
+    parser.add_argument("--queue", type=int, default=Config.PAYMENT_CALLBACK_QUEUE)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Prompt size benchmark: full knowledge base + last 10 raw messages vs the
+token-budgeted prompt (cached system prompt, recent turns, rolling summary).
+
+Usage:
+    python -m benchmarks.bench_prompt_size --turns 30
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from services.ai_service import AIService  # noqa: E402
+from services.conversation_store import ConversationStore  # noqa: E402
+from utils.token_utils import estimate_message_tokens  # noqa: E402
+
+
+def old_prompt_tokens(service: AIService, question: str, history: list) -> int:
+    """Size of the prompt built by the original _generate_with_openai"""
+    system = service.KNOWLEDGE_BASE + "\n\n" + service._get_language_instruction("zh-CN")
+    tokens = estimate_message_tokens(system) + estimate_message_tokens(question)
+    return tokens + sum(estimate_message_tokens(msg["content"]) for msg in history[-10:])
+
+
+def new_prompt_tokens(service: AIService, question: str, history: list) -> int:
+    """Size of the budgeted OpenAI prompt"""
+    messages = service._build_openai_messages(question, history, "zh-CN")
+    return sum(estimate_message_tokens(msg["content"]) for msg in messages)
+
+
+async def run(args):
+    rng = random.Random(42)
+    service = AIService(providers=[])
+    store = ConversationStore(token_budget=Config.AI_HISTORY_TOKEN_BUDGET)
+    raw_history = []
+
+    old_total = new_total = 0
+    print(f"{'turn':>5} {'old tokens':>11} {'new tokens':>11}")
+    for turn in range(1, args.turns + 1):
+        question = "请问" + "充值提现费率" * rng.randint(2, 10)
+        answer = "您好，" + "关于这个问题的详细说明。" * rng.randint(10, 40)
+
+        history = await store.get_history(1)
+        old = old_prompt_tokens(service, question, raw_history)
+        new = new_prompt_tokens(service, question, history)
+        old_total += old
+        new_total += new
+        if turn % 5 == 0 or turn == 1:
+            print(f"{turn:>5} {old:>11} {new:>11}")
+
+        raw_history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        await store.append(1, "user", question)
+        await store.append(1, "assistant", answer)
+
+    print(f"total: old {old_total} tokens, new {new_total} tokens "
+          f"({100 * (1 - new_total / old_total):.0f}% smaller)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=30)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Verification question benchmark: a join raid drawing questions.
+
+Fills a database with ``--global-questions`` global and ``--group-questions``
+questions for each of ``--groups`` groups (plus answered verification
+records for pass rates), then draws a question for each of ``--joins``
+joins in one group. The former ``ORDER BY RANDOM()`` queries are compared
+against the in-memory question pool. Draws from each weighting are also
+checked against their expected distribution (total variation distance).
+
+Usage:
+    python -m benchmarks.bench_question_pool --joins 500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_questions.db")
+
+from config import Config  # noqa: E402
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database.verification_repository import (  # noqa: E402
+    QUESTION_WEIGHTINGS, QuestionPool, VerificationRepository
+)
+from services.verification_service import VerificationService  # noqa: E402
+
+DIFFICULTIES = ("easy", "easy", "easy", "medium", "medium", "hard")
+
+
+def populate(args):
+    rng = random.Random(42)
+    rows = []
+    for group_id in [None] * args.global_questions + [
+        g for g in range(1, args.groups + 1) for _ in range(args.group_questions)
+    ]:
+        rows.append((group_id, f"问题 {len(rows)}", "fill_blank", "答案", rng.choice(DIFFICULTIES)))
+    db.executemany("""
+        INSERT INTO verification_questions (group_id, question_text, question_type, correct_answer, difficulty)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    question_ids = [row[0] for row in db.execute("SELECT question_id FROM verification_questions").fetchall()]
+    db.executemany("""
+        INSERT INTO verification_records (group_id, user_id, verification_type, question_id, result)
+        VALUES (?, ?, 'question', ?, ?)
+    """, [(1, i, rng.choice(question_ids), "passed" if rng.random() < 0.8 else "rejected")
+          for i in range(args.records)])
+    db.commit()
+
+
+def old_random_question(group_id: int):
+    """The former VerificationService.get_random_question"""
+    def get_questions(group_id):
+        cursor = db.execute("""
+            SELECT * FROM verification_questions
+            WHERE is_active = 1 AND (group_id = ? OR group_id IS NULL)
+            ORDER BY RANDOM() LIMIT ?
+        """, (group_id, 1))
+        return [dict(q) for q in cursor.fetchall()]
+
+    questions = get_questions(group_id)
+    if not questions:
+        questions = get_questions(None)
+    return questions[0] if questions else None
+
+
+def raid(name: str, draw, joins: int, group_id: int) -> float:
+    start = time.perf_counter()
+    for _ in range(joins):
+        assert draw(group_id) is not None
+    elapsed = time.perf_counter() - start
+    print(f"{name:>36}: {elapsed / joins * 1e6:9.1f} µs/join, {joins / elapsed:9.0f} joins/s")
+    return elapsed
+
+
+def check_draws(pool: QuestionPool, draws: int, rng: random.Random) -> tuple:
+    """Total variation distance between draws and the pool's weights, and the share of each difficulty"""
+    weights = pool.weights or [1.0] * len(pool)
+    total = sum(weights)
+    counts, difficulties = {}, {}
+    for _ in range(draws):
+        question = pool.sample(rng=rng)
+        counts[question['question_id']] = counts.get(question['question_id'], 0) + 1
+        difficulties[question['difficulty']] = difficulties.get(question['difficulty'], 0) + 1
+    error = 0.5 * sum(abs(counts.get(q['question_id'], 0) / draws - w / total)
+                      for q, w in zip(pool.questions, weights))
+    shares = ", ".join(f"{d} {difficulties.get(d, 0) / draws:.0%}" for d in ("easy", "medium", "hard"))
+    return error, shares
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--global-questions", type=int, default=200)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--group-questions", type=int, default=100)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--joins", type=int, default=500)
+    parser.add_argument("--draws", type=int, default=200000)
+    args = parser.parse_args()
+
+    init_database()
+    populate(args)
+    group_id = 1
+    pool_size = len(VerificationRepository.get_question_pool(group_id))
+    print(f"pool of group {group_id}: {pool_size} questions "
+          f"({args.global_questions + args.groups * args.group_questions} in the table)")
+
+    old = raid("ORDER BY RANDOM() queries", old_random_question, args.joins, group_id)
+    VerificationRepository.invalidate_cache()
+    raid("question pool, building it included", VerificationService.get_random_question, args.joins, group_id)
+    new = raid("question pool", VerificationService.get_random_question, args.joins, group_id)
+    print(f"{'speedup':>36}: {old / new:9.0f}x")
+
+    ok = True
+    rng = random.Random(7)
+    for weighting in QUESTION_WEIGHTINGS:
+        Config.VERIFICATION_QUESTION_WEIGHTING = weighting
+        VerificationRepository.invalidate_cache()
+        pool = VerificationRepository.get_question_pool(group_id)
+        error, shares = check_draws(pool, args.draws, rng)
+        # Sampling noise alone is about sqrt(n / draws) / 2
+        limit = 1.5 * (len(pool) / args.draws) ** 0.5
+        ok &= error < limit
+        print(f"{weighting:>36}: total variation {error:.4f} (limit {limit:.4f}), drawn {shares}")
+
+    db.close()
+    print(f"distributions: {'ok' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Fee quote benchmark: per-quote rate queries vs the in-memory rate table.
+
+Quotes ``--quotes`` random amounts the way the calculator did before (two
+``rate_configs`` queries and float rounding per quote), through
+``RateRepository.calculate_fee`` and through the batch
+``RateRepository.calculate_fees`` (integer fen).
+
+Usage:
+    python -m benchmarks.bench_rate_quotes --quotes 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_rates.db")
+
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database.rate_repository import RateRepository  # noqa: E402
+from utils.money import from_minor, to_minor  # noqa: E402
+
+
+def query_rate(channel: str, vip_level: int):
+    """The original get_rate lookup"""
+    return db.execute("""
+        SELECT * FROM rate_configs
+        WHERE channel = ? AND vip_level = ? AND is_active = 1
+        LIMIT 1
+    """, (channel, vip_level)).fetchone()
+
+
+def quote_with_queries(amount: float, channel: str, vip_level: int) -> tuple:
+    """The original CalculatorService.calculate_fee: two rate queries per quote"""
+    rate_config = query_rate(channel, vip_level)
+    rate = float(rate_config['rate_percentage']) if rate_config else 0.0060
+    fee = round(amount * rate, 2)
+    query_rate(channel, vip_level)
+    return fee, round(amount - fee, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quotes", type=int, default=100000)
+    args = parser.parse_args()
+
+    init_database()
+    rng = random.Random(42)
+    amounts = [round(rng.uniform(1, 50000), 2) for _ in range(args.quotes)]
+    amounts_minor = [to_minor(a) for a in amounts]
+    channel, vip_level = "wechat", 2
+
+    runs = (
+        ("queries", lambda: [quote_with_queries(a, channel, vip_level) for a in amounts]),
+        ("table", lambda: [RateRepository.calculate_fee(a, channel, vip_level) for a in amounts_minor]),
+        ("batch", lambda: RateRepository.calculate_fees(amounts_minor, channel, vip_level)),
+    )
+    results = {}
+    for name, fn in runs:
+        start = time.perf_counter()
+        results[name] = fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>8}: {elapsed * 1e6 / args.quotes:8.2f} us/quote")
+
+    # Float rounding of the old path vs exact half-up fen
+    differing = sum(
+        float(from_minor(fee)) != old_fee
+        for (old_fee, _), (fee, _) in zip(results["queries"], results["batch"])
+    )
+    print(f"fees differing from float rounding: {differing}/{args.quotes}")
+    print(f"table and batch agree: {results['table'] == results['batch']}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
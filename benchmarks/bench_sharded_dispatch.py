@@ -0,0 +1,149 @@
+"""
+Sharded dispatch benchmark: handler throughput with 1 to N worker processes.
+
+Routes ``--updates`` synthetic messages from ``--chats`` chats through
+``ShardedDispatcher`` to worker processes whose message handler does the CPU
+work of a typical screen: a MarkdownV2 transaction list and an inline
+keyboard, ``--renders`` times. Each message carries its chat's sequence
+number and the handler fails on any out-of-order message; a run fails
+unless every update was handled.
+
+Scaling is bounded by the cores available (printed first).
+
+Usage:
+    python -m benchmarks.bench_sharded_dispatch --updates 20000 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Worker processes inherit the parent's settings
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_sharded.db"))
+os.environ.setdefault("BENCH_RENDERS", "20")
+
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message  # noqa: E402
+from services.sharded_dispatch import ShardedDispatcher  # noqa: E402
+from utils.text_utils import escape_markdown_v2, format_money_markdown  # noqa: E402
+
+# Last sequence number seen per chat (inside a worker process)
+_last_seq = {}
+
+
+def render_screen(chat_id: int, seq: int):
+    """A transaction history page: MarkdownV2 text and an inline keyboard"""
+    lines = [f"*📜 交易记录* \\({seq}\\)"]
+    for i in range(10):
+        lines.append(
+            f"{escape_markdown_v2(f'WS{chat_id}{seq}{i:04d}')} "
+            f"{format_money_markdown(chat_id * 37 + seq * 101 + i, 'CNY')} "
+            f"{escape_markdown_v2('2026-01-01 12:00:00 (已支付)')}"
+        )
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"详情 {i}", callback_data=f"tx_{chat_id}_{seq}_{i}")]
+        for i in range(5)
+    ] + [[InlineKeyboardButton(text="下一页", callback_data=f"page_{seq + 1}")]])
+    return "\n".join(lines), keyboard
+
+
+def bench_create_bot() -> Bot:
+    return Bot("123456:BENCH")
+
+
+def bench_create_dispatcher() -> Dispatcher:
+    renders = int(os.environ["BENCH_RENDERS"])
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        seq = int(message.text)
+        last = _last_seq.get(message.chat.id, -1)
+        if seq != last + 1:
+            raise AssertionError(f"chat {message.chat.id}: message {seq} after {last}")
+        _last_seq[message.chat.id] = seq
+        for _ in range(renders):
+            render_screen(message.chat.id, seq)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+def make_updates(count: int, chats: int) -> list:
+    """Messages from random chats, numbered per chat"""
+    rng = random.Random(42)
+    seqs = {}
+    updates = []
+    for update_id in range(1, count + 1):
+        chat_id = rng.randint(1, chats)
+        seq = seqs.get(chat_id, 0)
+        seqs[chat_id] = seq + 1
+        updates.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1767225600,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+                "text": str(seq),
+            },
+        })
+    return updates
+
+
+async def route_all(shards: ShardedDispatcher, updates: list, chunk: int = 500):
+    for start in range(0, len(updates), chunk):
+        for update in updates[start:start + chunk]:
+            shards.route(update)
+        # Let the batch flush
+        await asyncio.sleep(0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--renders", type=int, default=int(os.environ["BENCH_RENDERS"]))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    os.environ["BENCH_RENDERS"] = str(args.renders)
+
+    updates = make_updates(args.updates, args.chats)
+    start = time.perf_counter()
+    for update in updates[:1000]:
+        render_screen(update["message"]["chat"]["id"], 0)
+    per_update_ms = (time.perf_counter() - start) / 1000 * args.renders * 1000
+    print(f"cores: {os.cpu_count()}, handler CPU ~{per_update_ms:.2f} ms/update")
+
+    baseline = None
+    for workers in args.workers:
+        shards = ShardedDispatcher(workers, bench_create_bot, bench_create_dispatcher)
+        shards.start()
+        start = time.perf_counter()
+        asyncio.run(route_all(shards, updates))
+        # stop() returns once the workers handled everything routed to them
+        shards.stop()
+        elapsed = time.perf_counter() - start
+
+        handled = sum(stats["handled"] for stats in shards.worker_stats.values())
+        failed = sum(stats["failed"] for stats in shards.worker_stats.values())
+        if handled != len(updates):
+            print(f"{workers:>2} workers: FAIL, handled {handled}/{len(updates)}, failed {failed}, "
+                  f"dropped {shards.stats['dropped']}")
+            return 1
+        rate = len(updates) / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>2} workers: {rate:8.0f} updates/s ({rate / baseline:4.2f}x), "
+              f"handled {handled}/{len(updates)}, failed {failed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Transaction history benchmark: LIMIT/OFFSET vs keyset pagination.
+
+Seeds one user with ``--rows`` transactions and times fetching page 1 and a
+deep page with ``get_user_transactions`` (OFFSET) and
+``get_user_transactions_page`` (cursor).
+
+Usage:
+    python -m benchmarks.bench_transaction_pages --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_pages.db")
+
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database.transaction_repository import TransactionRepository  # noqa: E402
+from utils.pagination import encode_cursor  # noqa: E402
+
+USER_ID = 1
+PAGE_SIZE = 10
+
+
+def seed(rows: int):
+    """Insert ``rows`` transactions of one user spread over a year"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db.executemany("""
+        INSERT INTO transactions
+        (user_id, order_id, transaction_type, payment_channel, amount, fee,
+         actual_amount, status, created_at)
+        VALUES (?, ?, 'receive', 'alipay', 100, 0, 100, 'paid', ?)
+    """, (
+        (USER_ID, f"B{i}", (now - timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"))
+        for i in range(rows)
+    ))
+    db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    init_database()
+    seed(args.rows)
+
+    deep_offset = (args.rows // PAGE_SIZE - 1) * PAGE_SIZE
+    # Cursor of the row just before the deep page
+    anchor = TransactionRepository.get_user_transactions(USER_ID, limit=1, offset=deep_offset - 1)[0]
+    deep_cursor = encode_cursor(anchor['created_at'], anchor['transaction_id'])
+
+    for name, offset, cursor in (("page 1", 0, None), (f"offset {deep_offset}", deep_offset, deep_cursor)):
+        offset_ms = timed(lambda: TransactionRepository.get_user_transactions(
+            USER_ID, limit=PAGE_SIZE, offset=offset), args.repeat)
+        keyset_ms = timed(lambda: TransactionRepository.get_user_transactions_page(
+            USER_ID, limit=PAGE_SIZE, cursor=cursor), args.repeat)
+        print(f"{name:>14}: OFFSET {offset_ms:8.2f} ms   keyset {keyset_ms:8.2f} ms")
+
+    same = (TransactionRepository.get_user_transactions(USER_ID, limit=PAGE_SIZE, offset=deep_offset)
+            == TransactionRepository.get_user_transactions_page(
+                USER_ID, limit=PAGE_SIZE, cursor=deep_cursor)['transactions'])
+    print(f"deep page identical: {same}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Verified member benchmark: the membership check of every group message.
+
+Fills ``group_members`` with ``--groups`` groups of ``--members`` members
+(``--pending`` of them not verified), then checks ``--messages`` senders
+drawn mostly from members (``--hot`` of the messages go to 3 busy groups),
+once with the former ``COUNT(*)`` query and once through
+``VerifiedMemberIndex``: with room for every group, for 5 groups only,
+caching groups partially, and shared with other processes (misses are
+looked up). Every answer of the index must match the query's, also after
+members are added, verified and rejected, including the answers of a
+second index standing in for another process.
+
+Usage:
+    python -m benchmarks.bench_verified_members --messages 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_members.db")
+
+from config import Config  # noqa: E402
+from database.db import db  # noqa: E402
+from database.group_repository import GroupRepository  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database import verified_members as index_module  # noqa: E402
+from database.verified_members import VerifiedMemberIndex  # noqa: E402
+
+FIRST_USER_ID = 5_000_000_000
+
+
+def populate(args) -> dict:
+    """Members by group; returns group_id -> list of member user IDs"""
+    rng = random.Random(42)
+    members = {}
+    for group_id in range(-1001, -1001 - args.groups, -1):
+        db.execute("INSERT INTO groups (group_id, group_title) VALUES (?, ?)", (group_id, f"群 {group_id}"))
+        users = rng.sample(range(FIRST_USER_ID, FIRST_USER_ID + args.members * 20), args.members)
+        pending = set(rng.sample(users, args.pending))
+        db.executemany(
+            "INSERT INTO group_members (group_id, user_id, status) VALUES (?, ?, ?)",
+            [(group_id, user_id, "pending" if user_id in pending else "verified") for user_id in users]
+        )
+        members[group_id] = users
+    db.commit()
+    return members
+
+
+def make_messages(members: dict, count: int, strangers: float, hot: float) -> list:
+    """(group_id, user_id) of message senders; a few are not members at all"""
+    rng = random.Random(7)
+    groups = list(members)
+    messages = []
+    for _ in range(count):
+        group_id = rng.choice(groups[:3] if rng.random() < hot else groups)
+        if rng.random() < strangers:
+            messages.append((group_id, rng.randrange(1, FIRST_USER_ID)))
+        else:
+            messages.append((group_id, rng.choice(members[group_id])))
+    return messages
+
+
+def count_query(group_id: int, user_id: int) -> bool:
+    """The former GroupRepository.is_member_verified"""
+    cursor = db.execute("""
+        SELECT COUNT(*) FROM group_members
+        WHERE group_id = ? AND user_id = ? AND status = 'verified'
+    """, (group_id, user_id))
+    return cursor.fetchone()[0] > 0
+
+
+def run(name: str, check, messages: list) -> tuple:
+    start = time.perf_counter()
+    answers = [check(group_id, user_id) for group_id, user_id in messages]
+    elapsed = time.perf_counter() - start
+    print(f"{name:>44}: {elapsed / len(messages) * 1e6:7.2f} µs/message, "
+          f"{len(messages) / elapsed:9.0f} messages/s")
+    return answers, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--pending", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--strangers", type=float, default=0.01)
+    parser.add_argument("--hot", type=float, default=0.9)
+    args = parser.parse_args()
+
+    init_database()
+    members = populate(args)
+    messages = make_messages(members, args.messages, args.strangers, args.hot)
+
+    expected, old = run("COUNT(*) per message", count_query, messages)
+    ok = True
+    budgets = [("index", args.groups * args.members, None, False),
+               ("index, room for 5 groups", 5 * args.members, None, False),
+               ("index, quarter of each group", args.groups * args.members, args.members // 4, False),
+               ("index, shared by processes", args.groups * args.members, None, True)]
+    for name, budget, group_budget, shared in budgets:
+        index = VerifiedMemberIndex(max_members=budget, max_group_members=group_budget, shared=shared)
+        # The first pass loads the groups, the second one shows the steady state
+        for label in ("first pass", "second pass"):
+            stats = dict(index.stats)
+            answers, elapsed = run(f"{name}, {label}", index.is_verified, messages)
+            reads = sum(index.stats[k] - stats[k] for k in ("loads", "lookups"))
+            print(f"{'':>44}  {old / elapsed:5.1f}x, {reads / len(messages):.2%} of messages read the "
+                  f"database, {len(index)} IDs ({len(index) * 8 / 1024 / 1024:.1f} MiB), "
+                  f"{index.stats['evicted_groups'] - stats['evicted_groups']} groups evicted")
+            ok &= answers == expected
+
+    # Status changes go through GroupRepository and update the global index;
+    # "other" is warmed up first and only learns about removals
+    index = index_module.verified_members
+    other = VerifiedMemberIndex(max_members=args.groups * args.members, shared=True)
+    for group_id, user_id in messages[:20000]:
+        other.is_verified(group_id, user_id)
+    Config.CACHE_SYNC_INTERVAL = 0
+    rng = random.Random(3)
+    changed = []
+    for group_id, user_id in rng.sample(messages, 2000):
+        index.is_verified(group_id, user_id)
+        if rng.random() < 0.5:
+            GroupRepository.verify_member(group_id, user_id)
+        else:
+            GroupRepository.reject_member(group_id, user_id)
+        changed.append((group_id, user_id))
+    for group_id, user_id in rng.sample(messages, 500):
+        GroupRepository.add_member(group_id, user_id, status=rng.choice(["pending", "verified"]))
+        changed.append((group_id, user_id))
+    GroupRepository.verify_all_pending_members(next(iter(members)))
+    checks = changed + messages[:20000]
+    stale = sum(index.is_verified(g, u) != count_query(g, u) for g, u in checks)
+    other_stale = sum(other.is_verified(g, u) != count_query(g, u) for g, u in checks)
+    print(f"{'after status changes':>44}: {stale} stale answers, {other_stale} in another process")
+    ok &= stale == 0 and other_stale == 0
+
+    db.close()
+    print(f"answers: {'ok' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
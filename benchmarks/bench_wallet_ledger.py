@@ -0,0 +1,109 @@
+"""
+Wallet screen benchmark: full-history scan vs wallet ledger lookups.
+
+Seeds one heavy merchant with ``--rows`` paid transactions and times the
+original balance/today queries against ``WalletRepository.get_overview``.
+
+Usage:
+    python -m benchmarks.bench_wallet_ledger --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_wallet.db")
+
+from database.db import db  # noqa: E402
+from utils.money import to_minor  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database.wallet_repository import WalletRepository  # noqa: E402
+
+MERCHANT_ID = 1
+
+
+def seed(rows: int):
+    """Insert ``rows`` paid transactions of one merchant spread over a year"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db.executemany("""
+        INSERT INTO transactions
+        (user_id, order_id, transaction_type, payment_channel, amount, fee,
+         actual_amount, amount_minor, actual_amount_minor, status, created_at)
+        VALUES (?, ?, ?, 'alipay', ?, 0, ?, ?, ?, 'paid', ?)
+    """, (
+        (MERCHANT_ID, f"B{i}", rng.choice(("receive", "receive", "pay")), amount, amount,
+         to_minor(amount), to_minor(amount),
+         (now - timedelta(minutes=rng.randrange(365 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S"))
+        for i, amount in ((i, round(rng.uniform(1, 5000), 2)) for i in range(rows))
+    ))
+    db.commit()
+
+
+async def scan_overview(user_id: int) -> dict:
+    """The original callback_wallet calculation"""
+    transactions = await db.fetch_all("""
+        SELECT transaction_type, actual_amount
+        FROM transactions
+        WHERE user_id = ? AND status = 'paid'
+    """, (user_id,))
+    balance = 0.0
+    for trans in transactions:
+        if trans['transaction_type'] == 'receive':
+            balance += float(trans['actual_amount'])
+        elif trans['transaction_type'] == 'pay':
+            balance -= float(trans['actual_amount'])
+    today_transactions = await db.fetch_all("""
+        SELECT transaction_type, actual_amount
+        FROM transactions
+        WHERE user_id = ? AND status = 'paid'
+        AND DATE(created_at) = DATE('now')
+    """, (user_id,))
+    return {
+        'balance': balance,
+        'today_receive': sum(float(t['actual_amount']) for t in today_transactions
+                             if t['transaction_type'] == 'receive'),
+        'today_pay': sum(float(t['actual_amount']) for t in today_transactions
+                         if t['transaction_type'] == 'pay'),
+    }
+
+
+async def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn(MERCHANT_ID)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+async def run(args):
+    init_database()
+    seed(args.rows)
+    await WalletRepository.rebuild()
+
+    for name, fn in (("full scan", scan_overview), ("ledger", WalletRepository.get_overview)):
+        samples, result = await timed(fn, args.repeat)
+        print(f"{name:>10}: median {statistics.median(samples) * 1000:8.2f} ms  "
+              f"balance {result['balance']:.2f}  today +{result['today_receive']:.2f} "
+              f"-{result['today_pay']:.2f}")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Webhook ingest benchmark: a local fake Telegram POSTing synthetic updates.
+
+Serves the webhook application from ``services/webhook_server`` on a local
+port with a dispatcher whose message handler simulates ``--handler-ms`` of
+I/O, then POSTs ``--updates`` message updates (plus ``--duplicates``
+redeliveries) from a separate process with ``--concurrency`` connections:
+one worker with in-memory dedupe, one worker with the database dedupe, and
+``--workers`` processes sharing the port. Every unique update must be
+handled exactly once.
+
+Usage:
+    python -m benchmarks.bench_webhook_ingest --updates 20000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Worker processes inherit the parent's database
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_webhook.db"))
+
+from aiohttp import web  # noqa: E402
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from services.webhook_server import SECRET_HEADER, UpdateDeduplicator, create_app  # noqa: E402
+
+SECRET = "bench-secret"
+PATH = "/telegram/webhook"
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    """A private text message update"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": f"message {update_id}",
+        },
+    }
+
+
+def make_dispatcher(handler_ms: float, handled: list) -> Dispatcher:
+    """Dispatcher with one message handler simulating I/O"""
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        await asyncio.sleep(handler_ms / 1000)
+        handled.append(message.message_id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+               body: bytes, secret: str) -> int:
+    """One keep-alive HTTP/1.1 POST; returns the status code"""
+    writer.write(
+        f"POST {PATH} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"{SECRET_HEADER}: {secret}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            await reader.readexactly(int(line.split(b":")[1]))
+    return status
+
+
+async def fire(port: int, updates: list, concurrency: int) -> dict:
+    """Fake Telegram: POST the updates over ``concurrency`` keep-alive connections"""
+    bodies = [json.dumps(update).encode() for update in updates]
+    latencies, statuses = [], {}
+    queue = list(reversed(bodies))
+
+    async def connection():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while queue:
+            body = queue.pop()
+            start = time.perf_counter()
+            status = await post(reader, writer, body, SECRET)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+        writer.close()
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    assert await post(reader, writer, bodies[0], "wrong") == 401
+    writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "statuses": statuses,
+    }
+
+
+def serve_worker(index: int, workers: int, shared: bool, args, ready, stop, results):
+    """Webhook worker process: serve until ``stop`` is set, then report"""
+    async def _serve():
+        handled: list = []
+        bot = Bot("123456:BENCH")
+        app = create_app(make_dispatcher(args.handler_ms, handled), bot, SECRET, PATH,
+                         UpdateDeduplicator(window=args.updates * 2, shared=shared))
+        runner = web.AppRunner(app, handle_signals=False)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", args.port, reuse_port=workers > 1 or None)
+        await site.start()
+        ready.release()
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        # Shutdown waits for the updates still being handled
+        await runner.cleanup()
+        await bot.session.close()
+        results.put((handled, app["webhook_handler"].stats))
+
+    asyncio.run(_serve())
+    db.close()
+
+
+def run_mode(name: str, workers: int, shared: bool, first_id: int, args):
+    rng = random.Random(42)
+    unique = [make_update(first_id + i, rng.randint(1, 5000)) for i in range(args.updates)]
+    updates = unique + rng.sample(unique, int(len(unique) * args.duplicates))
+    rng.shuffle(updates)
+
+    context = multiprocessing.get_context("spawn")
+    ready, stop, results = context.Semaphore(0), context.Event(), context.Queue()
+    processes = [context.Process(target=serve_worker, args=(i, workers, shared, args, ready, stop, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    outcome = asyncio.run(fire(args.port, updates, args.concurrency))
+    stop.set()
+    handled, duplicates = [], 0
+    for _ in processes:
+        worker_handled, stats = results.get()
+        handled.extend(worker_handled)
+        duplicates += stats["duplicates"]
+    for process in processes:
+        process.join()
+
+    print(f"{name:>22}: {len(updates) / outcome['elapsed']:8.0f} updates/s, "
+          f"ack p50 {outcome['p50_ms']:6.2f} ms, p99 {outcome['p99_ms']:6.2f} ms, "
+          f"statuses {outcome['statuses']}")
+    print(f"{'':>22}  handled {len(handled)} (unique {len(set(handled))}/{len(unique)}), "
+          f"duplicates dropped {duplicates}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--handler-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    init_database()
+    db.close()
+    run_mode("1 worker, memory dedupe", 1, False, 1, args)
+    run_mode("1 worker, shared dedupe", 1, True, 10_000_000, args)
+    run_mode(f"{args.workers} workers, shared", args.workers, True, 20_000_000, args)
+
+
+if __name__ == "__main__":
+    main()
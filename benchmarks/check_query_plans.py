@@ -0,0 +1,97 @@
+"""
+Query plan regression check: every hot query must be index-driven.
+
+Creates an empty database with the current schema, runs EXPLAIN QUERY PLAN
+on the hot queries of the repositories and fails if any of them scans a
+table or sorts through a temporary b-tree. The statements are the
+repositories' own query constants and builders, so a changed query is
+checked as it is issued. Run it after changing a hot query or the indexes.
+
+Usage:
+    python -m benchmarks.check_query_plans
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "check_plans.db")
+
+from database.db import db  # noqa: E402
+from database.models import init_database  # noqa: E402
+from database import (  # noqa: E402
+    fsm_repository, group_repository, referral_repository, stats_repository,
+    transaction_repository, user_repository, verification_repository, verified_members,
+    wallet_repository,
+)
+from database.transaction_repository import TransactionRepository  # noqa: E402
+from database.wallet_repository import WalletRepository  # noqa: E402
+from utils.pagination import encode_cursor  # noqa: E402
+
+CURSOR = encode_cursor("2026-01-01 00:00:00", 1)
+history_page = TransactionRepository.user_transactions_page_query
+tx_totals = stats_repository.TX_TOTALS_SQL.format
+
+# (description, SQL, parameters), taken from the code that issues them. Not
+# listed: the admin set (a scan of a handful of rows once per ADMIN_CACHE_TTL)
+# and the daily rows of a ledger rebuild (sorts one drifted user's paid rows)
+HOT_QUERIES = [
+    ("transaction by order id", transaction_repository.TRANSACTION_BY_ORDER_SQL, ("WS1",)),
+    ("history page", *history_page(1, cursor=CURSOR)),
+    ("history page backward", *history_page(1, cursor=CURSOR, backward=True)),
+    ("history page since date", *history_page(1, since="2026-01-01")),
+    ("history filtered by status", *history_page(1, status="paid")),
+    ("history filtered by type", *history_page(1, transaction_type="receive")),
+    ("history filtered by channel", *history_page(1, payment_channel="alipay")),
+    ("transaction count by type", *TransactionRepository.transaction_count_query(1, "receive")),
+    ("pending order expiry sweep", transaction_repository.EXPIRABLE_ORDERS_SQL,
+     ("2026-01-01 00:00:00", 500)),
+    *[(f"ledger rebuild of one user ({i + 1}/3)", query, params)
+      for i, (query, params) in enumerate(WalletRepository.rebuild_queries(1, "2026-01-01 00:00:00")[:3])],
+    ("wallet balance", wallet_repository.WALLET_BALANCE_SQL, (1,)),
+    ("wallet day", wallet_repository.WALLET_DAY_SQL, (1, "2026-01-01")),
+    ("user by id", user_repository.USER_BY_ID_SQL, (1,)),
+    ("recent users", user_repository.RECENT_USERS_SQL, (10,)),
+    ("pending members of all groups", group_repository.ALL_PENDING_MEMBERS_SQL, ()),
+    ("member verification state", verified_members.VERIFIED_MEMBER_SQL, (1, 1)),
+    ("verified members of a group", verified_members.VERIFIED_MEMBERS_SQL, (1, 250001)),
+    ("pending verification record", verification_repository.PENDING_RECORD_SQL, (1, 1)),
+    ("referral of a user", referral_repository.OPEN_REFERRAL_SQL, (1,)),
+    ("first-transaction reward", referral_repository.FIRST_TRANSACTION_REWARD_SQL, (1,)),
+    ("user rewards", referral_repository.USER_REWARDS_SQL, (1, 10)),
+    ("statistics of a day", tx_totals(where="stat_date = ?"), ("2026-01-01",)),
+    ("statistics time range", tx_totals(where="stat_date >= ?"), ("2026-01-01",)),
+    ("new users since", stats_repository.NEW_USERS_SINCE_SQL, ("2026-01-01",)),
+    ("FSM state of a chat", fsm_repository.FSM_LOAD_SQL, ("1:1:1:::default",)),
+    ("expired FSM states purge", fsm_repository.FSM_PURGE_SQL, (1767225600.0,)),
+]
+
+
+def plan_problems(sql: str, params: tuple) -> list:
+    """Plan lines showing a full table scan or a temporary sort"""
+    rows = db.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    problems = []
+    for row in rows:
+        detail = row[3]
+        full_scan = detail.startswith("SCAN") and "USING" not in detail
+        if full_scan or "TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def main() -> int:
+    init_database()
+    failures = 0
+    for name, sql, params in HOT_QUERIES:
+        problems = plan_problems(sql, params)
+        print(f"{'FAIL' if problems else 'ok':>4}  {name}{': ' + '; '.join(problems) if problems else ''}")
+        failures += bool(problems)
+    db.close()
+    print(f"\n{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} hot queries index-driven")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
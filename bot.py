@@ -4,6 +4,8 @@ A high-end Fintech Telegram Bot for Alipay/WeChat payment gateway
 """
 import asyncio
 import logging
+import multiprocessing
+import signal
 import sys
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
@@ -24,6 +26,13 @@ from handlers.ai_handlers import router as ai_router
 from utils.bot_setup import setup_bot_commands, setup_menu_button, setup_bot_info
 from middleware.user_tracking import UserTrackingMiddleware
 from middleware.group_middleware import GroupMiddleware
+from services.user_activity import activity_tracker
+from services.wallet_reconciler import wallet_reconciler
+from services.order_expiry import order_expiry_sweeper
+from services.webhook_server import UpdateDeduplicator, create_app, serve
+from services.sharded_dispatch import ShardedDispatcher, poll_updates
+from services.fsm_storage import create_fsm_storage
+from database.stats_repository import StatsRepository
 
 # Configure logging with more detail
 logging.basicConfig(
@@ -36,8 +45,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def on_startup(bot: Bot):
+async def on_startup(bot: Bot, dispatcher: Dispatcher, worker: int = 0):
     """Actions to perform on bot startup"""
+    if worker > 0:
+        # Extra worker processes only handle updates and flush the activity
+        # of the users they served; the first worker owns the database
+        # setup, the shared background services and the bot setup
+        activity_tracker.start()
+        logger.info(f"✅ Worker {worker} ready")
+        return
+    
     # Initialize database
     try:
         init_database()
@@ -46,6 +63,31 @@ async def on_startup(bot: Bot):
         logger.error(f"❌ Database initialization error: {e}")
         raise
     
+    # Backfill admin statistics rollups on databases created before them
+    try:
+        await StatsRepository.ensure_built()
+    except Exception as e:
+        logger.warning(f"⚠️ Statistics rollup backfill failed: {e}")
+    
+    # Start background flushing of buffered user activity (every worker has its own)
+    activity_tracker.start()
+    
+    # Build (first run) and periodically reconcile the wallet ledger
+    wallet_reconciler.start()
+    
+    # Expire stale pending orders and notify their owners
+    order_expiry_sweeper.start(bot)
+    
+    # Point Telegram at the webhook (the secret token comes back on every request)
+    if Config.BOT_MODE == "webhook":
+        await bot.set_webhook(
+            Config.get_webhook_url(),
+            secret_token=Config.WEBHOOK_SECRET,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+        )
+        logger.info(f"✅ Webhook set: {Config.get_webhook_url()}")
+    
     # Set up bot commands, menu button, and description
     try:
         await setup_bot_commands(bot)
@@ -70,26 +112,27 @@ async def on_shutdown(bot: Bot):
     """Actions to perform on bot shutdown"""
     logger.info("=" * 50)
     logger.info("🛑 WuShiPay System Shutting Down...")
+    await order_expiry_sweeper.stop()
+    await wallet_reconciler.stop()
+    await activity_tracker.stop()
+    logger.info("✅ User activity flushed")
     db.close()
     logger.info("✅ Database connection closed")
     logger.info("=" * 50)
 
 
-async def main():
-    """Main function to initialize and run the bot"""
-    # Validate configuration
-    try:
-        Config.validate()
-    except ValueError as e:
-        logger.error(f"❌ Configuration error: {e}")
-        return
-    
-    # Initialize bot and dispatcher
-    bot = Bot(
+def create_bot() -> Bot:
+    """Create the bot instance"""
+    return Bot(
         token=Config.BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN_V2)
     )
-    dp = Dispatcher()
+
+
+def create_dispatcher() -> Dispatcher:
+    """Create the dispatcher with all middleware, routers and lifecycle handlers"""
+    # The dispatcher closes the storage on shutdown (flushing buffered writes)
+    dp = Dispatcher(storage=create_fsm_storage())
     
     # Register middleware (order matters - first registered = first executed)
     dp.message.middleware(UserTrackingMiddleware())
@@ -111,23 +154,138 @@ async def main():
     # Register startup/shutdown handlers
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
+    return dp
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, worker: int = 0):
+    """
+    Serve updates over the webhook until stopped.
+    
+    Args:
+        bot: Bot instance
+        dp: Dispatcher
+        worker: Index of this worker process (0 is the primary)
+    """
+    dp["worker"] = worker
+    deduplicator = UpdateDeduplicator(
+        window=Config.WEBHOOK_DEDUP_WINDOW,
+        shared=Config.WEBHOOK_WORKERS > 1
+    )
+    app = create_app(dp, bot, Config.WEBHOOK_SECRET, Config.WEBHOOK_PATH, deduplicator)
+    await serve(app, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT,
+                reuse_port=Config.WEBHOOK_WORKERS > 1)
+
+
+async def run_sharded(bot: Bot):
+    """
+    Receive updates in this process and handle them in chat-partitioned workers.
+    
+    Args:
+        bot: Bot instance used to receive updates
+    """
+    # Migrate once here so the workers never race on the schema
+    init_database()
+    db.close()
+    
+    loop = asyncio.get_running_loop()
+    shards = ShardedDispatcher(Config.DISPATCH_WORKERS, create_bot, create_dispatcher)
+    await loop.run_in_executor(None, shards.start)
+    try:
+        if Config.BOT_MODE == "webhook":
+            deduplicator = UpdateDeduplicator(window=Config.WEBHOOK_DEDUP_WINDOW)
+            app = create_app(None, bot, Config.WEBHOOK_SECRET, Config.WEBHOOK_PATH,
+                             deduplicator, forward=shards.route)
+            await serve(app, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT)
+        else:
+            # getUpdates conflicts with a webhook left over from webhook mode
+            await bot.delete_webhook()
+            stop = asyncio.Event()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            allowed_updates = create_dispatcher().resolve_used_update_types()
+            await poll_updates(bot, shards, allowed_updates, stop)
+    finally:
+        # Workers finish the updates already routed to them
+        await loop.run_in_executor(None, shards.stop)
+
+
+async def main(worker: int = 0):
+    """
+    Main function to initialize and run the bot.
+    
+    Args:
+        worker: Webhook worker index (webhook mode with several webhook workers)
+    """
+    # Validate configuration
+    try:
+        Config.validate()
+    except ValueError as e:
+        logger.error(f"❌ Configuration error: {e}")
+        return
+    
+    # Initialize bot (dispatchers are created where updates are handled)
+    bot = create_bot()
     
     # Startup log
-    print("🚀 WuShiPay System Starting...")
-    logger.info("🚀 WuShiPay System Starting...")
+    print(f"🚀 WuShiPay System Starting ({Config.BOT_MODE})...")
+    logger.info(f"🚀 WuShiPay System Starting ({Config.BOT_MODE})...")
     
-    # Start polling
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if Config.DISPATCH_WORKERS > 1:
+            await run_sharded(bot)
+        elif Config.BOT_MODE == "webhook":
+            dp = create_dispatcher()
+            await run_webhook(bot, dp, worker)
+        else:
+            dp = create_dispatcher()
+            # getUpdates conflicts with a webhook left over from webhook mode
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt, shutting down...")
     except Exception as e:
-        logger.error(f"❌ Critical error during polling: {e}", exc_info=True)
+        logger.error(f"❌ Critical error while serving updates: {e}", exc_info=True)
     finally:
         await bot.session.close()
         logger.info("✅ Bot session closed")
 
 
-if __name__ == "__main__":
-    asyncio.run(main())
+def run_worker(worker: int):
+    """Entry point of a webhook worker process"""
+    asyncio.run(main(worker))
+
+
+def run_workers(count: int):
+    """
+    Run several webhook worker processes sharing the listening port.
+    
+    Args:
+        count: Number of worker processes
+    """
+    # Migrate once here so the workers never race on the schema
+    init_database()
+    db.close()
+    
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, args=(i,), name=f"webhook-worker-{i}")
+               for i in range(count)]
+    for process in workers:
+        process.start()
+    logger.info(f"🚀 Started {count} webhook workers")
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
 
+if __name__ == "__main__":
+    if Config.BOT_MODE == "webhook" and Config.WEBHOOK_WORKERS > 1:
+        run_workers(Config.WEBHOOK_WORKERS)
+    else:
+        asyncio.run(main())
@@ -28,6 +28,107 @@ class Config:
     SUPPORT_USERNAME: str = "wushizhifu_jianglai"
     SUPPORT_URL: str = f"https://t.me/{SUPPORT_USERNAME}"
     
+    # Update delivery: "polling" (getUpdates) or "webhook"
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling")
+    
+    # Worker processes handling updates, partitioned by chat (1 handles them in-process)
+    DISPATCH_WORKERS: int = int(os.getenv("DISPATCH_WORKERS", "1"))
+    
+    # Webhook mode: public base URL and path Telegram posts to, secret token checked on
+    # every request, local listen address, worker processes sharing the port, max
+    # concurrent connections Telegram may open, and recent update ids kept for dedupe
+    WEBHOOK_BASE_URL: str = os.getenv("WEBHOOK_BASE_URL", MINIAPP_URL)
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8081"))
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "1"))
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+    WEBHOOK_DEDUP_WINDOW: int = int(os.getenv("WEBHOOK_DEDUP_WINDOW", "10000"))
+    
+    # User activity tracking (seconds between flushes / max dirty users per flush)
+    USER_ACTIVITY_FLUSH_INTERVAL: float = float(os.getenv("USER_ACTIVITY_FLUSH_INTERVAL", "10"))
+    USER_ACTIVITY_FLUSH_BATCH: int = int(os.getenv("USER_ACTIVITY_FLUSH_BATCH", "500"))
+    
+    # Seconds between wallet ledger reconciliations against transactions (0 disables)
+    WALLET_RECONCILE_INTERVAL: float = float(os.getenv("WALLET_RECONCILE_INTERVAL", "86400"))
+    
+    # Pending order expiry sweep (seconds between runs, 0 disables / orders per chunk / notify users)
+    ORDER_EXPIRY_INTERVAL: float = float(os.getenv("ORDER_EXPIRY_INTERVAL", "60"))
+    ORDER_EXPIRY_BATCH: int = int(os.getenv("ORDER_EXPIRY_BATCH", "500"))
+    ORDER_EXPIRY_NOTIFY: bool = os.getenv("ORDER_EXPIRY_NOTIFY", "1") == "1"
+    
+    # Payment gateway callbacks: HMAC secret (empty disables the endpoint), allowed
+    # timestamp skew in seconds, max callbacks per write transaction, seconds the
+    # worker waits to fill a batch, and queued callbacks before answering 503
+    PAYMENT_CALLBACK_SECRET: str = os.getenv("PAYMENT_CALLBACK_SECRET", "")
+    PAYMENT_CALLBACK_MAX_SKEW: int = int(os.getenv("PAYMENT_CALLBACK_MAX_SKEW", "300"))
+    PAYMENT_CALLBACK_BATCH: int = int(os.getenv("PAYMENT_CALLBACK_BATCH", "200"))
+    PAYMENT_CALLBACK_MAX_DELAY: float = float(os.getenv("PAYMENT_CALLBACK_MAX_DELAY", "0.005"))
+    PAYMENT_CALLBACK_QUEUE: int = int(os.getenv("PAYMENT_CALLBACK_QUEUE", "5000"))
+    
+    # FSM storage of multi-step flows: "sqlite" (survives restarts, shared by processes)
+    # or "memory"; seconds an untouched flow is kept; max flows kept by "memory";
+    # seconds "sqlite" batches writes; flows cached in process by "sqlite"
+    FSM_STORAGE: str = os.getenv("FSM_STORAGE", "sqlite").lower()
+    FSM_TTL: float = float(os.getenv("FSM_TTL", "1800"))
+    FSM_MEMORY_CAPACITY: int = int(os.getenv("FSM_MEMORY_CAPACITY", "100000"))
+    FSM_FLUSH_INTERVAL: float = float(os.getenv("FSM_FLUSH_INTERVAL", "0.05"))
+    FSM_CACHE_SIZE: int = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+    
+    # Seconds between checks whether another process invalidated an in-memory cache
+    CACHE_SYNC_INTERVAL: float = float(os.getenv("CACHE_SYNC_INTERVAL", "1.0"))
+    
+    # Seconds before the cached admin set is reloaded (picks up edits made outside the bot)
+    ADMIN_CACHE_TTL: float = float(os.getenv("ADMIN_CACHE_TTL", "60"))
+    
+    # Seconds admin dashboard metrics are reused across refreshes
+    DASHBOARD_CACHE_TTL: float = float(os.getenv("DASHBOARD_CACHE_TTL", "10"))
+    
+    # Verified group members kept in memory for the group message handler (8 bytes each)
+    VERIFIED_MEMBER_CACHE_SIZE: int = int(os.getenv("VERIFIED_MEMBER_CACHE_SIZE", "1000000"))
+    
+    # Seconds before the cached verification questions are reloaded (picks up edits made
+    # outside the bot and fresh pass rates) and how questions are weighted when drawn:
+    # "uniform", "difficulty" (every difficulty equally often) or "pass_rate"
+    VERIFICATION_CACHE_TTL: float = float(os.getenv("VERIFICATION_CACHE_TTL", "300"))
+    VERIFICATION_QUESTION_WEIGHTING: str = os.getenv("VERIFICATION_QUESTION_WEIGHTING", "uniform").lower()
+    
+    # Seconds before the cached rate table is reloaded (picks up edits made outside the bot)
+    RATE_CACHE_TTL: float = float(os.getenv("RATE_CACHE_TTL", "300"))
+    
+    # AI service limits (max in-flight requests / per-call timeout / hedge latency budget, seconds)
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", "20"))
+    AI_REQUEST_TIMEOUT: float = float(os.getenv("AI_REQUEST_TIMEOUT", "30"))
+    AI_HEDGE_DELAY: float = float(os.getenv("AI_HEDGE_DELAY", "8"))
+    
+    # AI FAQ answer cache (context-free questions only)
+    AI_CACHE_ENABLED: bool = os.getenv("AI_CACHE_ENABLED", "1") == "1"
+    AI_CACHE_TTL: float = float(os.getenv("AI_CACHE_TTL", "3600"))
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000"))
+    # Minimum bigram similarity for serving a near-duplicate question's answer (0 = exact matches only)
+    AI_CACHE_SIMILARITY: float = float(os.getenv("AI_CACHE_SIMILARITY", "0"))
+    
+    # Minimum seconds between edits of a streamed AI reply (Telegram edit rate limit)
+    AI_STREAM_EDIT_INTERVAL: float = float(os.getenv("AI_STREAM_EDIT_INTERVAL", "1.0"))
+    
+    # AI conversation history (in-memory sessions / memory cap / idle expiry seconds / tokens per user)
+    AI_HISTORY_MAX_USERS: int = int(os.getenv("AI_HISTORY_MAX_USERS", "10000"))
+    AI_HISTORY_MAX_BYTES: int = int(os.getenv("AI_HISTORY_MAX_BYTES", str(16 * 1024 * 1024)))
+    AI_HISTORY_IDLE_TTL: float = float(os.getenv("AI_HISTORY_IDLE_TTL", "3600"))
+    AI_HISTORY_TOKEN_BUDGET: int = int(os.getenv("AI_HISTORY_TOKEN_BUDGET", "1500"))
+    # Keep conversations in SQLite as well (survives restarts; required with WEBHOOK_WORKERS above 1)
+    AI_HISTORY_PERSISTENT: bool = os.getenv("AI_HISTORY_PERSISTENT", "0") == "1"
+    
+    # AI prompt size (estimated tokens per request / rolling summary of older turns)
+    AI_PROMPT_TOKEN_BUDGET: int = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "1200"))
+    AI_SUMMARY_TOKENS: int = int(os.getenv("AI_SUMMARY_TOKENS", "200"))
+    
+    @classmethod
+    def get_webhook_url(cls) -> str:
+        """Public URL Telegram delivers updates to"""
+        return cls.WEBHOOK_BASE_URL.rstrip("/") + cls.WEBHOOK_PATH
+    
     @classmethod
     def get_miniapp_url(cls, view: str = "dashboard", provider: str = None) -> str:
         """Generate MiniApp URL with parameters"""
@@ -41,5 +142,22 @@ class Config:
         """Validate that required configuration is present"""
         if not cls.BOT_TOKEN:
             raise ValueError("BOT_TOKEN is not set in environment variables or .env file")
+        if cls.BOT_MODE not in ("polling", "webhook"):
+            raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', not {cls.BOT_MODE!r}")
+        if cls.BOT_MODE == "webhook" and not cls.WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+        if cls.VERIFICATION_QUESTION_WEIGHTING not in ("uniform", "difficulty", "pass_rate"):
+            raise ValueError("VERIFICATION_QUESTION_WEIGHTING must be 'uniform', 'difficulty' or 'pass_rate', "
+                             f"not {cls.VERIFICATION_QUESTION_WEIGHTING!r}")
+        if cls.FSM_STORAGE not in ("sqlite", "memory"):
+            raise ValueError(f"FSM_STORAGE must be 'sqlite' or 'memory', not {cls.FSM_STORAGE!r}")
+        if cls.FSM_STORAGE == "memory" and cls.WEBHOOK_WORKERS > 1:
+            raise ValueError("WEBHOOK_WORKERS above 1 need FSM_STORAGE=sqlite to share flows")
+        if not cls.AI_HISTORY_PERSISTENT and cls.WEBHOOK_WORKERS > 1:
+            raise ValueError("WEBHOOK_WORKERS above 1 need AI_HISTORY_PERSISTENT=1 to share conversations")
+        if not 0 <= cls.AI_CACHE_SIMILARITY <= 1:
+            raise ValueError(f"AI_CACHE_SIMILARITY must be between 0 and 1, not {cls.AI_CACHE_SIMILARITY}")
+        if cls.DISPATCH_WORKERS > 1 and cls.WEBHOOK_WORKERS > 1:
+            raise ValueError("Use either DISPATCH_WORKERS or WEBHOOK_WORKERS above 1, not both")
         return True
 
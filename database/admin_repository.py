@@ -1,32 +1,104 @@
 """
 Admin repository for database operations
 """
-from typing import List, Optional
+import json
+import time
+from typing import Dict, FrozenSet, List, Optional
+from config import Config
 from database.db import db
+from database.cache_generations import CacheGeneration
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Active admins by user ID, loaded on demand and reloaded after
+# Config.ADMIN_CACHE_TTL seconds to pick up edits made outside the bot; edits
+# made by another process reach this one through the shared cache generation
+_admins: Optional[Dict[int, dict]] = None
+_loaded_at = 0.0
+_generation = CacheGeneration("admins")
+
+
+def _parse_permissions(raw: Optional[str]) -> FrozenSet[str]:
+    """Permissions column: JSON list or comma-separated names (empty = unrestricted)"""
+    if not raw:
+        return frozenset()
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        parsed = raw.split(",")
+    if isinstance(parsed, str):
+        parsed = [parsed]
+    return frozenset(str(p).strip() for p in parsed if str(p).strip())
+
 
 class AdminRepository:
     """Repository for admin database operations"""
     
+    @staticmethod
+    def _directory() -> Dict[int, dict]:
+        """Get the active admin set, reloading it when stale"""
+        global _admins, _loaded_at
+        
+        now = time.monotonic()
+        changed_elsewhere = _generation.changed()
+        if _admins is None or changed_elsewhere or now - _loaded_at >= Config.ADMIN_CACHE_TTL:
+            cursor = db.execute("SELECT * FROM admins WHERE status = 'active'")
+            admins = {}
+            for row in cursor.fetchall():
+                admin = dict(row)
+                admin['permissions'] = _parse_permissions(admin.get('permissions'))
+                admins[admin['user_id']] = admin
+            _admins, _loaded_at = admins, now
+        return _admins
+    
+    @staticmethod
+    def invalidate_cache():
+        """Drop the cached admin set after admins changed"""
+        global _admins
+        _admins = None
+        _generation.bump()
+    
     @staticmethod
     def is_admin(user_id: int) -> bool:
         """
         Check if user is admin.
         
+        Served from the in-memory admin set.
+        
         Args:
             user_id: Telegram user ID
             
         Returns:
             True if user is admin
         """
-        cursor = db.execute(
-            "SELECT COUNT(*) FROM admins WHERE user_id = ? AND status = 'active'",
-            (user_id,)
-        )
-        return cursor.fetchone()[0] > 0
+        return user_id in AdminRepository._directory()
+    
+    @staticmethod
+    def get_role(user_id: int) -> Optional[str]:
+        """Get the role of an active admin (None if not an admin)"""
+        admin = AdminRepository._directory().get(user_id)
+        return admin['role'] if admin else None
+    
+    @staticmethod
+    def has_permission(user_id: int, permission: str) -> bool:
+        """
+        Check an admin permission.
+        
+        Admins without a permissions list are unrestricted.
+        
+        Args:
+            user_id: Telegram user ID
+            permission: Permission name
+            
+        Returns:
+            True if user is an active admin allowed to use ``permission``
+        """
+        admin = AdminRepository._directory().get(user_id)
+        if not admin:
+            return False
+        permissions = admin['permissions']
+        return not permissions or permission in permissions or "*" in permissions
     
     @staticmethod
     def add_admin(user_id: int, role: str = "admin", 
@@ -52,6 +124,7 @@ class AdminRepository:
             """, (user_id, role, added_by))
             
             conn.commit()
+            AdminRepository.invalidate_cache()
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -71,6 +144,7 @@ class AdminRepository:
                 (user_id,)
             )
             conn.commit()
+            AdminRepository.invalidate_cache()
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -81,19 +155,10 @@ class AdminRepository:
     @staticmethod
     def get_all_admins() -> List[dict]:
         """Get all active admins"""
-        cursor = db.execute(
-            "SELECT * FROM admins WHERE status = 'active'"
-        )
-        admins = cursor.fetchall()
-        return [dict(a) for a in admins]
+        return [dict(a) for a in AdminRepository._directory().values()]
     
     @staticmethod
     def get_admin(user_id: int) -> Optional[dict]:
         """Get admin by user ID"""
-        cursor = db.execute(
-            "SELECT * FROM admins WHERE user_id = ? AND status = 'active'",
-            (user_id,)
-        )
-        admin = cursor.fetchone()
+        admin = AdminRepository._directory().get(user_id)
         return dict(admin) if admin else None
-
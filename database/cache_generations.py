@@ -0,0 +1,89 @@
+"""
+Cross-process invalidation of in-memory caches
+"""
+import sqlite3
+import time
+from typing import Optional
+from config import Config
+from database.db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheGeneration:
+    """
+    Generation counter of one in-memory cache, shared through the database.
+
+    Repositories keep hot tables in process memory. When a process changes
+    the underlying rows it drops its own copy and calls ``bump``; the other
+    processes notice the new generation through ``changed`` (checked at
+    most every ``Config.CACHE_SYNC_INTERVAL`` seconds) and drop theirs.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize counter.
+
+        Args:
+            name: Cache name (row in cache_generations)
+        """
+        self.name = name
+        self._seen: Optional[int] = None
+        self._checked_at = 0.0
+        # Set when a bump here skipped over a bump made elsewhere
+        self._missed = False
+
+    def _read(self) -> int:
+        row = db.execute(
+            "SELECT generation FROM cache_generations WHERE name = ?", (self.name,)
+        ).fetchone()
+        return row['generation'] if row else 0
+
+    def bump(self):
+        """
+        Tell other processes the cache changed.
+
+        The new generation is read in the same statement. If it is more
+        than one past the generation this process last saw, another process
+        bumped in between; the next ``changed`` then reports it at once, so
+        callers that only dropped part of their copy drop the rest too.
+        """
+        try:
+            row = db.execute("""
+                INSERT INTO cache_generations (name, generation) VALUES (?, 1)
+                ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+                RETURNING generation
+            """, (self.name,)).fetchone()
+            db.commit()
+        except sqlite3.OperationalError as e:
+            # cache_generations does not exist before migration v007
+            logger.debug(f"Could not bump cache generation {self.name}: {e}")
+            return
+        generation = row['generation']
+        if self._seen is not None and generation - 1 != self._seen:
+            self._missed = True
+        # This process already dropped its copy
+        self._seen = generation
+
+    def changed(self) -> bool:
+        """
+        Check whether another process changed the cache.
+
+        Returns:
+            True once per generation bumped elsewhere since the last check
+        """
+        if self._missed:
+            self._missed = False
+            return True
+        now = time.monotonic()
+        if now - self._checked_at < Config.CACHE_SYNC_INTERVAL:
+            return False
+        self._checked_at = now
+        try:
+            generation = self._read()
+        except sqlite3.OperationalError:
+            return False
+        changed = self._seen is not None and generation != self._seen
+        self._seen = generation
+        return changed
@@ -1,95 +1,325 @@
 """
 Database connection and initialization
 """
+import asyncio
 import sqlite3
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class Database:
-    """Database connection manager"""
-    
-    def __init__(self, db_path: str = "wushipay.db"):
+    """
+    Database connection manager.
+
+    Two access paths share the same SQLite file (WAL journal mode):
+
+    - The legacy synchronous API (``execute``/``commit``/``get_connection``)
+      on a single shared connection, kept for existing repositories and
+      the API server.
+    - An awaitable API (``fetch_one``/``fetch_all``/``execute_async``/...)
+      that runs statements off the event loop: reads go to a bounded pool
+      of reader threads (one connection per thread), writes go through a
+      single serialized writer thread and are committed per call.
+    """
+
+    def __init__(self, db_path: str = "wushipay.db", read_pool_size: int = 4):
         """
         Initialize database connection.
-        
+
         Args:
             db_path: Path to SQLite database file
+            read_pool_size: Maximum number of concurrent reader connections
         """
         self.db_path = db_path
+        self.read_pool_size = read_pool_size
         self.conn: Optional[sqlite3.Connection] = None
-    
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+
+    def _open(self, read_only: bool = False) -> sqlite3.Connection:
+        """
+        Open a new configured connection.
+
+        Args:
+            read_only: Reject writes on this connection
+
+        Returns:
+            SQLite connection object
+        """
+        # Ensure directory exists
+        db_dir = Path(self.db_path).parent
+        if db_dir and not db_dir.exists():
+            db_dir.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=30
+        )
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        # WAL lets readers run concurrently with the single writer
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if read_only:
+            conn.execute("PRAGMA query_only=1")
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
     def connect(self) -> sqlite3.Connection:
         """
         Create database connection.
-        
+
         Returns:
             SQLite connection object
         """
         if self.conn is None:
-            # Ensure directory exists
-            db_dir = Path(self.db_path).parent
-            if db_dir and not db_dir.exists():
-                db_dir.mkdir(parents=True, exist_ok=True)
-            
-            self.conn = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False
-            )
-            self.conn.row_factory = sqlite3.Row  # Enable column access by name
+            self.conn = self._open()
             logger.info(f"Connected to database: {self.db_path}")
-        
+
         return self.conn
-    
+
     def close(self):
-        """Close database connection"""
+        """Close all database connections and worker threads"""
+        for executor in (self._write_executor, self._read_executor):
+            if executor:
+                executor.shutdown(wait=True)
+        self._write_executor = None
+        self._read_executor = None
+
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing database connection: {e}")
+
+        self._local = threading.local()
         if self.conn:
-            self.conn.close()
             self.conn = None
             logger.info("Database connection closed")
-    
+
     def execute(self, query: str, params: tuple = ()):
         """
         Execute a query.
-        
+
         Args:
             query: SQL query string
             params: Query parameters
-            
+
         Returns:
             Cursor object
         """
         conn = self.connect()
         return conn.execute(query, params)
-    
+
     def executemany(self, query: str, params_list: list):
         """
         Execute a query with multiple parameter sets.
-        
+
         Args:
             query: SQL query string
             params_list: List of parameter tuples
-            
+
         Returns:
             Cursor object
         """
         conn = self.connect()
         return conn.executemany(query, params_list)
-    
+
     def commit(self):
         """Commit current transaction"""
         if self.conn:
             self.conn.commit()
-    
+
+    def rollback(self):
+        """Roll back current transaction"""
+        if self.conn:
+            self.conn.rollback()
+
     def get_connection(self) -> sqlite3.Connection:
         """Get database connection"""
         return self.connect()
 
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
 
-# Global database instance
-db = Database()
+    def _get_read_executor(self) -> ThreadPoolExecutor:
+        """Get (or lazily create) the bounded reader thread pool"""
+        if self._read_executor is None:
+            with self._lock:
+                if self._read_executor is None:
+                    self._read_executor = ThreadPoolExecutor(
+                        max_workers=self.read_pool_size,
+                        thread_name_prefix="db-reader"
+                    )
+        return self._read_executor
+
+    def _get_write_executor(self) -> ThreadPoolExecutor:
+        """Get (or lazily create) the single writer thread"""
+        if self._write_executor is None:
+            with self._lock:
+                if self._write_executor is None:
+                    self._write_executor = ThreadPoolExecutor(
+                        max_workers=1,
+                        thread_name_prefix="db-writer"
+                    )
+        return self._write_executor
+
+    def _thread_connection(self, read_only: bool) -> sqlite3.Connection:
+        """Get the connection owned by the current worker thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open(read_only=read_only)
+            self._local.conn = conn
+        return conn
+
+    def _run_read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``fn`` on this reader thread's connection"""
+        conn = self._thread_connection(read_only=True)
+        try:
+            return fn(conn)
+        finally:
+            # End the implicit read snapshot so the WAL can be checkpointed
+            if conn.in_transaction:
+                conn.rollback()
+
+    def _run_write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``fn`` on the writer connection inside one transaction"""
+        conn = self._thread_connection(read_only=False)
+        try:
+            result = fn(conn)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        Run a read-only callable on a pooled reader connection.
+
+        Args:
+            fn: Callable receiving a SQLite connection
+
+        Returns:
+            Whatever ``fn`` returns
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_read_executor(), self._run_read, fn)
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        Run a callable on the serialized writer connection in one transaction.
+
+        The transaction is committed when ``fn`` returns and rolled back
+        if it raises.
+
+        Args:
+            fn: Callable receiving a SQLite connection
+
+        Returns:
+            Whatever ``fn`` returns
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_write_executor(), self._run_write, fn)
 
+    async def fetch_one(self, query: str, params: tuple = ()) -> Optional[dict]:
+        """
+        Fetch a single row.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+
+        Returns:
+            Row dictionary or None
+        """
+        def _fetch(conn: sqlite3.Connection) -> Optional[dict]:
+            row = conn.execute(query, params).fetchone()
+            return dict(row) if row else None
+
+        return await self.read(_fetch)
+
+    async def fetch_all(self, query: str, params: tuple = ()) -> List[dict]:
+        """
+        Fetch all rows.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+
+        Returns:
+            List of row dictionaries
+        """
+        def _fetch(conn: sqlite3.Connection) -> List[dict]:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+        return await self.read(_fetch)
+
+    async def fetch_value(self, query: str, params: tuple = (), default: Any = None) -> Any:
+        """
+        Fetch the first column of the first row (e.g. ``COUNT(*)``).
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+            default: Value returned when there is no row or it is NULL
+
+        Returns:
+            Scalar value
+        """
+        def _fetch(conn: sqlite3.Connection) -> Any:
+            row = conn.execute(query, params).fetchone()
+            if row is None or row[0] is None:
+                return default
+            return row[0]
+
+        return await self.read(_fetch)
+
+    async def execute_async(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
+        """
+        Execute a write statement on the writer connection and commit.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+
+        Returns:
+            Cursor object (``rowcount``/``lastrowid`` are available)
+        """
+        return await self.transaction(lambda conn: conn.execute(query, params))
+
+    async def executemany_async(self, query: str, params_list: list) -> sqlite3.Cursor:
+        """
+        Execute a write statement for many parameter sets in one transaction.
+
+        Args:
+            query: SQL query string
+            params_list: List of parameter tuples
+
+        Returns:
+            Cursor object
+        """
+        return await self.transaction(lambda conn: conn.executemany(query, params_list))
+
+
+# Global database instance
+db = Database(
+    db_path=os.getenv("DB_PATH", "wushipay.db"),
+    read_pool_size=int(os.getenv("DB_READ_POOL_SIZE", "4"))
+)
@@ -0,0 +1,70 @@
+"""
+FSM state repository: rows behind the SQLite FSM storage
+"""
+import sqlite3
+from typing import List, Optional, Tuple
+from database.db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Hot queries (also checked by benchmarks/check_query_plans)
+FSM_LOAD_SQL = "SELECT state, data, expires_at FROM fsm_states WHERE storage_key = ?"
+FSM_PURGE_SQL = "DELETE FROM fsm_states WHERE expires_at <= ?"
+
+
+class FSMRepository:
+    """Repository for persisted FSM states"""
+
+    @staticmethod
+    async def load(storage_key: str) -> Optional[dict]:
+        """
+        Get the stored state of a key.
+
+        Args:
+            storage_key: Flattened aiogram storage key
+
+        Returns:
+            Row with state, data (JSON) and expires_at, or None
+        """
+        return await db.fetch_one(FSM_LOAD_SQL, (storage_key,))
+
+    @staticmethod
+    async def save(upserts: List[Tuple[str, Optional[str], str, float]], deletes: List[str],
+                   purge_before: Optional[float] = None) -> int:
+        """
+        Write a batch of state changes in one transaction.
+
+        Args:
+            upserts: (storage_key, state, data JSON, expires_at) rows to store
+            deletes: Storage keys whose flow ended
+            purge_before: Also delete every row expired before this timestamp
+
+        Returns:
+            Number of expired rows purged
+        """
+        def _save(conn: sqlite3.Connection) -> int:
+            if upserts:
+                conn.executemany("""
+                    INSERT INTO fsm_states (storage_key, state, data, expires_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(storage_key) DO UPDATE SET
+                        state = excluded.state,
+                        data = excluded.data,
+                        expires_at = excluded.expires_at
+                """, upserts)
+            if deletes:
+                conn.executemany(
+                    "DELETE FROM fsm_states WHERE storage_key = ?",
+                    [(key,) for key in deletes]
+                )
+            if purge_before is None:
+                return 0
+            return conn.execute(FSM_PURGE_SQL, (purge_before,)).rowcount
+
+        return await db.transaction(_save)
+
+    @staticmethod
+    async def count() -> int:
+        """Number of stored states (expired ones not yet purged included)"""
+        return await db.fetch_value("SELECT COUNT(*) FROM fsm_states", default=0)
@@ -0,0 +1,82 @@
+"""
+Process-local registry of groups already stored in the database
+"""
+from typing import Dict, Optional
+from datetime import datetime
+from database.db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class GroupRegistry:
+    """
+    Cache of ``group_id -> group_title`` for rows present in ``groups``.
+
+    Lets the group middleware skip the database entirely for groups it has
+    already seen, and only write when a group is new or its title changed.
+    Writes touch ``group_title`` only, never the verification settings.
+    """
+
+    def __init__(self):
+        """Initialize empty registry"""
+        self._titles: Dict[int, Optional[str]] = {}
+
+    def remember(self, group_id: int, group_title: Optional[str]):
+        """Record that the group is stored with the given title"""
+        self._titles[group_id] = group_title
+
+    def forget(self, group_id: int):
+        """Drop a group (e.g. after it was deleted)"""
+        self._titles.pop(group_id, None)
+
+    def clear(self):
+        """Drop all cached groups"""
+        self._titles.clear()
+
+    async def ensure_registered(self, group_id: int, group_title: Optional[str]) -> bool:
+        """
+        Make sure the group exists in the database with the current title.
+
+        Args:
+            group_id: Telegram chat ID
+            group_title: Current chat title
+
+        Returns:
+            True if the database was written
+        """
+        cached = self._titles.get(group_id, _MISSING)
+        if cached is _MISSING:
+            # First message since startup: look the group up once
+            row = await db.fetch_one(
+                "SELECT group_title FROM groups WHERE group_id = ?",
+                (group_id,)
+            )
+            if row is not None:
+                cached = row['group_title']
+                self._titles[group_id] = cached
+
+        if cached is not _MISSING and cached == group_title:
+            return False
+
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        await db.execute_async("""
+            INSERT INTO groups (group_id, group_title, created_at, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(group_id) DO UPDATE SET
+                group_title = excluded.group_title,
+                updated_at = excluded.updated_at
+        """, (group_id, group_title, now, now))
+        self._titles[group_id] = group_title
+
+        if cached is _MISSING:
+            logger.info(f"Registered new group {group_id}: {group_title}")
+        else:
+            logger.info(f"Group {group_id} title changed: {cached} -> {group_title}")
+        return True
+
+
+# Global group registry instance
+group_registry = GroupRegistry()
@@ -4,10 +4,21 @@ Group repository for database operations
 from typing import List, Optional
 from datetime import datetime
 from database.db import db
+from database.group_registry import group_registry
+from database.verified_members import verified_members
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Hot queries (also checked by benchmarks/check_query_plans)
+ALL_PENDING_MEMBERS_SQL = """
+    SELECT gm.*, g.group_title
+    FROM group_members gm
+    JOIN groups g ON gm.group_id = g.group_id
+    WHERE gm.status = 'pending'
+    ORDER BY gm.joined_at ASC
+"""
+
 
 class GroupRepository:
     """Repository for group database operations"""
@@ -44,6 +55,7 @@ class GroupRepository:
             
             cursor.execute("SELECT * FROM groups WHERE group_id = ?", (group_id,))
             group = cursor.fetchone()
+            group_registry.remember(group_id, group_title)
             return dict(group) if group else {}
             
         except Exception as e:
@@ -67,6 +79,13 @@ class GroupRepository:
         try:
             now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
             
+            # A rejoining member may replace a verified row
+            cursor.execute("""
+                SELECT status FROM group_members WHERE group_id = ? AND user_id = ?
+            """, (group_id, user_id))
+            previous = cursor.fetchone()
+            was_verified = previous is not None and previous['status'] == 'verified'
+            
             cursor.execute("""
                 INSERT OR REPLACE INTO group_members 
                 (group_id, user_id, status, joined_at)
@@ -74,6 +93,8 @@ class GroupRepository:
             """, (group_id, user_id, status, now))
             
             conn.commit()
+            if status == 'verified' or was_verified:
+                verified_members.set_status(group_id, user_id, status == 'verified')
             
             cursor.execute("""
                 SELECT * FROM group_members 
@@ -97,6 +118,8 @@ class GroupRepository:
             WHERE group_id = ? AND user_id = ?
         """, (now, group_id, user_id))
         db.commit()
+        if cursor.rowcount > 0:
+            verified_members.set_status(group_id, user_id, True)
         return cursor.rowcount > 0
     
     @staticmethod
@@ -112,12 +135,8 @@ class GroupRepository:
     
     @staticmethod
     def is_member_verified(group_id: int, user_id: int) -> bool:
-        """Check if member is verified"""
-        cursor = db.execute("""
-            SELECT COUNT(*) FROM group_members 
-            WHERE group_id = ? AND user_id = ? AND status = 'verified'
-        """, (group_id, user_id))
-        return cursor.fetchone()[0] > 0
+        """Check if member is verified (served from the in-memory verified member index)"""
+        return verified_members.is_verified(group_id, user_id)
     
     @staticmethod
     def set_verification_enabled(group_id: int, enabled: bool):
@@ -140,6 +159,8 @@ class GroupRepository:
             WHERE group_id = ? AND user_id = ?
         """, (now, group_id, user_id))
         db.commit()
+        if cursor.rowcount > 0:
+            verified_members.set_status(group_id, user_id, False)
         return cursor.rowcount > 0
     
     @staticmethod
@@ -161,6 +182,8 @@ class GroupRepository:
         try:
             cursor.execute("DELETE FROM groups WHERE group_id = ?", (group_id,))
             conn.commit()
+            group_registry.forget(group_id)
+            verified_members.forget(group_id)
             return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Error deleting group: {e}")
@@ -172,13 +195,7 @@ class GroupRepository:
     @staticmethod
     def get_all_pending_members() -> List[dict]:
         """Get all pending members across all groups"""
-        cursor = db.execute("""
-            SELECT gm.*, g.group_title 
-            FROM group_members gm
-            JOIN groups g ON gm.group_id = g.group_id
-            WHERE gm.status = 'pending'
-            ORDER BY gm.joined_at ASC
-        """)
+        cursor = db.execute(ALL_PENDING_MEMBERS_SQL)
         members = cursor.fetchall()
         return [dict(m) for m in members]
     
@@ -199,6 +216,8 @@ class GroupRepository:
                 WHERE status = 'pending'
             """, (now,))
         db.commit()
+        if cursor.rowcount > 0:
+            verified_members.forget(group_id, removed=False)
         return cursor.rowcount
     
     @staticmethod
@@ -218,5 +237,6 @@ class GroupRepository:
                 WHERE status = 'pending'
             """, (now,))
         db.commit()
+        # Pending members are not in the verified member index, nothing to drop
         return cursor.rowcount
 
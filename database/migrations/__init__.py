@@ -0,0 +1,6 @@
+"""
+Schema migrations, applied in order by ``database.migrator``.
+
+Each module is named ``v<NNN>_<description>.py`` and defines
+``upgrade(cursor)``; it runs once, inside its own transaction.
+"""
@@ -0,0 +1,709 @@
+"""
+Initial schema: tables, indexes, statistics rollups and default data.
+
+Written with IF NOT EXISTS / DROP IF EXISTS so it also brings databases
+created by ``init_database`` before migrations existed up to date.
+"""
+import sqlite3
+
+# Indexes created by earlier versions that duplicate a UNIQUE constraint or a
+# prefix of a composite index; they only cost writes
+REDUNDANT_INDEXES = [
+    "idx_transactions_user_id",
+    "idx_transactions_order_id",
+    "idx_transactions_status",
+    "idx_transactions_created_at",
+    "idx_transactions_payment_channel",
+    "idx_transactions_user_status",
+    "idx_admins_user_id",
+    "idx_group_members_group_id",
+    "idx_group_members_status",
+    "idx_referral_codes_code",
+    "idx_referrals_referred",
+    "idx_referral_rewards_user",
+    "idx_monthly_rankings_user_month",
+    "idx_verification_records_group_user",
+]
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Create the schema"""
+    # Users table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT PRIMARY KEY,
+            username VARCHAR(255),
+            first_name VARCHAR(255),
+            last_name VARCHAR(255),
+            language_code VARCHAR(10),
+            is_premium BOOLEAN DEFAULT 0,
+            vip_level INTEGER DEFAULT 0,
+            total_transactions INTEGER DEFAULT 0,
+            total_amount DECIMAL(15,2) DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(20) DEFAULT 'active'
+        )
+    """)
+
+    # Create indexes for users
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_username 
+        ON users(username)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_created_at 
+        ON users(created_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_status 
+        ON users(status)
+    """)
+
+    # Transactions table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id BIGINT NOT NULL,
+            order_id VARCHAR(64) UNIQUE NOT NULL,
+            transaction_type VARCHAR(20) NOT NULL,
+            payment_channel VARCHAR(20) NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+            fee DECIMAL(15,2) DEFAULT 0,
+            actual_amount DECIMAL(15,2) NOT NULL,
+            currency VARCHAR(10) DEFAULT 'CNY',
+            status VARCHAR(20) NOT NULL,
+            description TEXT,
+            payer_info VARCHAR(255),
+            payee_info VARCHAR(255),
+            qr_code_url TEXT,
+            payment_url TEXT,
+            callback_data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            paid_at TIMESTAMP,
+            expired_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    """)
+
+    # Create indexes for transactions (order_id is covered by its UNIQUE constraint)
+    # History filters: user + status/type/channel, newest first
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_status_created 
+        ON transactions(user_id, status, created_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_type_created 
+        ON transactions(user_id, transaction_type, created_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_channel_created 
+        ON transactions(user_id, payment_channel, created_at)
+    """)
+    # Transaction history pages (keyset on created_at, transaction_id)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_created 
+        ON transactions(user_id, created_at DESC, transaction_id DESC)
+    """)
+
+    # Rate configs table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_configs (
+            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel VARCHAR(20) NOT NULL,
+            vip_level INTEGER DEFAULT 0,
+            rate_percentage DECIMAL(5,4) NOT NULL,
+            min_amount DECIMAL(15,2) DEFAULT 1,
+            max_amount DECIMAL(15,2) DEFAULT 500000,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_rate_configs_channel_vip 
+        ON rate_configs(channel, vip_level)
+    """)
+
+    # Admins table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS admins (
+            admin_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id BIGINT UNIQUE NOT NULL,
+            role VARCHAR(20) DEFAULT 'admin',
+            permissions TEXT,
+            added_by BIGINT,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(20) DEFAULT 'active',
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    """)
+
+
+    # Groups table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS groups (
+            group_id BIGINT PRIMARY KEY,
+            group_title VARCHAR(255),
+            verification_enabled BOOLEAN DEFAULT 0,
+            verification_type VARCHAR(20) DEFAULT 'none',
+            welcome_message TEXT,
+            rules_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Group members (pending verification)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS group_members (
+            member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            status VARCHAR(20) DEFAULT 'pending',
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            verified_at TIMESTAMP,
+            FOREIGN KEY (group_id) REFERENCES groups(group_id),
+            UNIQUE(group_id, user_id)
+        )
+    """)
+
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_group_members_user_id 
+        ON group_members(user_id)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_group_members_status_joined 
+        ON group_members(status, joined_at)
+    """)
+
+    # Sensitive words table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sensitive_words (
+            word_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id BIGINT,
+            word VARCHAR(255) NOT NULL,
+            action VARCHAR(20) DEFAULT 'warn',
+            added_by BIGINT,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1,
+            FOREIGN KEY (group_id) REFERENCES groups(group_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sensitive_words_group_id 
+        ON sensitive_words(group_id)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sensitive_words_word 
+        ON sensitive_words(word)
+    """)
+
+    # Referral codes table (推荐码)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS referral_codes (
+            user_id BIGINT PRIMARY KEY,
+            referral_code VARCHAR(50) UNIQUE NOT NULL,
+            total_invites INTEGER DEFAULT 0,
+            successful_invites INTEGER DEFAULT 0,
+            total_rewards DECIMAL(15,2) DEFAULT 0,
+            lottery_entries INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    """)
+
+
+    # Referrals table (推荐关系)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS referrals (
+            referral_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            referrer_id BIGINT NOT NULL,
+            referred_id BIGINT NOT NULL,
+            referral_code VARCHAR(50) NOT NULL,
+            status VARCHAR(20) DEFAULT 'pending',
+            first_transaction_at TIMESTAMP,
+            reward_amount DECIMAL(15,2) DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (referrer_id) REFERENCES users(user_id),
+            FOREIGN KEY (referred_id) REFERENCES users(user_id),
+            UNIQUE(referred_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_referrals_referrer 
+        ON referrals(referrer_id)
+    """)
+
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_referrals_status 
+        ON referrals(status)
+    """)
+
+    # Referral rewards table (奖励记录)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS referral_rewards (
+            reward_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id BIGINT NOT NULL,
+            reward_type VARCHAR(20) NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+            referral_id INTEGER,
+            description TEXT,
+            status VARCHAR(20) DEFAULT 'pending',
+            paid_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (referral_id) REFERENCES referrals(referral_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_referral_rewards_user_created 
+        ON referral_rewards(user_id, created_at)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_referral_rewards_status 
+        ON referral_rewards(status)
+    """)
+
+    # Lottery entries table (抽奖记录)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lottery_entries (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id BIGINT NOT NULL,
+            prize_level INTEGER NOT NULL,
+            prize_amount DECIMAL(15,2) NOT NULL,
+            status VARCHAR(20) DEFAULT 'pending',
+            claimed_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lottery_entries_user 
+        ON lottery_entries(user_id)
+    """)
+
+    # Monthly rankings table (月度排行榜)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_rankings (
+            ranking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id BIGINT NOT NULL,
+            month VARCHAR(7) NOT NULL,
+            invite_count INTEGER DEFAULT 0,
+            rank INTEGER,
+            reward_amount DECIMAL(15,2) DEFAULT 0,
+            status VARCHAR(20) DEFAULT 'pending',
+            paid_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            UNIQUE(user_id, month)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_monthly_rankings_month 
+        ON monthly_rankings(month)
+    """)
+
+
+    # Verification questions table (审核问题库)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS verification_questions (
+            question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id BIGINT,
+            question_text TEXT NOT NULL,
+            question_type VARCHAR(20) NOT NULL DEFAULT 'single_choice',
+            correct_answer TEXT NOT NULL,
+            options TEXT,
+            difficulty VARCHAR(20) DEFAULT 'medium',
+            hint TEXT,
+            max_attempts INTEGER DEFAULT 3,
+            time_limit INTEGER DEFAULT 300,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (group_id) REFERENCES groups(group_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_verification_questions_group_id 
+        ON verification_questions(group_id)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_verification_questions_active 
+        ON verification_questions(is_active)
+    """)
+
+    # Verification records table (审核记录)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS verification_records (
+            record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            verification_type VARCHAR(50) NOT NULL,
+            ai_score INTEGER,
+            question_id INTEGER,
+            user_answer TEXT,
+            is_correct BOOLEAN,
+            result VARCHAR(20) NOT NULL,
+            attempt_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (group_id) REFERENCES groups(group_id),
+            FOREIGN KEY (question_id) REFERENCES verification_questions(question_id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_verification_records_group_user_created 
+        ON verification_records(group_id, user_id, created_at)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_verification_records_result 
+        ON verification_records(result)
+    """)
+
+    # Verification configs table (审核配置)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS verification_configs (
+            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id BIGINT UNIQUE NOT NULL,
+            verification_mode VARCHAR(20) DEFAULT 'question',
+            auto_approve_threshold INTEGER DEFAULT 80,
+            question_threshold_min INTEGER DEFAULT 60,
+            question_threshold_max INTEGER DEFAULT 80,
+            manual_threshold_min INTEGER DEFAULT 40,
+            manual_threshold_max INTEGER DEFAULT 60,
+            auto_reject_threshold INTEGER DEFAULT 40,
+            enable_time_strategy BOOLEAN DEFAULT 0,
+            question_selection_mode VARCHAR(20) DEFAULT 'random',
+            welcome_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (group_id) REFERENCES groups(group_id)
+        )
+    """)
+
+    # Wallet ledger: per-user balance of paid transactions
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS wallet_balances (
+            user_id BIGINT PRIMARY KEY,
+            balance DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_receive DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_pay DECIMAL(15,2) NOT NULL DEFAULT 0,
+            paid_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Wallet ledger: per-user daily rollups (UTC date of created_at)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS wallet_daily_stats (
+            user_id BIGINT NOT NULL,
+            stat_date DATE NOT NULL,
+            receive_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+            pay_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+            receive_count INTEGER NOT NULL DEFAULT 0,
+            pay_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, stat_date)
+        ) WITHOUT ROWID
+    """)
+
+    # AI conversations table (one compact JSON row per user)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ai_conversations (
+            user_id BIGINT PRIMARY KEY,
+            messages TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ai_conversations_updated_at 
+        ON ai_conversations(updated_at)
+    """)
+
+    for index_name in REDUNDANT_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+    # Admin statistics rollups and the triggers maintaining them (see
+    # database/stats_repository.py); later changes get their own migration
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_tx_hourly (
+            bucket TEXT NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            payment_channel VARCHAR(20) NOT NULL,
+            transaction_type VARCHAR(20) NOT NULL,
+            tx_count INTEGER NOT NULL DEFAULT 0,
+            amount_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, status, payment_channel, transaction_type)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_tx_daily (
+            stat_date DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            payment_channel VARCHAR(20) NOT NULL,
+            transaction_type VARCHAR(20) NOT NULL,
+            tx_count INTEGER NOT NULL DEFAULT 0,
+            amount_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, status, payment_channel, transaction_type)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_active_users_daily (
+            stat_date DATE NOT NULL,
+            user_id BIGINT NOT NULL,
+            tx_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, user_id)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_users_daily (
+            stat_date DATE PRIMARY KEY,
+            new_users INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_user_segments (
+            status VARCHAR(20) NOT NULL,
+            vip_level INTEGER NOT NULL,
+            user_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, vip_level)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_referrals_daily (
+            stat_date DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            referral_count INTEGER NOT NULL DEFAULT 0,
+            reward_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, status)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_tx_insert AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO stats_tx_hourly (bucket, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (strftime('%Y-%m-%d %H', NEW.created_at), NEW.status, NEW.payment_channel, NEW.transaction_type,
+                1, COALESCE(NEW.amount, 0))
+            ON CONFLICT(bucket, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_tx_daily (stat_date, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (DATE(NEW.created_at), NEW.status, NEW.payment_channel, NEW.transaction_type,
+                1, COALESCE(NEW.amount, 0))
+            ON CONFLICT(stat_date, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_active_users_daily (stat_date, user_id, tx_count)
+            VALUES (DATE(NEW.created_at), NEW.user_id, 1)
+            ON CONFLICT(stat_date, user_id) DO UPDATE SET tx_count = tx_count + excluded.tx_count;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_tx_update
+        AFTER UPDATE OF status, amount, payment_channel, transaction_type, created_at ON transactions
+        WHEN OLD.status IS NOT NEW.status OR OLD.amount IS NOT NEW.amount
+            OR OLD.payment_channel IS NOT NEW.payment_channel
+            OR OLD.transaction_type IS NOT NEW.transaction_type
+            OR OLD.created_at IS NOT NEW.created_at
+        BEGIN
+            INSERT INTO stats_tx_hourly (bucket, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (strftime('%Y-%m-%d %H', OLD.created_at), OLD.status, OLD.payment_channel, OLD.transaction_type,
+                -1, -COALESCE(OLD.amount, 0))
+            ON CONFLICT(bucket, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_tx_daily (stat_date, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (DATE(OLD.created_at), OLD.status, OLD.payment_channel, OLD.transaction_type,
+                -1, -COALESCE(OLD.amount, 0))
+            ON CONFLICT(stat_date, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_tx_hourly (bucket, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (strftime('%Y-%m-%d %H', NEW.created_at), NEW.status, NEW.payment_channel, NEW.transaction_type,
+                1, COALESCE(NEW.amount, 0))
+            ON CONFLICT(bucket, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_tx_daily (stat_date, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (DATE(NEW.created_at), NEW.status, NEW.payment_channel, NEW.transaction_type,
+                1, COALESCE(NEW.amount, 0))
+            ON CONFLICT(stat_date, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_tx_move
+        AFTER UPDATE OF user_id, created_at ON transactions
+        WHEN OLD.user_id IS NOT NEW.user_id OR DATE(OLD.created_at) IS NOT DATE(NEW.created_at)
+        BEGIN
+            INSERT INTO stats_active_users_daily (stat_date, user_id, tx_count)
+            VALUES (DATE(OLD.created_at), OLD.user_id, -1)
+            ON CONFLICT(stat_date, user_id) DO UPDATE SET tx_count = tx_count + excluded.tx_count;
+            INSERT INTO stats_active_users_daily (stat_date, user_id, tx_count)
+            VALUES (DATE(NEW.created_at), NEW.user_id, 1)
+            ON CONFLICT(stat_date, user_id) DO UPDATE SET tx_count = tx_count + excluded.tx_count;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_tx_delete AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO stats_tx_hourly (bucket, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (strftime('%Y-%m-%d %H', OLD.created_at), OLD.status, OLD.payment_channel, OLD.transaction_type,
+                -1, -COALESCE(OLD.amount, 0))
+            ON CONFLICT(bucket, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_tx_daily (stat_date, status, payment_channel, transaction_type, tx_count, amount_sum)
+            VALUES (DATE(OLD.created_at), OLD.status, OLD.payment_channel, OLD.transaction_type,
+                -1, -COALESCE(OLD.amount, 0))
+            ON CONFLICT(stat_date, status, payment_channel, transaction_type) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                amount_sum = amount_sum + excluded.amount_sum;
+            INSERT INTO stats_active_users_daily (stat_date, user_id, tx_count)
+            VALUES (DATE(OLD.created_at), OLD.user_id, -1)
+            ON CONFLICT(stat_date, user_id) DO UPDATE SET tx_count = tx_count + excluded.tx_count;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert AFTER INSERT ON users
+        BEGIN
+            INSERT INTO stats_users_daily (stat_date, new_users)
+            VALUES (DATE(NEW.created_at), 1)
+            ON CONFLICT(stat_date) DO UPDATE SET new_users = new_users + 1;
+            INSERT INTO stats_user_segments (status, vip_level, user_count)
+            VALUES (COALESCE(NEW.status, 'active'), COALESCE(NEW.vip_level, 0), 1)
+            ON CONFLICT(status, vip_level) DO UPDATE SET user_count = user_count + excluded.user_count;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_users_update AFTER UPDATE OF status, vip_level ON users
+        WHEN OLD.status IS NOT NEW.status OR OLD.vip_level IS NOT NEW.vip_level
+        BEGIN
+            INSERT INTO stats_user_segments (status, vip_level, user_count)
+            VALUES (COALESCE(OLD.status, 'active'), COALESCE(OLD.vip_level, 0), -1)
+            ON CONFLICT(status, vip_level) DO UPDATE SET user_count = user_count + excluded.user_count;
+            INSERT INTO stats_user_segments (status, vip_level, user_count)
+            VALUES (COALESCE(NEW.status, 'active'), COALESCE(NEW.vip_level, 0), 1)
+            ON CONFLICT(status, vip_level) DO UPDATE SET user_count = user_count + excluded.user_count;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete AFTER DELETE ON users
+        BEGIN
+            UPDATE stats_users_daily SET new_users = new_users - 1 WHERE stat_date = DATE(OLD.created_at);
+            INSERT INTO stats_user_segments (status, vip_level, user_count)
+            VALUES (COALESCE(OLD.status, 'active'), COALESCE(OLD.vip_level, 0), -1)
+            ON CONFLICT(status, vip_level) DO UPDATE SET user_count = user_count + excluded.user_count;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_referrals_insert AFTER INSERT ON referrals
+        BEGIN
+            INSERT INTO stats_referrals_daily (stat_date, status, referral_count, reward_sum)
+            VALUES (DATE(NEW.created_at), COALESCE(NEW.status, 'pending'), 1,
+                COALESCE(NEW.reward_amount, 0))
+            ON CONFLICT(stat_date, status) DO UPDATE SET
+                referral_count = referral_count + excluded.referral_count,
+                reward_sum = reward_sum + excluded.reward_sum;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_referrals_update
+        AFTER UPDATE OF status, reward_amount, created_at ON referrals
+        WHEN OLD.status IS NOT NEW.status OR OLD.reward_amount IS NOT NEW.reward_amount
+            OR OLD.created_at IS NOT NEW.created_at
+        BEGIN
+            INSERT INTO stats_referrals_daily (stat_date, status, referral_count, reward_sum)
+            VALUES (DATE(OLD.created_at), COALESCE(OLD.status, 'pending'), -1,
+                -COALESCE(OLD.reward_amount, 0))
+            ON CONFLICT(stat_date, status) DO UPDATE SET
+                referral_count = referral_count + excluded.referral_count,
+                reward_sum = reward_sum + excluded.reward_sum;
+            INSERT INTO stats_referrals_daily (stat_date, status, referral_count, reward_sum)
+            VALUES (DATE(NEW.created_at), COALESCE(NEW.status, 'pending'), 1,
+                COALESCE(NEW.reward_amount, 0))
+            ON CONFLICT(stat_date, status) DO UPDATE SET
+                referral_count = referral_count + excluded.referral_count,
+                reward_sum = reward_sum + excluded.reward_sum;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_referrals_delete AFTER DELETE ON referrals
+        BEGIN
+            INSERT INTO stats_referrals_daily (stat_date, status, referral_count, reward_sum)
+            VALUES (DATE(OLD.created_at), COALESCE(OLD.status, 'pending'), -1,
+                -COALESCE(OLD.reward_amount, 0))
+            ON CONFLICT(stat_date, status) DO UPDATE SET
+                referral_count = referral_count + excluded.referral_count,
+                reward_sum = reward_sum + excluded.reward_sum;
+        END
+    """)
+
+    # Initialize default questions (全局默认问题)
+    cursor.execute("SELECT COUNT(*) FROM verification_questions WHERE group_id IS NULL")
+    if cursor.fetchone()[0] == 0:
+        default_questions = [
+            ('伍拾支付的主要功能是什么？', 'fill_blank', '支付|转账|USDT|数字资产', 'easy', '提示：我们是一个支付平台', 3, 300),
+            ('USDT是什么？', 'fill_blank', 'USDT|泰达币|稳定币', 'easy', '提示：一种数字货币', 3, 300),
+            ('本群是否允许发送广告？', 'true_false', '否|不允许|禁止|不', 'medium', '请查看群组规则', 3, 300),
+            ('请回答：3+5=？', 'fill_blank', '8|八', 'easy', '简单的数学题', 3, 180),
+        ]
+        cursor.executemany("""
+            INSERT INTO verification_questions 
+            (group_id, question_text, question_type, correct_answer, difficulty, hint, max_attempts, time_limit)
+            VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)
+        """, default_questions)
+
+    # Initialize default rate configs
+    cursor.execute("SELECT COUNT(*) FROM rate_configs")
+    if cursor.fetchone()[0] == 0:
+        default_rates = [
+            ('alipay', 0, 0.0060, 1, 500000, 1),
+            ('alipay', 1, 0.0055, 1, 500000, 1),
+            ('alipay', 2, 0.0050, 1, 500000, 1),
+            ('alipay', 3, 0.0045, 1, 500000, 1),
+            ('wechat', 0, 0.0060, 1, 500000, 1),
+            ('wechat', 1, 0.0055, 1, 500000, 1),
+            ('wechat', 2, 0.0050, 1, 500000, 1),
+            ('wechat', 3, 0.0045, 1, 500000, 1),
+        ]
+        cursor.executemany("""
+            INSERT INTO rate_configs 
+            (channel, vip_level, rate_percentage, min_amount, max_amount, is_active)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, default_rates)
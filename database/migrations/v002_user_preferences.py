@@ -0,0 +1,18 @@
+"""
+Per-user message counter and language preference.
+"""
+import sqlite3
+
+_COLUMNS = [
+    ("message_count", "INTEGER NOT NULL DEFAULT 0"),
+    # Language chosen in settings; overrides Telegram's language_code
+    ("preferred_language", "VARCHAR(10)"),
+]
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Add the columns to users"""
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(users)").fetchall()}
+    for column, definition in _COLUMNS:
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
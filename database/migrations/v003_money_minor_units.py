@@ -0,0 +1,111 @@
+"""
+Integer minor-unit money columns.
+
+SQLite stores DECIMAL columns as REAL, so sums drift by float noise. Every
+money column gets an INTEGER ``*_minor`` counterpart (fen for CNY,
+micro-USDT for rewards) that becomes the source of truth; the REAL columns
+stay as display copies written from the integers. The wallet ledger is
+derived data and is recreated with integer columns only.
+"""
+import sqlite3
+from typing import List, Optional, Tuple
+from utils.money import to_minor
+
+# (table, key column, [(REAL column, minor column)], currency column, fixed currency)
+_MONEY_COLUMNS: List[Tuple[str, str, List[Tuple[str, str]], Optional[str], str]] = [
+    ("transactions", "transaction_id",
+     [("amount", "amount_minor"), ("fee", "fee_minor"), ("actual_amount", "actual_amount_minor")],
+     "currency", "CNY"),
+    ("users", "user_id", [("total_amount", "total_amount_minor")], None, "CNY"),
+    # Referral rewards are paid in USDT
+    ("referral_codes", "user_id", [("total_rewards", "total_rewards_minor")], None, "USDT"),
+    ("referrals", "referral_id", [("reward_amount", "reward_minor")], None, "USDT"),
+    ("referral_rewards", "reward_id", [("amount", "amount_minor")], None, "USDT"),
+]
+
+
+def _add_and_backfill(cursor: sqlite3.Cursor, table: str, key: str,
+                      columns: List[Tuple[str, str]], currency_column: Optional[str],
+                      currency: str):
+    """Add the minor columns and fill them from the REAL columns"""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    for _, minor in columns:
+        if minor not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {minor} INTEGER NOT NULL DEFAULT 0")
+
+    # Converted in Python: to_minor goes through the shortest float repr, so a
+    # stored 0.145 becomes 15 fen where SQL ROUND(0.145 * 100) gives 14
+    selected = [key] + [real for real, _ in columns] + ([currency_column] if currency_column else [])
+    rows = cursor.execute(f"SELECT {', '.join(selected)} FROM {table}").fetchall()
+    updates = []
+    for row in rows:
+        row_currency = (row[-1] if currency_column else currency) or currency
+        values = [to_minor(row[i + 1] or 0, row_currency) for i in range(len(columns))]
+        updates.append(values + [row[0]])
+    if updates:
+        assignments = ", ".join(f"{minor} = ?" for _, minor in columns)
+        cursor.executemany(f"UPDATE {table} SET {assignments} WHERE {key} = ?", updates)
+
+
+def _recreate_wallet_ledger(cursor: sqlite3.Cursor):
+    """Recreate the wallet ledger with integer columns and refill it exactly"""
+    cursor.execute("DROP TABLE IF EXISTS wallet_balances")
+    cursor.execute("DROP TABLE IF EXISTS wallet_daily_stats")
+
+    cursor.execute("""
+        CREATE TABLE wallet_balances (
+            user_id BIGINT PRIMARY KEY,
+            balance_minor INTEGER NOT NULL DEFAULT 0,
+            total_receive_minor INTEGER NOT NULL DEFAULT 0,
+            total_pay_minor INTEGER NOT NULL DEFAULT 0,
+            paid_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE wallet_daily_stats (
+            user_id BIGINT NOT NULL,
+            stat_date DATE NOT NULL,
+            receive_minor INTEGER NOT NULL DEFAULT 0,
+            pay_minor INTEGER NOT NULL DEFAULT 0,
+            receive_count INTEGER NOT NULL DEFAULT 0,
+            pay_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, stat_date)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        INSERT INTO wallet_balances
+        (user_id, balance_minor, total_receive_minor, total_pay_minor, paid_count, updated_at)
+        SELECT user_id,
+               SUM(CASE transaction_type
+                   WHEN 'receive' THEN actual_amount_minor
+                   WHEN 'pay' THEN -actual_amount_minor
+                   ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'receive' THEN actual_amount_minor ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'pay' THEN actual_amount_minor ELSE 0 END),
+               SUM(CASE WHEN transaction_type IN ('receive', 'pay') THEN 1 ELSE 0 END),
+               CURRENT_TIMESTAMP
+        FROM transactions
+        WHERE status = 'paid'
+        GROUP BY user_id
+    """)
+    cursor.execute("""
+        INSERT INTO wallet_daily_stats
+        (user_id, stat_date, receive_minor, pay_minor, receive_count, pay_count)
+        SELECT user_id, DATE(created_at),
+               SUM(CASE WHEN transaction_type = 'receive' THEN actual_amount_minor ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'pay' THEN actual_amount_minor ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'receive' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN transaction_type = 'pay' THEN 1 ELSE 0 END)
+        FROM transactions
+        WHERE status = 'paid'
+        GROUP BY user_id, DATE(created_at)
+    """)
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Add minor-unit columns and move the wallet ledger to them"""
+    for table, key, columns, currency_column, currency in _MONEY_COLUMNS:
+        _add_and_backfill(cursor, table, key, columns, currency_column, currency)
+    _recreate_wallet_ledger(cursor)
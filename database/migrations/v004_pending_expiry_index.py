@@ -0,0 +1,17 @@
+"""
+Partial index for the pending-order expiry sweep.
+
+Only pending rows are indexed, so the index stays as small as the set of
+open orders and the sweep's ``status = 'pending' AND expired_at < ?`` seek
+never touches settled history.
+"""
+import sqlite3
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Create the partial index"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_pending_expiry
+        ON transactions(expired_at)
+        WHERE status = 'pending'
+    """)
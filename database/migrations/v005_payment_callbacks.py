@@ -0,0 +1,20 @@
+"""
+Idempotency keys of ingested payment callbacks.
+
+A gateway retries a notification until it gets a 2xx, so the same
+``(order_id, status)`` can arrive many times; only the first is applied.
+"""
+import sqlite3
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Create payment_callbacks"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payment_callbacks (
+            order_id VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            result VARCHAR(20) NOT NULL,
+            received_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (order_id, status)
+        ) WITHOUT ROWID
+    """)
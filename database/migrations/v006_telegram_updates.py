@@ -0,0 +1,18 @@
+"""
+Recently received Telegram update ids.
+
+In webhook mode Telegram redelivers an update it got no 200 for, and with
+several worker processes the retry may reach a different worker than the
+original; claiming the ``update_id`` here makes each update run once.
+"""
+import sqlite3
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Create telegram_updates"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS telegram_updates (
+            update_id INTEGER PRIMARY KEY,
+            received_at TIMESTAMP NOT NULL
+        )
+    """)
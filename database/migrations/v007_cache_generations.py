@@ -0,0 +1,18 @@
+"""
+Generation counters of in-memory caches.
+
+Several processes may serve the bot at once (dispatch workers, webhook
+workers, the API server); bumping a cache's generation here tells the other
+processes to drop their copy.
+"""
+import sqlite3
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Create cache_generations"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name VARCHAR(50) PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
@@ -0,0 +1,20 @@
+"""
+Persistent FSM state of multi-step flows (payment, calculator).
+
+One row per storage key; rows past ``expires_at`` are abandoned flows and
+are purged in batches by ``services/fsm_storage``.
+"""
+import sqlite3
+
+
+def upgrade(cursor: sqlite3.Cursor):
+    """Create fsm_states"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            storage_key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fsm_states_expires ON fsm_states(expires_at)")
@@ -0,0 +1,119 @@
+"""
+Versioned schema migrations.
+
+Migrations live in ``database/migrations`` as ``v<NNN>_<description>.py``
+modules with an ``upgrade(cursor)`` function. Applied versions are recorded
+in ``schema_version``; at startup a single ``MAX(version)`` query decides
+whether anything needs to run.
+
+Each migration runs in its own ``BEGIN IMMEDIATE`` transaction: a failing
+migration rolls back completely (SQLite DDL is transactional) and leaves the
+recorded version untouched. Under WAL, readers in other processes (the API
+server) keep working while an index is built; their writes wait for the
+migration through ``busy_timeout``, so index builds on large tables should
+get a migration of their own to keep that window short.
+"""
+import importlib
+import pkgutil
+import re
+import sqlite3
+import logging
+from datetime import datetime
+from typing import List, Tuple
+from database import migrations
+
+logger = logging.getLogger(__name__)
+
+_MIGRATION_NAME = re.compile(r"^v(\d+)_\w+$")
+
+
+def discover() -> List[Tuple[int, str]]:
+    """
+    Find migration modules.
+
+    Returns:
+        List of (version, module name) ordered by version
+    """
+    found = []
+    for module in pkgutil.iter_modules(migrations.__path__):
+        match = _MIGRATION_NAME.match(module.name)
+        if match:
+            found.append((int(match.group(1)), module.name))
+    found.sort()
+
+    versions = [version for version, _ in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {[name for _, name in found]}")
+    return found
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """
+    Get the applied schema version.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        Highest applied version (0 for a database without migrations)
+    """
+    try:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0  # schema_version does not exist yet
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply pending migrations.
+
+    Args:
+        conn: Database connection (no transaction may be open)
+
+    Returns:
+        Number of migrations applied
+    """
+    available = discover()
+    current = get_version(conn)
+    if available and current >= available[-1][0]:
+        return 0
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+    conn.commit()
+
+    applied = 0
+    for version, name in available:
+        if version <= current:
+            continue
+
+        module = importlib.import_module(f"{migrations.__name__}.{name}")
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            module.upgrade(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {name} failed, schema stays at version {current}")
+            raise
+        finally:
+            cursor.close()
+
+        current = version
+        applied += 1
+        logger.info(f"Applied migration {name}")
+
+    if applied:
+        # Refresh planner statistics for new indexes
+        conn.execute("PRAGMA optimize")
+    return applied
@@ -0,0 +1,77 @@
+"""
+Payment callback repository: idempotent, batched status changes
+"""
+import sqlite3
+from typing import List, Optional, Tuple
+from datetime import datetime
+from database.db import db
+from database.transaction_repository import TransactionRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (order_id, status, paid_at)
+Callback = Tuple[str, str, Optional[str]]
+
+
+class PaymentCallbackRepository:
+    """Repository for ingested payment callbacks"""
+
+    @staticmethod
+    def _apply_one(cursor: sqlite3.Cursor, callback: Callback, now: str) -> str:
+        """Apply one callback unless its (order_id, status) key was seen before"""
+        order_id, status, paid_at = callback
+        cursor.execute("""
+            INSERT OR IGNORE INTO payment_callbacks (order_id, status, result, received_at)
+            VALUES (?, ?, 'pending', ?)
+        """, (order_id, status, now))
+        if cursor.rowcount == 0:
+            return "duplicate"
+
+        result = TransactionRepository.apply_status_change(cursor, order_id, status, paid_at, now)
+        if result in ("unknown_order", "rejected"):
+            # Not recorded: the gateway may retry once the order exists or,
+            # for a callback that arrived out of order, once the order reached
+            # a status the transition is allowed from
+            cursor.execute("DELETE FROM payment_callbacks WHERE order_id = ? AND status = ?",
+                           (order_id, status))
+        else:
+            cursor.execute("UPDATE payment_callbacks SET result = ? WHERE order_id = ? AND status = ?",
+                           (result, order_id, status))
+        return result
+
+    @staticmethod
+    async def apply_batch(callbacks: List[Callback]) -> List[str]:
+        """
+        Apply a batch of callbacks in one write transaction.
+
+        Each callback runs in its own savepoint, so one failing callback is
+        rolled back alone and reported as "error" while the others commit.
+
+        Args:
+            callbacks: (order_id, status, paid_at) tuples in arrival order
+
+        Returns:
+            Result per callback: "applied", "duplicate", "unchanged",
+            "rejected", "unknown_order" or "error"
+        """
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+        def _apply(conn: sqlite3.Connection) -> List[str]:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            results = []
+            for callback in callbacks:
+                cursor.execute("SAVEPOINT payment_callback")
+                try:
+                    results.append(PaymentCallbackRepository._apply_one(cursor, callback, now))
+                    cursor.execute("RELEASE payment_callback")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO payment_callback")
+                    cursor.execute("RELEASE payment_callback")
+                    logger.error(f"Error applying payment callback {callback}: {e}", exc_info=True)
+                    results.append("error")
+            return results
+
+        return await db.transaction(_apply)
@@ -1,60 +1,165 @@
 """
 Rate configuration repository for database operations
 """
-from typing import Optional
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from config import Config
 from database.db import db
+from database.cache_generations import CacheGeneration
+from utils.money import apply_rate, apply_rate_batch, rate_to_ppm
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rate used when no active configuration matches (0.6%)
+DEFAULT_RATE = 0.0060
+DEFAULT_RATE_PPM = rate_to_ppm(DEFAULT_RATE)
+
+# Active rate configurations by (channel, VIP level), loaded on demand into a
+# read-only table and reloaded after Config.RATE_CACHE_TTL seconds to pick up
+# edits made outside the bot; edits made by another process reach this one
+# through the shared cache generation
+_rates: Optional[Mapping[Tuple[str, int], Mapping]] = None
+_loaded_at = 0.0
+_generation = CacheGeneration("rates")
+
 
 class RateRepository:
     """Repository for rate configuration database operations"""
     
+    @staticmethod
+    def _table() -> Mapping[Tuple[str, int], Mapping]:
+        """Get the active rate table, reloading it when stale"""
+        global _rates, _loaded_at
+        
+        now = time.monotonic()
+        changed_elsewhere = _generation.changed()
+        if _rates is None or changed_elsewhere or now - _loaded_at >= Config.RATE_CACHE_TTL:
+            cursor = db.execute("""
+                SELECT * FROM rate_configs
+                WHERE is_active = 1
+                ORDER BY config_id DESC
+            """)
+            rates = {}
+            for row in cursor.fetchall():
+                rate = dict(row)
+                rate['rate_percentage'] = float(rate['rate_percentage'])
+                # Precomputed integer rate for fee arithmetic
+                rate['rate_ppm'] = rate_to_ppm(rate['rate_percentage'])
+                # Newest row wins, like the former LIMIT 1 lookup on the index
+                rates.setdefault((rate['channel'], rate['vip_level']), MappingProxyType(rate))
+            _rates, _loaded_at = MappingProxyType(rates), now
+        return _rates
+    
+    @staticmethod
+    def invalidate_cache():
+        """Drop the cached rate table after rates changed"""
+        global _rates
+        _rates = None
+        _generation.bump()
+    
     @staticmethod
     def get_rate(channel: str, vip_level: int = 0) -> Optional[dict]:
         """
         Get rate configuration.
         
+        Served from the in-memory rate table.
+        
         Args:
             channel: Payment channel (alipay, wechat)
             vip_level: VIP level (0-3)
-            
+        
         Returns:
             Rate configuration dict or None
         """
-        cursor = db.execute("""
-            SELECT * FROM rate_configs 
-            WHERE channel = ? AND vip_level = ? AND is_active = 1
-            LIMIT 1
-        """, (channel, vip_level))
-        
-        rate = cursor.fetchone()
+        rate = RateRepository._table().get((channel, vip_level))
         return dict(rate) if rate else None
     
     @staticmethod
-    def calculate_fee(amount: float, channel: str, vip_level: int = 0) -> tuple:
+    def get_rate_value(channel: str, vip_level: int = 0) -> float:
+        """Get the fee rate as a fraction (DEFAULT_RATE if none is configured)"""
+        rate = RateRepository._table().get((channel, vip_level))
+        return rate['rate_percentage'] if rate else DEFAULT_RATE
+    
+    @staticmethod
+    def get_rate_ppm(channel: str, vip_level: int = 0) -> int:
+        """Get the fee rate in parts per million (DEFAULT_RATE_PPM if none is configured)"""
+        rate = RateRepository._table().get((channel, vip_level))
+        return rate['rate_ppm'] if rate else DEFAULT_RATE_PPM
+    
+    @staticmethod
+    def get_channel_rates(vip_level: int = 0) -> Dict[str, dict]:
         """
-        Calculate fee and actual amount.
+        Get the rate configuration of every channel for a VIP level.
+        
+        Args:
+            vip_level: VIP level (0-3)
+        
+        Returns:
+            Dictionary of channel -> rate configuration dict
+        """
+        return {
+            channel: dict(rate)
+            for (channel, level), rate in RateRepository._table().items()
+            if level == vip_level
+        }
+    
+    @staticmethod
+    def set_rate(channel: str, vip_level: int, rate_percentage: float) -> bool:
+        """
+        Set the fee rate of a channel and VIP level.
         
         Args:
-            amount: Transaction amount
             channel: Payment channel
             vip_level: VIP level
-            
+            rate_percentage: Fee rate as a fraction (0.006 = 0.6%)
+        
         Returns:
-            Tuple of (fee, actual_amount)
+            True if an active configuration was updated
+        """
+        try:
+            cursor = db.execute("""
+                UPDATE rate_configs
+                SET rate_percentage = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE channel = ? AND vip_level = ? AND is_active = 1
+            """, (rate_percentage, channel, vip_level))
+            db.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error setting rate: {e}")
+            return False
+        finally:
+            RateRepository.invalidate_cache()
+    
+    @staticmethod
+    def calculate_fee(amount_minor: int, channel: str, vip_level: int = 0) -> tuple:
         """
-        rate_config = RateRepository.get_rate(channel, vip_level)
+        Calculate fee and actual amount.
         
-        if not rate_config:
-            # Default rate 0.6%
-            rate = 0.0060
-        else:
-            rate = float(rate_config['rate_percentage'])
+        The fee is rounded half up to the minor unit.
         
-        fee = round(amount * rate, 2)
-        actual_amount = round(amount - fee, 2)
+        Args:
+            amount_minor: Transaction amount in minor units
+            channel: Payment channel
+            vip_level: VIP level
         
-        return fee, actual_amount
-
+        Returns:
+            Tuple of (fee_minor, actual_amount_minor)
+        """
+        return apply_rate(amount_minor, RateRepository.get_rate_ppm(channel, vip_level))
+    
+    @staticmethod
+    def calculate_fees(amounts_minor: Iterable[int], channel: str, vip_level: int = 0) -> List[tuple]:
+        """
+        Calculate fees for a batch of amounts with one rate lookup.
+        
+        Args:
+            amounts_minor: Transaction amounts in minor units
+            channel: Payment channel
+            vip_level: VIP level
+        
+        Returns:
+            List of (fee_minor, actual_amount_minor) in input order
+        """
+        return apply_rate_batch(amounts_minor, RateRepository.get_rate_ppm(channel, vip_level))
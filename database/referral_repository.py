@@ -3,13 +3,38 @@ Referral repository for database operations
 """
 import logging
 import random
+import sqlite3
 import string
+from decimal import Decimal, ROUND_DOWN
 from typing import Optional, List, Dict
 from datetime import datetime
 from database.db import db
+from utils.money import convert_minor, from_minor, to_minor
 
 logger = logging.getLogger(__name__)
 
+# Hot queries (also checked by benchmarks/check_query_plans)
+OPEN_REFERRAL_SQL = """
+    SELECT * FROM referrals WHERE referred_id = ? AND status NOT IN ('rewarded', 'first_transaction')
+"""
+FIRST_TRANSACTION_REWARD_SQL = """
+    SELECT 1 FROM referral_rewards WHERE user_id = ? AND reward_type = 'new_user_bonus' LIMIT 1
+"""
+USER_REWARDS_SQL = """
+    SELECT * FROM referral_rewards
+    WHERE user_id = ?
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+
+# Referral rewards, in micro-USDT
+INVITE_REWARD_MINOR = to_minor(10, "USDT")
+DIVIDEND_CAP_MINOR = to_minor(100, "USDT")
+# Share of the referred user's first transaction paid out as dividend
+DIVIDEND_RATE = Decimal("0.01")
+# Bonus for a new user's first paid transaction
+NEW_USER_BONUS_MINOR = to_minor(5, "USDT")
+
 
 class ReferralRepository:
     """Repository for referral database operations"""
@@ -91,7 +116,7 @@ class ReferralRepository:
             return {
                 'total_invites': 0,
                 'successful_invites': 0,
-                'total_rewards': 0.0,
+                'total_rewards': Decimal(0),
                 'lottery_entries': 0,
                 'referral_code': None
             }
@@ -99,107 +124,149 @@ class ReferralRepository:
         return {
             'total_invites': code_info['total_invites'] or 0,
             'successful_invites': code_info['successful_invites'] or 0,
-            'total_rewards': float(code_info['total_rewards'] or 0),
+            'total_rewards': from_minor(code_info['total_rewards_minor'], "USDT"),
             'lottery_entries': code_info['lottery_entries'] or 0,
             'referral_code': code_info['referral_code']
         }
     
     @staticmethod
-    def update_referral_status(referred_id: int, status: str, transaction_amount: float = 0.0):
-        """Update referral status when user completes first transaction"""
+    def has_first_transaction_reward(cursor: sqlite3.Cursor, user_id: int) -> bool:
+        """Whether the user already got the first-transaction rewards"""
+        cursor.execute(FIRST_TRANSACTION_REWARD_SQL, (user_id,))
+        return cursor.fetchone() is not None
+    
+    @staticmethod
+    def apply_first_transaction(cursor: sqlite3.Cursor, user_id: int,
+                                transaction_amount_minor: int, now: str):
+        """
+        Grant the rewards of a user's first paid transaction.
+        
+        Rewards the referrer (if any, once) and gives the new user the
+        first-transaction bonus. Runs on the caller's cursor so it commits or
+        rolls back together with the status change.
+        
+        Args:
+            cursor: Cursor inside the caller's transaction
+            user_id: User who completed the first transaction
+            transaction_amount_minor: Transaction amount in fen
+            now: Current UTC timestamp
+        """
+        ReferralRepository._reward_referrer(cursor, user_id, 'rewarded', transaction_amount_minor, now)
+        ReferralRepository._insert_reward(
+            cursor, user_id, 'new_user_bonus', NEW_USER_BONUS_MINOR, None,
+            "新用户首次交易红包", now
+        )
+    
+    @staticmethod
+    def _reward_referrer(cursor: sqlite3.Cursor, referred_id: int, status: str,
+                         transaction_amount_minor: int, now: str) -> bool:
+        """Mark the referral of ``referred_id`` and reward its referrer"""
+        # Check if referral exists and not already rewarded
+        cursor.execute(OPEN_REFERRAL_SQL, (referred_id,))
+        referral = cursor.fetchone()
+        
+        if not referral:
+            return False
+        
+        referrer_id = referral['referrer_id']
+        referral_id = referral['referral_id']
+        
+        # Calculate rewards in micro-USDT: 1% of the transaction (1 CNY
+        # counts as 1 USDT, as before), rounded down, capped at 100 USDT
+        invite_reward = INVITE_REWARD_MINOR
+        dividend_reward = min(
+            convert_minor(transaction_amount_minor, "CNY", "USDT", DIVIDEND_RATE, ROUND_DOWN),
+            DIVIDEND_CAP_MINOR
+        )
+        total_reward = invite_reward + dividend_reward
+        
+        # Update referral status (reward_amount is a display copy)
+        cursor.execute("""
+            UPDATE referrals 
+            SET status = ?, first_transaction_at = ?, reward_minor = ?, reward_amount = ?,
+                updated_at = ?
+            WHERE referral_id = ?
+        """, (status, now, total_reward, float(from_minor(total_reward, "USDT")), now, referral_id))
+        
+        # Update referral code stats; every 5 successful invites earn a lottery entry
+        cursor.execute("""
+            UPDATE referral_codes 
+            SET successful_invites = successful_invites + 1,
+                total_rewards_minor = total_rewards_minor + ?,
+                total_rewards = (total_rewards_minor + ?) / 1000000.0,
+                lottery_entries = lottery_entries + ((successful_invites + 1) % 5 = 0),
+                updated_at = ?
+            WHERE user_id = ?
+        """, (total_reward, total_reward, now, referrer_id))
+        
+        # Create reward records
+        ReferralRepository._insert_reward(
+            cursor, referrer_id, 'invite', invite_reward, referral_id,
+            f"邀请好友奖励", now
+        )
+        if dividend_reward > 0:
+            ReferralRepository._insert_reward(
+                cursor, referrer_id, 'dividend', dividend_reward, referral_id,
+                f"交易分红奖励（交易额 1%）", now
+            )
+        return True
+    
+    @staticmethod
+    def update_referral_status(referred_id: int, status: str, transaction_amount_minor: int = 0):
+        """
+        Update referral status when user completes first transaction.
+        
+        Args:
+            referred_id: Referred user ID
+            status: New referral status
+            transaction_amount_minor: First transaction amount in fen
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
         try:
-            # Check if referral exists and not already rewarded
-            cursor = db.execute("""
-                SELECT * FROM referrals WHERE referred_id = ? AND status NOT IN ('rewarded', 'first_transaction')
-            """, (referred_id,))
-            referral = cursor.fetchone()
-            
-            if not referral:
-                return False
-            
             now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            referrer_id = referral['referrer_id']
-            referral_id = referral['referral_id']
-            
-            # Calculate rewards
-            invite_reward = 10.0  # Base invite reward
-            dividend_reward = min(transaction_amount * 0.01, 100.0)  # 1% dividend, max 100
-            total_reward = invite_reward + dividend_reward
-            
-            # Update referral status
-            db.execute("""
-                UPDATE referrals 
-                SET status = ?, first_transaction_at = ?, reward_amount = ?, updated_at = ?
-                WHERE referral_id = ?
-            """, (status, now, total_reward, now, referral_id))
-            
-            # Update referral code stats
-            db.execute("""
-                UPDATE referral_codes 
-                SET successful_invites = successful_invites + 1,
-                    total_rewards = total_rewards + ?,
-                    updated_at = ?
-                WHERE user_id = ?
-            """, (total_reward, now, referrer_id))
-            
-            # Check if should give lottery entry (every 5 successful invites)
-            cursor = db.execute("""
-                SELECT successful_invites FROM referral_codes WHERE user_id = ?
-            """, (referrer_id,))
-            code_info = cursor.fetchone()
-            if code_info and (code_info['successful_invites'] % 5 == 0):
-                db.execute("""
-                    UPDATE referral_codes 
-                    SET lottery_entries = lottery_entries + 1
-                    WHERE user_id = ?
-                """, (referrer_id,))
-            
-            db.commit()
-            
-            # Create reward records
-            ReferralRepository.create_reward(
-                referrer_id, 'invite', invite_reward, referral_id,
-                f"邀请好友奖励"
+            rewarded = ReferralRepository._reward_referrer(
+                cursor, referred_id, status, transaction_amount_minor, now
             )
-            if dividend_reward > 0:
-                ReferralRepository.create_reward(
-                    referrer_id, 'dividend', dividend_reward, referral_id,
-                    f"交易分红奖励（交易额 1%）"
-                )
-            
-            return True
+            conn.commit()
+            return rewarded
         except Exception as e:
             logger.error(f"Error updating referral status: {e}", exc_info=True)
-            db.rollback()
+            conn.rollback()
             return False
     
     @staticmethod
-    def create_reward(user_id: int, reward_type: str, amount: float, 
+    def _insert_reward(cursor: sqlite3.Cursor, user_id: int, reward_type: str, amount_minor: int,
+                       referral_id: Optional[int], description: str, now: str):
+        """Insert a pending reward record on the caller's cursor"""
+        cursor.execute("""
+            INSERT INTO referral_rewards 
+            (user_id, reward_type, amount_minor, amount, referral_id, description, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)
+        """, (user_id, reward_type, amount_minor, float(from_minor(amount_minor, "USDT")),
+              referral_id, description, now))
+    
+    @staticmethod
+    def create_reward(user_id: int, reward_type: str, amount_minor: int, 
                      referral_id: Optional[int] = None, description: str = "") -> bool:
-        """Create reward record"""
+        """Create reward record (amount in micro-USDT)"""
+        conn = db.get_connection()
         try:
             now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            db.execute("""
-                INSERT INTO referral_rewards 
-                (user_id, reward_type, amount, referral_id, description, status, created_at)
-                VALUES (?, ?, ?, ?, ?, 'pending', ?)
-            """, (user_id, reward_type, amount, referral_id, description, now))
-            db.commit()
+            ReferralRepository._insert_reward(
+                conn.cursor(), user_id, reward_type, amount_minor, referral_id, description, now
+            )
+            conn.commit()
             return True
         except Exception as e:
             logger.error(f"Error creating reward: {e}")
-            db.rollback()
+            conn.rollback()
             return False
     
     @staticmethod
     def get_user_rewards(user_id: int, limit: int = 10) -> List[Dict]:
         """Get user reward records"""
-        cursor = db.execute("""
-            SELECT * FROM referral_rewards 
-            WHERE user_id = ? 
-            ORDER BY created_at DESC 
-            LIMIT ?
-        """, (user_id, limit))
+        cursor = db.execute(USER_REWARDS_SQL, (user_id, limit))
         return [dict(r) for r in cursor.fetchall()]
     
     @staticmethod
@@ -271,7 +338,7 @@ class ReferralRepository:
         
         # Create reward
         ReferralRepository.create_reward(
-            user_id, 'lottery', prize_amount, None,
+            user_id, 'lottery', to_minor(prize_amount, "USDT"), None,
             f"抽奖奖励（{'一等奖' if prize_level == 1 else '二等奖' if prize_level == 2 else '三等奖' if prize_level == 3 else '幸运奖'}）"
         )
         
@@ -1,12 +1,26 @@
 """
 Sensitive words repository for database operations
 """
+from collections import OrderedDict
 from typing import List, Optional
 from database.db import db
+from database.cache_generations import CacheGeneration
+from utils.aho_corasick import AhoCorasick
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Severity of each action, used to pick the strictest match
+ACTION_SEVERITY = {"warn": 1, "delete": 2, "ban": 3}
+
+# Maximum number of per-group automatons kept in memory
+MAX_CACHED_GROUPS = 512
+
+# Compiled matchers: None -> global words, group_id -> that group's own words;
+# all are dropped when another process changed the word list
+_matchers: "OrderedDict[Optional[int], AhoCorasick]" = OrderedDict()
+_generation = CacheGeneration("sensitive_words")
+
 
 class SensitiveWordsRepository:
     """Repository for sensitive words database operations"""
@@ -37,6 +51,7 @@ class SensitiveWordsRepository:
             """, (group_id, word.lower(), action, added_by))
             
             conn.commit()
+            SensitiveWordsRepository.invalidate_cache(group_id)
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -56,6 +71,8 @@ class SensitiveWordsRepository:
                 (word_id,)
             )
             conn.commit()
+            # The word may belong to any group, drop every compiled matcher
+            SensitiveWordsRepository.invalidate_cache()
             return cursor.rowcount > 0
             
         except Exception as e:
@@ -91,23 +108,84 @@ class SensitiveWordsRepository:
         return [dict(w) for w in words]
     
     @staticmethod
-    def check_message(message_text: str, group_id: Optional[int] = None) -> Optional[dict]:
+    def invalidate_cache(group_id: Optional[int] = None):
         """
-        Check if message contains sensitive words.
+        Drop compiled matchers after the word list changed.
+        
+        Args:
+            group_id: Group whose words changed (None drops all matchers,
+                since global words apply to every group)
+        """
+        if group_id is None:
+            _matchers.clear()
+        else:
+            _matchers.pop(group_id, None)
+        _generation.bump()
+    
+    @staticmethod
+    def _get_matcher(group_id: Optional[int]) -> AhoCorasick:
+        """Get (or compile and cache) the matcher for global or one group's words"""
+        if _generation.changed():
+            _matchers.clear()
+        matcher = _matchers.get(group_id)
+        if matcher is not None:
+            _matchers.move_to_end(group_id)
+            return matcher
+        
+        if group_id is None:
+            cursor = db.execute("""
+                SELECT * FROM sensitive_words 
+                WHERE group_id IS NULL AND is_active = 1
+                ORDER BY word_id ASC
+            """)
+        else:
+            cursor = db.execute("""
+                SELECT * FROM sensitive_words 
+                WHERE group_id = ? AND is_active = 1
+                ORDER BY word_id ASC
+            """, (group_id,))
+        words = [dict(w) for w in cursor.fetchall()]
+        
+        matcher = AhoCorasick((w['word'].lower(), w) for w in words)
+        _matchers[group_id] = matcher
+        while len(_matchers) > MAX_CACHED_GROUPS + 1:
+            oldest = next(k for k in _matchers if k is not None)
+            _matchers.pop(oldest)
+        logger.debug(f"Compiled sensitive words matcher for group {group_id}: {len(matcher)} words")
+        return matcher
+    
+    @staticmethod
+    def find_matches(message_text: str, group_id: Optional[int] = None) -> List[dict]:
+        """
+        Find every sensitive word contained in a message.
         
         Args:
             message_text: Message text to check
             group_id: Group ID (for group-specific words)
             
         Returns:
-            First matching sensitive word dict or None
+            Matching sensitive word dicts (group words first, then global)
         """
-        words = SensitiveWordsRepository.get_words(group_id)
         message_lower = message_text.lower()
+        matches = []
+        if group_id:
+            matches.extend(SensitiveWordsRepository._get_matcher(group_id).find_all(message_lower))
+        matches.extend(SensitiveWordsRepository._get_matcher(None).find_all(message_lower))
+        return matches
+    
+    @staticmethod
+    def check_message(message_text: str, group_id: Optional[int] = None) -> Optional[dict]:
+        """
+        Check if message contains sensitive words.
         
-        for word_data in words:
-            if word_data['word'].lower() in message_lower:
-                return word_data
-        
-        return None
-
+        Args:
+            message_text: Message text to check
+            group_id: Group ID (for group-specific words)
+            
+        Returns:
+            Strictest matching sensitive word dict (ban > delete > warn) or None
+        """
+        matches = SensitiveWordsRepository.find_matches(message_text, group_id)
+        if not matches:
+            return None
+        return max(matches, key=lambda w: ACTION_SEVERITY.get(w.get('action'), 0))
@@ -0,0 +1,232 @@
+"""
+Pre-aggregated statistics for the admin dashboards.
+
+Rollup tables are maintained by SQLite triggers, so every write path (bot
+repositories, the activity tracker's upserts, the API server) updates them in
+the same transaction as the source row. Tables and triggers are created by
+migrations (v001); ``StatsRepository.rebuild`` backfills them from the
+source tables.
+
+- ``stats_tx_hourly`` / ``stats_tx_daily``: transactions by created_at bucket,
+  status, channel and type (count and amount)
+- ``stats_active_users_daily``: transactions per user and day (active when > 0)
+- ``stats_users_daily``: signups per day
+- ``stats_user_segments``: users by status and VIP level
+- ``stats_referrals_daily``: referrals by created_at day and status
+
+All buckets are UTC dates of ``created_at``, like the original
+``DATE(created_at) = DATE('now')`` queries.
+"""
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from typing import List
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+# Hot queries (also checked by benchmarks/check_query_plans); ``{where}``
+# narrows the daily rows, e.g. "stat_date >= ?"
+TX_TOTALS_SQL = """
+    SELECT COALESCE(SUM(tx_count), 0) AS count, COALESCE(SUM(amount_sum), 0) AS total
+    FROM stats_tx_daily WHERE status = 'paid' AND {where}
+"""
+NEW_USERS_SINCE_SQL = "SELECT COALESCE(SUM(new_users), 0) FROM stats_users_daily WHERE stat_date >= ?"
+
+_TX_ROLLUPS = (
+    ("stats_tx_hourly", "bucket", "strftime('%Y-%m-%d %H', {row}.created_at)"),
+    ("stats_tx_daily", "stat_date", "DATE({row}.created_at)"),
+)
+
+
+def _days_ago(days: int) -> str:
+    """UTC date ``days`` days ago (YYYY-MM-DD)"""
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class StatsRepository:
+    """Repository for admin dashboard rollups"""
+
+    @staticmethod
+    def _rebuild(conn: sqlite3.Connection):
+        """Recompute every rollup from the source tables"""
+        for table in ("stats_tx_hourly", "stats_tx_daily", "stats_active_users_daily",
+                      "stats_users_daily", "stats_user_segments", "stats_referrals_daily"):
+            conn.execute(f"DELETE FROM {table}")
+
+        for table, key, bucket in _TX_ROLLUPS:
+            bucket_sql = bucket.format(row="transactions")
+            conn.execute(f"""
+                INSERT INTO {table} ({key}, status, payment_channel, transaction_type, tx_count, amount_sum)
+                SELECT {bucket_sql}, status, payment_channel, transaction_type,
+                       COUNT(*), COALESCE(SUM(amount), 0)
+                FROM transactions
+                GROUP BY 1, 2, 3, 4
+            """)
+        conn.execute("""
+            INSERT INTO stats_active_users_daily (stat_date, user_id, tx_count)
+            SELECT DATE(created_at), user_id, COUNT(*) FROM transactions GROUP BY 1, 2
+        """)
+        conn.execute("""
+            INSERT INTO stats_users_daily (stat_date, new_users)
+            SELECT DATE(created_at), COUNT(*) FROM users GROUP BY 1
+        """)
+        conn.execute("""
+            INSERT INTO stats_user_segments (status, vip_level, user_count)
+            SELECT COALESCE(status, 'active'), COALESCE(vip_level, 0), COUNT(*)
+            FROM users GROUP BY 1, 2
+        """)
+        conn.execute("""
+            INSERT INTO stats_referrals_daily (stat_date, status, referral_count, reward_sum)
+            SELECT DATE(created_at), COALESCE(status, 'pending'), COUNT(*),
+                   COALESCE(SUM(reward_amount), 0)
+            FROM referrals GROUP BY 1, 2
+        """)
+
+    @staticmethod
+    async def rebuild():
+        """Backfill all rollups from the source tables in one transaction"""
+        await db.transaction(StatsRepository._rebuild)
+        logger.info("Statistics rollups rebuilt")
+
+    @staticmethod
+    async def ensure_built():
+        """Backfill rollups created on a database that already has data"""
+        def _needs_rebuild(conn: sqlite3.Connection) -> bool:
+            for rollup, source in (("stats_tx_daily", "transactions"),
+                                   ("stats_user_segments", "users")):
+                has_rollup = conn.execute(f"SELECT 1 FROM {rollup} LIMIT 1").fetchone()
+                has_source = conn.execute(f"SELECT 1 FROM {source} LIMIT 1").fetchone()
+                if has_source and not has_rollup:
+                    return True
+            return False
+
+        if await db.read(_needs_rebuild):
+            await StatsRepository.rebuild()
+
+    @staticmethod
+    def _tx_totals(conn: sqlite3.Connection, where: str = "1 = 1", params: tuple = ()) -> dict:
+        """Paid count/amount of daily rollup rows matching ``where``"""
+        row = conn.execute(TX_TOTALS_SQL.format(where=where), params).fetchone()
+        return {'count': row['count'], 'total': float(row['total'])}
+
+    @staticmethod
+    def _new_users_since(conn: sqlite3.Connection, since: str) -> int:
+        """Signups on or after a UTC date"""
+        return conn.execute(NEW_USERS_SINCE_SQL, (since,)).fetchone()[0]
+
+    @staticmethod
+    async def get_overview() -> dict:
+        """
+        Metrics of the main statistics screen.
+
+        Returns:
+            Dictionary of transaction, channel, user and referral metrics
+        """
+        today, yesterday = _days_ago(0), _days_ago(1)
+
+        def _fetch(conn: sqlite3.Connection) -> dict:
+            totals = conn.execute("""
+                SELECT COALESCE(SUM(tx_count), 0) AS total,
+                       COALESCE(SUM(CASE WHEN status = 'paid' THEN tx_count END), 0) AS paid,
+                       COALESCE(SUM(CASE WHEN status = 'paid' THEN amount_sum END), 0) AS paid_amount
+                FROM stats_tx_daily
+            """).fetchone()
+            channels = conn.execute("""
+                SELECT payment_channel, SUM(tx_count) AS count
+                FROM stats_tx_daily WHERE status = 'paid'
+                GROUP BY payment_channel HAVING SUM(tx_count) > 0
+            """).fetchall()
+            referrals = conn.execute("""
+                SELECT COALESCE(SUM(CASE WHEN status = 'rewarded' THEN referral_count END), 0) AS rewarded,
+                       COALESCE(SUM(reward_sum), 0) AS rewards
+                FROM stats_referrals_daily
+            """).fetchone()
+            return {
+                'total_transactions': totals['total'],
+                'paid_transactions': totals['paid'],
+                'total_amount': float(totals['paid_amount']),
+                'today': StatsRepository._tx_totals(conn, "stat_date = ?", (today,)),
+                'yesterday': StatsRepository._tx_totals(conn, "stat_date = ?", (yesterday,)),
+                'channels': [dict(row) for row in channels],
+                'total_users': conn.execute(
+                    "SELECT COALESCE(SUM(user_count), 0) FROM stats_user_segments"
+                ).fetchone()[0],
+                'today_new_users': StatsRepository._new_users_since(conn, today),
+                'successful_invites': referrals['rewarded'],
+                'referral_rewards': float(referrals['rewards']),
+            }
+
+        return await db.read(_fetch)
+
+    @staticmethod
+    async def get_time_stats() -> dict:
+        """
+        Metrics of the time statistics screen.
+
+        Returns:
+            Dictionary of paid totals per period and signups per period
+        """
+        today, yesterday = _days_ago(0), _days_ago(1)
+        week_start = _days_ago(7)
+        month_start = datetime.utcnow().strftime("%Y-%m-01")
+        last_24h = (datetime.utcnow() - timedelta(hours=23)).strftime("%Y-%m-%d %H")
+
+        def _fetch(conn: sqlite3.Connection) -> dict:
+            hourly = conn.execute("""
+                SELECT COALESCE(SUM(tx_count), 0) AS count, COALESCE(SUM(amount_sum), 0) AS total
+                FROM stats_tx_hourly WHERE status = 'paid' AND bucket >= ?
+            """, (last_24h,)).fetchone()
+            return {
+                'last_24h': {'count': hourly['count'], 'total': float(hourly['total'])},
+                'today': StatsRepository._tx_totals(conn, "stat_date = ?", (today,)),
+                'yesterday': StatsRepository._tx_totals(conn, "stat_date = ?", (yesterday,)),
+                'week': StatsRepository._tx_totals(conn, "stat_date >= ?", (week_start,)),
+                'month': StatsRepository._tx_totals(conn, "stat_date >= ?", (month_start,)),
+                'today_users': StatsRepository._new_users_since(conn, today),
+                'week_users': StatsRepository._new_users_since(conn, week_start),
+                'month_users': StatsRepository._new_users_since(conn, month_start),
+            }
+
+        return await db.read(_fetch)
+
+    @staticmethod
+    async def get_detail_stats() -> dict:
+        """
+        Metrics of the detailed report screen.
+
+        Returns:
+            Dictionary with per-status, per-channel (paid) and per-type (paid) rows
+        """
+        def _group(conn: sqlite3.Connection, column: str, paid_only: bool) -> List[dict]:
+            rows = conn.execute(f"""
+                SELECT {column}, SUM(tx_count) AS count, COALESCE(SUM(amount_sum), 0) AS total
+                FROM stats_tx_daily
+                {"WHERE status = 'paid'" if paid_only else ""}
+                GROUP BY {column} HAVING SUM(tx_count) > 0
+            """).fetchall()
+            return [dict(row) for row in rows]
+
+        def _fetch(conn: sqlite3.Connection) -> dict:
+            return {
+                'status': _group(conn, "status", paid_only=False),
+                'channels': _group(conn, "payment_channel", paid_only=True),
+                'types': _group(conn, "transaction_type", paid_only=True),
+            }
+
+        return await db.read(_fetch)
+
+    @staticmethod
+    async def get_vip_distribution() -> List[dict]:
+        """
+        VIP users per level.
+
+        Returns:
+            List of {vip_level, count} for levels above 0, ordered by level
+        """
+        return await db.fetch_all("""
+            SELECT vip_level, SUM(user_count) AS count
+            FROM stats_user_segments WHERE vip_level > 0
+            GROUP BY vip_level HAVING SUM(user_count) > 0
+            ORDER BY vip_level
+        """)
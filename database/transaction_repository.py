@@ -1,21 +1,48 @@
 """
 Transaction repository for database operations
 """
-from typing import List, Optional
+import sqlite3
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from database.db import db
+from database.referral_repository import ReferralRepository
+from database.user_repository import UserRepository
+from database.wallet_repository import WalletRepository
+from utils.money import from_minor
+from utils.pagination import encode_cursor, decode_cursor
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Hot queries (also checked by benchmarks/check_query_plans)
+TRANSACTION_BY_ORDER_SQL = "SELECT * FROM transactions WHERE order_id = ?"
+EXPIRABLE_ORDERS_SQL = """
+    SELECT transaction_id, order_id, user_id, transaction_type,
+           payment_channel, amount_minor, currency, expired_at
+    FROM transactions
+    WHERE status = 'pending' AND expired_at < ?
+    ORDER BY expired_at
+    LIMIT ?
+"""
+
+# Status changes an order may go through (paid_at is kept once set); anything
+# else, e.g. a late "pending" after "paid", is rejected
+STATUS_TRANSITIONS = {
+    'pending': ('paid', 'failed', 'cancelled', 'expired'),
+    # Payment confirmed by the gateway after the order timed out
+    'expired': ('paid',),
+    'failed': ('paid',),
+    'paid': ('refunded',),
+}
+
 
 class TransactionRepository:
     """Repository for transaction database operations"""
     
     @staticmethod
     def create_transaction(user_id: int, order_id: str, transaction_type: str,
-                          payment_channel: str, amount: float, fee: float,
-                          actual_amount: float, currency: str = "CNY",
+                          payment_channel: str, amount_minor: int, fee_minor: int,
+                          actual_amount_minor: int, currency: str = "CNY",
                           description: Optional[str] = None,
                           expired_minutes: int = 30) -> dict:
         """
@@ -26,9 +53,9 @@ class TransactionRepository:
             order_id: Unique order ID
             transaction_type: receive, pay, refund
             payment_channel: alipay, wechat
-            amount: Transaction amount
-            fee: Fee amount
-            actual_amount: Actual amount
+            amount_minor: Transaction amount in minor units
+            fee_minor: Fee in minor units
+            actual_amount_minor: Actual amount in minor units
             currency: Currency code
             description: Transaction description
             expired_minutes: Expiration time in minutes
@@ -43,21 +70,25 @@ class TransactionRepository:
             now = datetime.utcnow()
             expired_at = now + timedelta(minutes=expired_minutes)
             
+            # The REAL columns are display copies of the minor-unit amounts
             cursor.execute("""
                 INSERT INTO transactions 
                 (user_id, order_id, transaction_type, payment_channel,
-                 amount, fee, actual_amount, currency, status, description,
+                 amount, fee, actual_amount,
+                 amount_minor, fee_minor, actual_amount_minor, currency, status, description,
                  created_at, expired_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)
             """, (user_id, order_id, transaction_type, payment_channel,
-                  amount, fee, actual_amount, currency, description,
+                  float(from_minor(amount_minor, currency)), float(from_minor(fee_minor, currency)),
+                  float(from_minor(actual_amount_minor, currency)),
+                  amount_minor, fee_minor, actual_amount_minor, currency, description,
                   now.strftime("%Y-%m-%d %H:%M:%S"),
                   expired_at.strftime("%Y-%m-%d %H:%M:%S"),
                   now.strftime("%Y-%m-%d %H:%M:%S")))
             
             conn.commit()
             
-            cursor.execute("SELECT * FROM transactions WHERE order_id = ?", (order_id,))
+            cursor.execute(TRANSACTION_BY_ORDER_SQL, (order_id,))
             transaction = cursor.fetchone()
             
             return dict(transaction) if transaction else {}
@@ -70,10 +101,7 @@ class TransactionRepository:
     @staticmethod
     def get_transaction(order_id: str) -> Optional[dict]:
         """Get transaction by order ID"""
-        cursor = db.execute(
-            "SELECT * FROM transactions WHERE order_id = ?",
-            (order_id,)
-        )
+        cursor = db.execute(TRANSACTION_BY_ORDER_SQL, (order_id,))
         transaction = cursor.fetchone()
         return dict(transaction) if transaction else None
     
@@ -105,7 +133,7 @@ class TransactionRepository:
             query += " AND status = ?"
             params.append(status)
         
-        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        query += " ORDER BY created_at DESC, transaction_id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
         cursor = db.execute(query, tuple(params))
@@ -113,30 +141,264 @@ class TransactionRepository:
         
         return [dict(t) for t in transactions]
     
+    @staticmethod
+    def user_transactions_page_query(user_id: int, limit: int = 10,
+                                     cursor: Optional[str] = None, backward: bool = False,
+                                     transaction_type: Optional[str] = None,
+                                     status: Optional[str] = None,
+                                     payment_channel: Optional[str] = None,
+                                     since: Optional[str] = None) -> Tuple[str, tuple]:
+        """
+        Build the keyset query of one transaction history page.
+        
+        Arguments are those of ``get_user_transactions_page``; one row more
+        than ``limit`` is selected to tell whether another page follows.
+        
+        Returns:
+            (query, params)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = "SELECT * FROM transactions WHERE user_id = ?"
+        params = [user_id]
+        
+        if transaction_type:
+            query += " AND transaction_type = ?"
+            params.append(transaction_type)
+        
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        
+        if payment_channel:
+            query += " AND payment_channel = ?"
+            params.append(payment_channel)
+        
+        if since:
+            query += " AND created_at >= ?"
+            params.append(since)
+        
+        if cursor:
+            query += " AND (created_at, transaction_id) > (?, ?)" if backward \
+                else " AND (created_at, transaction_id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        
+        order = "ASC" if backward else "DESC"
+        query += f" ORDER BY created_at {order}, transaction_id {order} LIMIT ?"
+        params.append(limit + 1)
+        return query, tuple(params)
+    
+    @staticmethod
+    def _transactions_page(rows: List[dict], limit: int, cursor: Optional[str], backward: bool) -> dict:
+        """Turn the rows of a page query into the page with its cursors"""
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+        
+        has_next = bool(cursor) if backward else has_more
+        has_prev = has_more if backward else bool(cursor)
+        return {
+            'transactions': rows,
+            'next_cursor': encode_cursor(rows[-1]['created_at'], rows[-1]['transaction_id'])
+            if rows and has_next else None,
+            'prev_cursor': encode_cursor(rows[0]['created_at'], rows[0]['transaction_id'])
+            if rows and has_prev else None,
+        }
+    
+    @staticmethod
+    def get_user_transactions_page(user_id: int, limit: int = 10,
+                                   cursor: Optional[str] = None, backward: bool = False,
+                                   transaction_type: Optional[str] = None,
+                                   status: Optional[str] = None,
+                                   payment_channel: Optional[str] = None,
+                                   since: Optional[str] = None) -> dict:
+        """
+        Get one page of user transactions, newest first, with keyset pagination.
+        
+        Pages seek on ``(created_at, transaction_id)`` through
+        ``idx_transactions_user_created``, so page N costs the same as page 1.
+        Runs on the calling thread; handlers use
+        ``get_user_transactions_page_async``.
+        
+        Args:
+            user_id: User ID
+            limit: Page size
+            cursor: Cursor from a previous page (None for the first page)
+            backward: Fetch the page before ``cursor`` instead of after it
+            transaction_type: Filter by type (receive, pay, refund)
+            status: Filter by status (pending, paid, failed, etc.)
+            payment_channel: Filter by channel (alipay, wechat)
+            since: Only transactions created on or after this date (YYYY-MM-DD)
+            
+        Returns:
+            Dictionary with transactions, next_cursor and prev_cursor
+            (None when there is no such page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query, params = TransactionRepository.user_transactions_page_query(
+            user_id, limit, cursor, backward, transaction_type, status, payment_channel, since
+        )
+        rows = [dict(t) for t in db.execute(query, params).fetchall()]
+        return TransactionRepository._transactions_page(rows, limit, cursor, backward)
+    
+    @staticmethod
+    async def get_user_transactions_page_async(user_id: int, limit: int = 10,
+                                               cursor: Optional[str] = None, backward: bool = False,
+                                               transaction_type: Optional[str] = None,
+                                               status: Optional[str] = None,
+                                               payment_channel: Optional[str] = None,
+                                               since: Optional[str] = None) -> dict:
+        """
+        Get one page of user transactions without blocking the event loop.
+        
+        Same arguments and result as ``get_user_transactions_page``; the
+        query runs on the database's reader pool.
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query, params = TransactionRepository.user_transactions_page_query(
+            user_id, limit, cursor, backward, transaction_type, status, payment_channel, since
+        )
+        rows = await db.fetch_all(query, params)
+        return TransactionRepository._transactions_page(rows, limit, cursor, backward)
+    
+    @staticmethod
+    def apply_status_change(cursor: sqlite3.Cursor, order_id: str, status: str,
+                            paid_at: Optional[str], now: str) -> str:
+        """
+        Change an order's status with all of its side effects.
+        
+        Runs on the caller's cursor: the status update, the wallet ledger,
+        the user statistics and (for a user's first paid order) the referral
+        rewards commit or roll back together.
+        
+        Args:
+            cursor: Cursor inside the caller's transaction
+            order_id: Order ID
+            status: New status
+            paid_at: Payment time (YYYY-MM-DD HH:MM:SS), defaults to ``now`` for paid
+            now: Current UTC timestamp
+            
+        Returns:
+            "applied", "unchanged" (already in that status), "rejected"
+            (transition not allowed) or "unknown_order"
+        """
+        cursor.execute("""
+            SELECT user_id, transaction_type, amount_minor, actual_amount_minor, status, created_at
+            FROM transactions WHERE order_id = ?
+        """, (order_id,))
+        transaction = cursor.fetchone()
+        if not transaction:
+            return "unknown_order"
+        if transaction['status'] == status:
+            return "unchanged"
+        if status not in STATUS_TRANSITIONS.get(transaction['status'], ()):
+            return "rejected"
+        
+        is_paid = status == 'paid'
+        if is_paid and not paid_at:
+            paid_at = now
+        cursor.execute("""
+            UPDATE transactions 
+            SET status = ?, paid_at = COALESCE(?, paid_at), updated_at = ?
+            WHERE order_id = ?
+        """, (status, paid_at if is_paid else None, now, order_id))
+        
+        was_paid = transaction['status'] == 'paid'
+        if is_paid and not was_paid:
+            WalletRepository.apply_transaction(cursor, dict(transaction))
+            UserRepository.add_paid_transaction(cursor, transaction['user_id'],
+                                                transaction['amount_minor'], now)
+            
+            # First paid order of the user: referral and new-user rewards. The
+            # bonus row is the durable marker; a paid count would drop back to
+            # zero after a refund and grant the rewards again.
+            if not ReferralRepository.has_first_transaction_reward(cursor, transaction['user_id']):
+                ReferralRepository.apply_first_transaction(
+                    cursor, transaction['user_id'], transaction['amount_minor'], now
+                )
+        elif was_paid and not is_paid:
+            WalletRepository.apply_transaction(cursor, dict(transaction), sign=-1)
+            UserRepository.add_paid_transaction(cursor, transaction['user_id'],
+                                                transaction['amount_minor'], now, sign=-1)
+        return "applied"
+    
     @staticmethod
     def update_transaction_status(order_id: str, status: str,
-                                  paid_at: Optional[datetime] = None):
-        """Update transaction status"""
+                                  paid_at: Optional[datetime] = None) -> str:
+        """
+        Update transaction status and its side effects in one commit.
+        
+        See ``apply_status_change``.
+        
+        Returns:
+            Result of ``apply_status_change``
+        """
         now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         paid_at_str = paid_at.strftime("%Y-%m-%d %H:%M:%S") if paid_at else None
         
-        db.execute("""
-            UPDATE transactions 
-            SET status = ?, paid_at = ?, updated_at = ?
-            WHERE order_id = ?
-        """, (status, paid_at_str, now, order_id))
-        db.commit()
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            result = TransactionRepository.apply_status_change(cursor, order_id, status, paid_at_str, now)
+            conn.commit()
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error updating transaction status: {e}")
+            conn.rollback()
+            raise
     
     @staticmethod
-    def get_transaction_count(user_id: int, transaction_type: Optional[str] = None) -> int:
-        """Get total transaction count for user"""
+    async def expire_pending(now: str, limit: int = 500) -> List[dict]:
+        """
+        Expire one chunk of pending orders whose ``expired_at`` has passed.
+        
+        Seeks the partial index ``idx_transactions_pending_expiry``, so a
+        chunk costs the same however much settled history exists. Pending
+        orders are not in the wallet ledger, so only the status changes.
+        
+        Args:
+            now: Current UTC time (YYYY-MM-DD HH:MM:SS, the expired_at format)
+            limit: Maximum orders expired in this chunk
+            
+        Returns:
+            Expired orders (order_id, user_id, transaction_type, payment_channel,
+            amount_minor, currency, expired_at)
+        """
+        def _expire(conn) -> List[dict]:
+            rows = [dict(r) for r in conn.execute(EXPIRABLE_ORDERS_SQL, (now, limit)).fetchall()]
+            if rows:
+                conn.executemany("""
+                    UPDATE transactions
+                    SET status = 'expired', updated_at = ?
+                    WHERE transaction_id = ? AND status = 'pending'
+                """, [(now, row['transaction_id']) for row in rows])
+            return rows
+        
+        return await db.transaction(_expire)
+    
+    @staticmethod
+    def transaction_count_query(user_id: int, transaction_type: Optional[str] = None) -> Tuple[str, tuple]:
+        """Build the count query of ``get_transaction_count``; returns (query, params)"""
         query = "SELECT COUNT(*) FROM transactions WHERE user_id = ?"
         params = [user_id]
         
         if transaction_type:
             query += " AND transaction_type = ?"
             params.append(transaction_type)
-        
-        cursor = db.execute(query, tuple(params))
+        return query, tuple(params)
+    
+    @staticmethod
+    def get_transaction_count(user_id: int, transaction_type: Optional[str] = None) -> int:
+        """Get total transaction count for user"""
+        query, params = TransactionRepository.transaction_count_query(user_id, transaction_type)
+        cursor = db.execute(query, params)
         return cursor.fetchone()[0]
 
@@ -0,0 +1,42 @@
+"""
+Telegram update repository: cross-process dedupe of webhook deliveries
+"""
+import sqlite3
+from datetime import datetime
+from database.db import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Old ids are pruned on every PRUNE_EVERY-th update id
+PRUNE_EVERY = 1000
+
+
+class UpdateRepository:
+    """Repository for claimed Telegram update ids"""
+
+    @staticmethod
+    async def claim(update_id: int, keep: int = 10000) -> bool:
+        """
+        Claim an update for processing.
+
+        Args:
+            update_id: Telegram update id
+            keep: Most recent update ids kept (update ids are increasing)
+
+        Returns:
+            True if this is the first delivery of the update
+        """
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+        def _claim(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO telegram_updates (update_id, received_at)
+                VALUES (?, ?)
+            """, (update_id, now))
+            claimed = cursor.rowcount == 1
+            if claimed and update_id % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM telegram_updates WHERE update_id < ?", (update_id - keep,))
+            return claimed
+
+        return await db.transaction(_claim)
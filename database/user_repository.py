@@ -1,6 +1,7 @@
 """
 User repository for database operations
 """
+import sqlite3
 from typing import Optional
 from datetime import datetime
 from database.db import db
@@ -8,6 +9,15 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Hot queries (also checked by benchmarks/check_query_plans)
+USER_BY_ID_SQL = "SELECT * FROM users WHERE user_id = ?"
+RECENT_USERS_SQL = """
+    SELECT user_id, username, first_name, vip_level, created_at
+    FROM users
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+
 
 class UserRepository:
     """Repository for user database operations"""
@@ -36,7 +46,7 @@ class UserRepository:
         
         try:
             # Check if user exists
-            cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+            cursor.execute(USER_BY_ID_SQL, (user_id,))
             existing = cursor.fetchone()
             
             now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
@@ -67,7 +77,7 @@ class UserRepository:
             conn.commit()
             
             # Fetch updated user
-            cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+            cursor.execute(USER_BY_ID_SQL, (user_id,))
             user = cursor.fetchone()
             
             return dict(user) if user else {}
@@ -88,10 +98,24 @@ class UserRepository:
         Returns:
             User data dictionary or None
         """
-        cursor = db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+        cursor = db.execute(USER_BY_ID_SQL, (user_id,))
         user = cursor.fetchone()
         return dict(user) if user else None
     
+    @staticmethod
+    def get_recent_users(limit: int = 10) -> list:
+        """
+        Get the most recently registered users.
+        
+        Args:
+            limit: Maximum number of users
+            
+        Returns:
+            Rows with user_id, username, first_name, vip_level and created_at, newest first
+        """
+        cursor = db.execute(RECENT_USERS_SQL, (limit,))
+        return cursor.fetchall()
+    
     @staticmethod
     def update_vip_level(user_id: int, vip_level: int):
         """Update user VIP level"""
@@ -104,15 +128,49 @@ class UserRepository:
         db.commit()
     
     @staticmethod
-    def update_statistics(user_id: int, amount: float):
-        """Update user transaction statistics"""
+    def update_preferred_language(user_id: int, language: str):
+        """Update the language chosen in settings"""
         now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         db.execute("""
             UPDATE users 
-            SET total_transactions = total_transactions + 1,
-                total_amount = total_amount + ?,
-                updated_at = ?
+            SET preferred_language = ?, updated_at = ?
             WHERE user_id = ?
-        """, (amount, now, user_id))
+        """, (language, now, user_id))
         db.commit()
+    
+    @staticmethod
+    def increment_message_count(user_id: int):
+        """Count one message of a user"""
+        db.execute("""
+            UPDATE users 
+            SET message_count = message_count + 1
+            WHERE user_id = ?
+        """, (user_id,))
+        db.commit()
+    
+    @staticmethod
+    def add_paid_transaction(cursor: sqlite3.Cursor, user_id: int, amount_minor: int, now: str,
+                             sign: int = 1):
+        """
+        Count a paid transaction in the user statistics on the caller's cursor.
+        
+        ``sign=-1`` takes it back out when a paid order is refunded.
+        """
+        # total_amount is a display copy recomputed from the exact integer total
+        cursor.execute("""
+            UPDATE users 
+            SET total_transactions = total_transactions + ?,
+                total_amount_minor = total_amount_minor + ?,
+                total_amount = (total_amount_minor + ?) / 100.0,
+                updated_at = ?
+            WHERE user_id = ?
+        """, (sign, sign * amount_minor, sign * amount_minor, now, user_id))
+    
+    @staticmethod
+    def update_statistics(user_id: int, amount_minor: int):
+        """Update user transaction statistics (amount in fen)"""
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        conn = db.get_connection()
+        UserRepository.add_paid_transaction(conn.cursor(), user_id, amount_minor, now)
+        conn.commit()
 
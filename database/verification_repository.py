@@ -1,18 +1,195 @@
 """
 Verification repository for database operations
 """
-from typing import List, Optional, Dict
+import random
+import time
+from types import MappingProxyType
+from typing import List, Optional, Dict, Mapping
 from datetime import datetime
+from config import Config
 from database.db import db
+from database.cache_generations import CacheGeneration
+from utils.alias_sampler import AliasSampler
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# Hot queries (also checked by benchmarks/check_query_plans)
+PENDING_RECORD_SQL = """
+    SELECT * FROM verification_records
+    WHERE group_id = ? AND user_id = ? AND result = 'pending'
+    ORDER BY created_at DESC LIMIT 1
+"""
+
+# How questions are weighted when drawn: equally, so that every difficulty is
+# drawn equally often, or by how often members pass them
+QUESTION_WEIGHTINGS = ("uniform", "difficulty", "pass_rate")
+
+# Active questions by ID, global ones and by group, loaded on demand and
+# reloaded after Config.VERIFICATION_CACHE_TTL seconds to pick up edits made
+# outside the bot (and fresh pass rates); edits made by another process reach
+# this one through the shared cache generation. Each group's pool is built
+# from them the first time the group needs a question.
+_questions: Optional[Dict[int, Mapping]] = None
+_global_questions: List[Mapping] = []
+_group_questions: Dict[int, List[Mapping]] = {}
+_pass_rates: Dict[int, float] = {}
+_pools: Dict[Optional[int], "QuestionPool"] = {}
+_loaded_at = 0.0
+_generation = CacheGeneration("verification_questions")
+
+
+def question_weights(questions: List[Mapping], weighting: str,
+                     pass_rates: Optional[Dict[int, float]] = None) -> Optional[List[float]]:
+    """
+    Sampling weight of each question.
+
+    Args:
+        questions: Questions of a pool
+        weighting: One of QUESTION_WEIGHTINGS
+        pass_rates: Smoothed pass rate by question ID ("pass_rate" weighting)
+
+    Returns:
+        Weights in question order, or None for uniform sampling
+    """
+    if weighting == "difficulty":
+        counts: Dict[str, int] = {}
+        for question in questions:
+            counts[question['difficulty']] = counts.get(question['difficulty'], 0) + 1
+        return [1.0 / counts[question['difficulty']] for question in questions]
+    if weighting == "pass_rate":
+        # Questions members keep failing (unclear, outdated) are drawn less
+        pass_rates = pass_rates or {}
+        return [pass_rates.get(question['question_id'], 0.5) for question in questions]
+    return None
+
+
+class QuestionPool:
+    """
+    Active questions offered in one group: its own and the global ones.
+
+    Drawing a question costs O(1) whatever the pool size, for the whole
+    pool or for one difficulty.
+    """
+
+    def __init__(self, questions: List[Mapping], weighting: str = "uniform",
+                 pass_rates: Optional[Dict[int, float]] = None):
+        """
+        Build pool.
+
+        Args:
+            questions: Questions of the pool
+            weighting: One of QUESTION_WEIGHTINGS
+            pass_rates: Smoothed pass rate by question ID ("pass_rate" weighting)
+        """
+        self.questions = questions
+        self.weights = weights = question_weights(questions, weighting, pass_rates)
+        self._all = AliasSampler(questions, weights) if questions else None
+
+        partitions: Dict[str, tuple] = {}
+        for index, question in enumerate(questions):
+            items, item_weights = partitions.setdefault(question['difficulty'], ([], []))
+            items.append(question)
+            item_weights.append(weights[index] if weights else 1.0)
+        self._by_difficulty = {
+            difficulty: AliasSampler(items, item_weights if weights else None)
+            for difficulty, (items, item_weights) in partitions.items()
+        }
+
+    def __len__(self) -> int:
+        """Number of questions"""
+        return len(self.questions)
+
+    def sample(self, difficulty: Optional[str] = None,
+               rng: Optional[random.Random] = None) -> Optional[Mapping]:
+        """
+        Draw a question.
+
+        Args:
+            difficulty: Only draw among questions of this difficulty
+            rng: Random generator (default: the ``random`` module's)
+
+        Returns:
+            Read-only question row, or None if the pool has no such question
+        """
+        sampler = self._all if difficulty is None else self._by_difficulty.get(difficulty)
+        return sampler.sample(rng) if sampler else None
+
 
 class VerificationRepository:
     """Repository for verification system database operations"""
     
+    @staticmethod
+    def _table() -> Dict[int, Mapping]:
+        """Get the active questions, reloading them when stale"""
+        global _questions, _global_questions, _group_questions, _pass_rates, _loaded_at
+        
+        now = time.monotonic()
+        changed_elsewhere = _generation.changed()
+        if _questions is None or changed_elsewhere or now - _loaded_at >= Config.VERIFICATION_CACHE_TTL:
+            cursor = db.execute("""
+                SELECT * FROM verification_questions
+                WHERE is_active = 1
+                ORDER BY question_id
+            """)
+            questions, global_questions, group_questions = {}, [], {}
+            for row in cursor.fetchall():
+                question = MappingProxyType(dict(row))
+                questions[question['question_id']] = question
+                if question['group_id'] is None:
+                    global_questions.append(question)
+                else:
+                    group_questions.setdefault(question['group_id'], []).append(question)
+            
+            pass_rates = {}
+            if Config.VERIFICATION_QUESTION_WEIGHTING == "pass_rate":
+                cursor = db.execute("""
+                    SELECT question_id,
+                           SUM(CASE WHEN result = 'passed' THEN 1 ELSE 0 END) AS passed,
+                           COUNT(*) AS answered
+                    FROM verification_records
+                    WHERE question_id IS NOT NULL AND result IN ('passed', 'rejected')
+                    GROUP BY question_id
+                """)
+                # Laplace smoothing: unanswered questions start at 0.5
+                pass_rates = {row['question_id']: (row['passed'] + 1) / (row['answered'] + 2)
+                              for row in cursor.fetchall()}
+            
+            _questions, _global_questions, _group_questions = questions, global_questions, group_questions
+            _pass_rates, _loaded_at = pass_rates, now
+            _pools.clear()
+        return _questions
+    
+    @staticmethod
+    def invalidate_cache():
+        """Drop the cached questions and pools after questions changed"""
+        global _questions
+        _questions = None
+        _pools.clear()
+        _generation.bump()
+    
+    @staticmethod
+    def get_question_pool(group_id: Optional[int]) -> QuestionPool:
+        """
+        Get the question pool of a group.
+        
+        Served from memory; built from the cached questions on first use.
+        
+        Args:
+            group_id: Group ID (None: global questions only)
+        
+        Returns:
+            The group's own active questions plus the global ones
+        """
+        VerificationRepository._table()
+        pool = _pools.get(group_id)
+        if pool is None:
+            questions = _global_questions + _group_questions.get(group_id, [])
+            pool = QuestionPool(questions, Config.VERIFICATION_QUESTION_WEIGHTING, _pass_rates)
+            _pools[group_id] = pool
+        return pool
+    
     @staticmethod
     def create_question(
         group_id: Optional[int],
@@ -38,6 +215,7 @@ class VerificationRepository:
                   difficulty, hint, max_attempts, time_limit))
             conn.commit()
             question_id = cursor.lastrowid
+            VerificationRepository.invalidate_cache()
             logger.info(f"Created verification question {question_id}")
             return question_id
         except Exception as e:
@@ -49,27 +227,31 @@ class VerificationRepository:
     
     @staticmethod
     def get_questions(group_id: Optional[int] = None, difficulty: Optional[str] = None, limit: int = 10) -> List[dict]:
-        """Get verification questions"""
-        query = """
-            SELECT * FROM verification_questions 
-            WHERE is_active = 1 AND (group_id = ? OR group_id IS NULL)
         """
-        params = [group_id]
+        Get verification questions in random order.
         
-        if difficulty:
-            query += " AND difficulty = ?"
-            params.append(difficulty)
+        Served from the group's in-memory question pool.
         
-        query += " ORDER BY RANDOM() LIMIT ?"
-        params.append(limit)
+        Args:
+            group_id: Group ID (None: global questions only)
+            difficulty: Only questions of this difficulty
+            limit: Maximum number of questions
         
-        cursor = db.execute(query, tuple(params))
-        questions = cursor.fetchall()
-        return [dict(q) for q in questions]
+        Returns:
+            List of question dicts
+        """
+        questions = VerificationRepository.get_question_pool(group_id).questions
+        if difficulty:
+            questions = [q for q in questions if q['difficulty'] == difficulty]
+        return [dict(q) for q in random.sample(questions, min(limit, len(questions)))]
     
     @staticmethod
     def get_question(question_id: int) -> Optional[dict]:
-        """Get a question by ID"""
+        """Get a question by ID (active ones are served from memory)"""
+        question = VerificationRepository._table().get(question_id)
+        if question is not None:
+            return dict(question)
+        # Deactivated questions still answer pending verifications
         cursor = db.execute("SELECT * FROM verification_questions WHERE question_id = ?", (question_id,))
         question = cursor.fetchone()
         return dict(question) if question else None
@@ -176,11 +358,7 @@ class VerificationRepository:
     @staticmethod
     def get_verification_record(group_id: int, user_id: int) -> Optional[dict]:
         """Get verification record for a user in a group"""
-        cursor = db.execute("""
-            SELECT * FROM verification_records 
-            WHERE group_id = ? AND user_id = ? AND result = 'pending'
-            ORDER BY created_at DESC LIMIT 1
-        """, (group_id, user_id))
+        cursor = db.execute(PENDING_RECORD_SQL, (group_id, user_id))
         record = cursor.fetchone()
         return dict(record) if record else None
     
@@ -0,0 +1,261 @@
+"""
+Process-local index of verified group members
+"""
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Optional
+from config import Config
+from database.db import db
+from database.cache_generations import CacheGeneration
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Hot queries (also checked by benchmarks/check_query_plans)
+VERIFIED_MEMBER_SQL = """
+    SELECT COUNT(*) FROM group_members
+    WHERE group_id = ? AND user_id = ? AND status = 'verified'
+"""
+VERIFIED_MEMBERS_SQL = """
+    SELECT user_id FROM group_members
+    WHERE group_id = ? AND status = 'verified'
+    ORDER BY user_id
+    LIMIT ?
+"""
+
+# Lookups since the last admission a group needs before it may push other
+# groups out of a full index (and more than the least recently used group had)
+ADMIT_AFTER = 32
+
+
+class _GroupMembers:
+    """Verified user IDs of one group as a sorted array of 64-bit ints"""
+
+    __slots__ = ("ids", "complete", "hits")
+
+    def __init__(self, ids: array, complete: bool):
+        """
+        Initialize entry.
+
+        Args:
+            ids: Sorted verified user IDs
+            complete: Whether ``ids`` holds every verified member (else
+                only some, and a missing ID must be looked up)
+        """
+        self.ids = ids
+        self.complete = complete
+        # Lookups since a group was last admitted
+        self.hits = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        index = bisect_left(self.ids, user_id)
+        return index < len(self.ids) and self.ids[index] == user_id
+
+    def add(self, user_id: int) -> bool:
+        """Insert an ID; returns True if it was not there"""
+        index = bisect_left(self.ids, user_id)
+        if index < len(self.ids) and self.ids[index] == user_id:
+            return False
+        self.ids.insert(index, user_id)
+        return True
+
+    def discard(self, user_id: int) -> bool:
+        """Remove an ID; returns True if it was there"""
+        index = bisect_left(self.ids, user_id)
+        if index < len(self.ids) and self.ids[index] == user_id:
+            del self.ids[index]
+            return True
+        return False
+
+
+class VerifiedMemberIndex:
+    """
+    Cache of the ``status = 'verified'`` rows of ``group_members``.
+
+    Lets the group message handler answer "is this sender verified?" from
+    memory. A group's verified members are loaded with its first lookup and
+    kept in step by ``GroupRepository`` as members are added, verified and
+    rejected. At most ``max_members`` IDs are kept (8 bytes each); the least
+    recently used groups are dropped first, but only for a group looked up
+    more often than the group it would push out (until then its lookups go
+    to the database), so quiet groups do not keep replacing each other and
+    reloading all their members. A group with more
+    than ``max_group_members`` verified members is only cached partially
+    (known verified IDs, misses go to the database).
+
+    Removals made by another process reach this one through the shared
+    cache generation. Additions are not signalled (a join would otherwise
+    cost a write and empty every other process's index), so with
+    ``shared=True`` a miss is never trusted: it is checked in the database
+    and a verified member found there is added.
+    """
+
+    def __init__(self, max_members: int = 1_000_000, max_group_members: Optional[int] = None,
+                 shared: bool = False):
+        """
+        Initialize empty index.
+
+        Args:
+            max_members: Maximum user IDs kept over all groups
+            max_group_members: Maximum user IDs kept for one group
+                (default: a quarter of ``max_members``)
+            shared: Other processes change group members too
+        """
+        self.max_members = max_members
+        self.max_group_members = max_group_members or max(1, max_members // 4)
+        self.shared = shared
+        self._groups: "OrderedDict[int, _GroupMembers]" = OrderedDict()
+        self._size = 0
+        # Set once groups had to be evicted; from then on groups wait for admission
+        self._full = False
+        # Lookups of groups waiting to be admitted
+        self._waiting: Dict[int, int] = {}
+        self._generation = CacheGeneration("verified_members")
+        self.stats = {"hits": 0, "lookups": 0, "loads": 0, "evicted_groups": 0}
+
+    def __len__(self) -> int:
+        """Number of user IDs kept"""
+        return self._size
+
+    def _load(self, group_id: int) -> _GroupMembers:
+        """Load a group's verified members (up to max_group_members)"""
+        cursor = db.execute(VERIFIED_MEMBERS_SQL, (group_id, self.max_group_members + 1))
+        ids = array("q", (row[0] for row in cursor.fetchall()))
+        complete = len(ids) <= self.max_group_members
+        if not complete:
+            del ids[self.max_group_members:]
+            logger.info(f"Group {group_id} has over {self.max_group_members} verified members, "
+                        f"caching it partially")
+        self.stats["loads"] += 1
+        return _GroupMembers(ids, complete)
+
+    def _admit(self, group_id: int) -> Optional[_GroupMembers]:
+        """Load a group if the index never filled up or the group was looked up often enough"""
+        if self._full:
+            lookups = self._waiting.get(group_id, 0) + 1
+            victim = next(iter(self._groups.values()), None)
+            if lookups < ADMIT_AFTER or (victim is not None and lookups <= victim.hits):
+                if len(self._waiting) >= 10000:
+                    self._waiting.clear()
+                self._waiting[group_id] = lookups
+                return None
+        # Candidates and cached groups compete on lookups since the last admission
+        self._waiting.clear()
+        for cached in self._groups.values():
+            cached.hits = 0
+        members = self._load(group_id)
+        self._groups[group_id] = members
+        self._grew(group_id, len(members.ids))
+        return members
+
+    @staticmethod
+    def _lookup(group_id: int, user_id: int) -> bool:
+        """Check one member in the database"""
+        cursor = db.execute(VERIFIED_MEMBER_SQL, (group_id, user_id))
+        return cursor.fetchone()[0] > 0
+
+    def _grew(self, group_id: int, added: int):
+        """Account for added IDs and drop the least recently used other groups over budget"""
+        self._size += added
+        while self._size > self.max_members and len(self._groups) > 1:
+            evicted_id, evicted = next(iter(self._groups.items()))
+            if evicted_id == group_id:
+                self._groups.move_to_end(group_id)
+                continue
+            del self._groups[evicted_id]
+            self._size -= len(evicted.ids)
+            self._full = True
+            self.stats["evicted_groups"] += 1
+
+    def is_verified(self, group_id: int, user_id: int) -> bool:
+        """
+        Check if a member is verified.
+
+        Args:
+            group_id: Telegram chat ID
+            user_id: Telegram user ID
+
+        Returns:
+            True if the member's status is 'verified'
+        """
+        if self._generation.changed():
+            self.clear()
+
+        members = self._groups.get(group_id)
+        if members is None:
+            members = self._admit(group_id)
+            if members is None:
+                self.stats["lookups"] += 1
+                return self._lookup(group_id, user_id)
+        else:
+            self._groups.move_to_end(group_id)
+            members.hits += 1
+
+        if user_id in members:
+            self.stats["hits"] += 1
+            return True
+        if members.complete and not self.shared:
+            self.stats["hits"] += 1
+            return False
+
+        self.stats["lookups"] += 1
+        verified = self._lookup(group_id, user_id)
+        if verified and (members.complete or len(members.ids) < self.max_group_members) \
+                and members.add(user_id):
+            self._grew(group_id, 1)
+        return verified
+
+    def set_status(self, group_id: int, user_id: int, verified: bool):
+        """
+        Record a member's new status after it was written.
+
+        Only a removal is signalled to other processes; a cached "verified"
+        elsewhere would be wrong, a missing one is looked up anyway.
+
+        Args:
+            group_id: Telegram chat ID
+            user_id: Telegram user ID
+            verified: Whether the status is now 'verified'
+        """
+        members = self._groups.get(group_id)
+        if verified:
+            if members is not None and (members.complete or len(members.ids) < self.max_group_members) \
+                    and members.add(user_id):
+                self._grew(group_id, 1)
+            return
+        if members is not None and members.discard(user_id):
+            self._size -= 1
+        self._generation.bump()
+
+    def forget(self, group_id: Optional[int] = None, removed: bool = True):
+        """
+        Drop a group after a bulk change of its members.
+
+        Args:
+            group_id: Telegram chat ID (None: every group)
+            removed: Whether members may have lost 'verified' (other
+                processes are then told to drop their copy too)
+        """
+        if group_id is None:
+            self.clear()
+        else:
+            members = self._groups.pop(group_id, None)
+            if members is not None:
+                self._size -= len(members.ids)
+        if removed:
+            self._generation.bump()
+
+    def clear(self):
+        """Drop all cached groups"""
+        self._groups.clear()
+        self._waiting.clear()
+        self._size = 0
+        self._full = False
+
+
+# Global verified member index instance
+verified_members = VerifiedMemberIndex(
+    Config.VERIFIED_MEMBER_CACHE_SIZE,
+    shared=Config.WEBHOOK_WORKERS > 1 or Config.DISPATCH_WORKERS > 1
+)
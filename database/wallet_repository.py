@@ -0,0 +1,233 @@
+"""
+Wallet ledger repository: per-user balances and daily rollups
+"""
+import sqlite3
+from typing import List, Optional, Tuple
+from datetime import datetime
+from database.db import db
+from utils.money import from_minor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Hot queries (also checked by benchmarks/check_query_plans)
+WALLET_BALANCE_SQL = "SELECT balance_minor FROM wallet_balances WHERE user_id = ?"
+WALLET_DAY_SQL = """
+    SELECT receive_minor, pay_minor FROM wallet_daily_stats
+    WHERE user_id = ? AND stat_date = ?
+"""
+
+# Signed balance contribution of a paid transaction (refunds are not counted,
+# same as the original full-history calculation)
+_SIGNED_AMOUNT = """
+    CASE transaction_type
+        WHEN 'receive' THEN actual_amount_minor
+        WHEN 'pay' THEN -actual_amount_minor
+        ELSE 0
+    END
+"""
+
+
+class WalletRepository:
+    """
+    Repository for the wallet ledger.
+
+    ``wallet_balances`` holds one row per user and ``wallet_daily_stats`` one
+    row per user and day (UTC date of ``created_at``, like the original
+    ``DATE(created_at) = DATE('now')`` filter). Both only count paid
+    transactions, hold integer minor units (fen) and are maintained
+    incrementally by ``TransactionRepository.update_transaction_status`` in
+    the same database transaction as the status change; ``rebuild``
+    recomputes them from ``transactions``.
+    """
+
+    @staticmethod
+    def apply_transaction(cursor: sqlite3.Cursor, transaction: dict, sign: int = 1):
+        """
+        Add (or with ``sign=-1`` remove) a paid transaction to the ledger.
+
+        Runs on the caller's cursor so it commits or rolls back together
+        with the status change.
+
+        Args:
+            cursor: Cursor inside the caller's transaction
+            transaction: Transaction row (user_id, transaction_type, actual_amount_minor, created_at)
+            sign: 1 when the transaction became paid, -1 when it stopped being paid
+        """
+        transaction_type = transaction['transaction_type']
+        if transaction_type not in ('receive', 'pay'):
+            return
+
+        amount = transaction['actual_amount_minor'] * sign
+        receive = amount if transaction_type == 'receive' else 0
+        pay = amount if transaction_type == 'pay' else 0
+        receive_count = sign if transaction_type == 'receive' else 0
+        pay_count = sign if transaction_type == 'pay' else 0
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        stat_date = str(transaction['created_at'])[:10]
+
+        cursor.execute("""
+            INSERT INTO wallet_balances
+            (user_id, balance_minor, total_receive_minor, total_pay_minor, paid_count, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                balance_minor = balance_minor + excluded.balance_minor,
+                total_receive_minor = total_receive_minor + excluded.total_receive_minor,
+                total_pay_minor = total_pay_minor + excluded.total_pay_minor,
+                paid_count = paid_count + excluded.paid_count,
+                updated_at = excluded.updated_at
+        """, (transaction['user_id'], receive - pay, receive, pay, sign, now))
+
+        cursor.execute("""
+            INSERT INTO wallet_daily_stats
+            (user_id, stat_date, receive_minor, pay_minor, receive_count, pay_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, stat_date) DO UPDATE SET
+                receive_minor = receive_minor + excluded.receive_minor,
+                pay_minor = pay_minor + excluded.pay_minor,
+                receive_count = receive_count + excluded.receive_count,
+                pay_count = pay_count + excluded.pay_count
+        """, (transaction['user_id'], stat_date, receive, pay, receive_count, pay_count))
+
+    @staticmethod
+    async def get_overview(user_id: int, stat_date: Optional[str] = None) -> dict:
+        """
+        Get balance and one day's totals with two primary-key lookups.
+
+        Args:
+            user_id: User ID
+            stat_date: Day (YYYY-MM-DD, UTC), defaults to today
+
+        Returns:
+            Dictionary with balance, today_receive and today_pay (Decimal yuan)
+        """
+        stat_date = stat_date or datetime.utcnow().strftime("%Y-%m-%d")
+
+        def _fetch(conn: sqlite3.Connection) -> dict:
+            balance = conn.execute(WALLET_BALANCE_SQL, (user_id,)).fetchone()
+            today = conn.execute(WALLET_DAY_SQL, (user_id, stat_date)).fetchone()
+            return {
+                'balance': from_minor(balance['balance_minor'] if balance else 0),
+                'today_receive': from_minor(today['receive_minor'] if today else 0),
+                'today_pay': from_minor(today['pay_minor'] if today else 0),
+            }
+
+        return await db.read(_fetch)
+
+    @staticmethod
+    def rebuild_queries(user_id: Optional[int] = None, now: str = "") -> List[Tuple[str, tuple]]:
+        """
+        Build the statements of ``rebuild``, in execution order.
+
+        Args:
+            user_id: Only rebuild this user (default: everyone)
+            now: updated_at of the rebuilt balances
+
+        Returns:
+            (query, params) of the two deletes and the two inserts; the
+            first insert's row count is the number of balances written
+        """
+        user_filter = " AND user_id = ?" if user_id is not None else ""
+        params = (user_id,) if user_id is not None else ()
+        where = "WHERE 1 = 1" + user_filter
+        return [
+            (f"DELETE FROM wallet_balances {where}", params),
+            (f"DELETE FROM wallet_daily_stats {where}", params),
+            (f"""
+                INSERT INTO wallet_balances
+                (user_id, balance_minor, total_receive_minor, total_pay_minor, paid_count, updated_at)
+                SELECT user_id,
+                       SUM({_SIGNED_AMOUNT}),
+                       SUM(CASE WHEN transaction_type = 'receive' THEN actual_amount_minor ELSE 0 END),
+                       SUM(CASE WHEN transaction_type = 'pay' THEN actual_amount_minor ELSE 0 END),
+                       SUM(CASE WHEN transaction_type IN ('receive', 'pay') THEN 1 ELSE 0 END),
+                       ?
+                FROM transactions
+                WHERE status = 'paid'{user_filter}
+                GROUP BY user_id
+            """, (now,) + params),
+            (f"""
+                INSERT INTO wallet_daily_stats
+                (user_id, stat_date, receive_minor, pay_minor, receive_count, pay_count)
+                SELECT user_id, DATE(created_at),
+                       SUM(CASE WHEN transaction_type = 'receive' THEN actual_amount_minor ELSE 0 END),
+                       SUM(CASE WHEN transaction_type = 'pay' THEN actual_amount_minor ELSE 0 END),
+                       SUM(CASE WHEN transaction_type = 'receive' THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN transaction_type = 'pay' THEN 1 ELSE 0 END)
+                FROM transactions
+                WHERE status = 'paid'{user_filter}
+                GROUP BY user_id, DATE(created_at)
+            """, params),
+        ]
+
+    @staticmethod
+    async def rebuild(user_id: Optional[int] = None) -> int:
+        """
+        Recompute the ledger from ``transactions``.
+
+        Args:
+            user_id: Only rebuild this user (default: everyone)
+
+        Returns:
+            Number of balance rows written
+        """
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        statements = WalletRepository.rebuild_queries(user_id, now)
+
+        def _rebuild(conn: sqlite3.Connection) -> int:
+            rowcounts = [conn.execute(query, params).rowcount for query, params in statements]
+            return rowcounts[2]
+
+        written = await db.transaction(_rebuild)
+        logger.info(f"Wallet ledger rebuilt ({written} balances"
+                    f"{f' for user {user_id}' if user_id is not None else ''})")
+        return written
+
+    @staticmethod
+    async def find_mismatches(limit: int = 100) -> List[dict]:
+        """
+        Compare ledger balances with a full recomputation from ``transactions``.
+
+        Both sides are integer sums, so any difference is real drift.
+
+        Args:
+            limit: Maximum number of mismatches returned
+
+        Returns:
+            List of {user_id, ledger_balance, actual_balance} in minor units
+        """
+        return await db.fetch_all(f"""
+            SELECT user_id,
+                   COALESCE(MAX(ledger), 0) AS ledger_balance,
+                   COALESCE(MAX(actual), 0) AS actual_balance
+            FROM (
+                SELECT user_id, balance_minor AS ledger, NULL AS actual FROM wallet_balances
+                UNION ALL
+                SELECT user_id, NULL, SUM({_SIGNED_AMOUNT})
+                FROM transactions WHERE status = 'paid' GROUP BY user_id
+            )
+            GROUP BY user_id
+            HAVING COALESCE(MAX(ledger), 0) != COALESCE(MAX(actual), 0)
+            LIMIT ?
+        """, (limit,))
+
+    @staticmethod
+    async def reconcile() -> int:
+        """
+        Rebuild the ledger of every user whose balance drifted.
+
+        Returns:
+            Number of users repaired
+        """
+        mismatches = await WalletRepository.find_mismatches(limit=1000)
+        for row in mismatches:
+            logger.warning(f"Wallet ledger drift for user {row['user_id']}: "
+                           f"ledger {from_minor(row['ledger_balance'])} vs "
+                           f"transactions {from_minor(row['actual_balance'])}")
+            await WalletRepository.rebuild(row['user_id'])
+        return len(mismatches)
+
+    @staticmethod
+    async def is_empty() -> bool:
+        """Check whether the ledger has never been built"""
+        return await db.fetch_one("SELECT 1 FROM wallet_balances LIMIT 1") is None
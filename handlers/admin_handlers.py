@@ -161,32 +161,18 @@ async def callback_admin_menu(callback: CallbackQuery):
 async def handle_admin_users(callback: CallbackQuery):
     """Handle admin users management"""
     from database.db import db
-    from datetime import datetime
+    from services.dashboard_metrics import dashboard_metrics
     from utils.text_utils import format_number_markdown, format_separator
     
     # Get statistics
-    cursor = db.execute("SELECT COUNT(*) FROM users")
-    total_users = cursor.fetchone()[0]
-    
-    cursor = db.execute("SELECT COUNT(*) FROM users WHERE status = 'active'")
-    active_users = cursor.fetchone()[0]
-    
-    # Get today's new users
-    cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) = DATE('now')")
-    today_new = cursor.fetchone()[0]
-    
-    # Get VIP users
-    cursor = db.execute("SELECT COUNT(*) FROM users WHERE vip_level > 0")
-    vip_users = cursor.fetchone()[0]
+    metrics = await dashboard_metrics.get(["users.total", "users.active", "users.new_today", "users.vip"])
+    total_users = metrics["users.total"]
+    active_users = metrics["users.active"]
+    today_new = metrics["users.new_today"]
+    vip_users = metrics["users.vip"]
     
     # Get recent users
-    cursor = db.execute("""
-        SELECT user_id, username, first_name, vip_level, created_at 
-        FROM users 
-        ORDER BY created_at DESC 
-        LIMIT 10
-    """)
-    recent_users = cursor.fetchall()
+    recent_users = UserRepository.get_recent_users(10)
     
     separator = format_separator(30)
     total_users_str = format_number_markdown(total_users)
@@ -255,63 +241,22 @@ async def handle_admin_users(callback: CallbackQuery):
 
 async def handle_admin_stats(callback: CallbackQuery):
     """Handle admin statistics"""
-    from database.db import db
-    from database.transaction_repository import TransactionRepository
-    from database.referral_repository import ReferralRepository
-    from datetime import datetime, timedelta
+    from database.stats_repository import StatsRepository
     from utils.text_utils import format_separator
     
-    # Get transaction statistics
-    cursor = db.execute("SELECT COUNT(*) FROM transactions")
-    total_transactions = cursor.fetchone()[0]
-    
-    cursor = db.execute("SELECT COUNT(*) FROM transactions WHERE status = 'paid'")
-    paid_transactions = cursor.fetchone()[0]
-    
-    cursor = db.execute("SELECT SUM(amount) FROM transactions WHERE status = 'paid'")
-    total_amount = cursor.fetchone()[0] or 0
-    
-    # Get today's transactions
-    cursor = db.execute("""
-        SELECT COUNT(*), COALESCE(SUM(amount), 0) 
-        FROM transactions 
-        WHERE DATE(created_at) = DATE('now') AND status = 'paid'
-    """)
-    today_result = cursor.fetchone()
-    today_transactions = today_result[0] or 0
-    today_amount = float(today_result[1] or 0)
-    
-    # Get yesterday's transactions
-    cursor = db.execute("""
-        SELECT COUNT(*), COALESCE(SUM(amount), 0) 
-        FROM transactions 
-        WHERE DATE(created_at) = DATE('now', '-1 day') AND status = 'paid'
-    """)
-    yesterday_result = cursor.fetchone()
-    yesterday_transactions = yesterday_result[0] or 0
-    
-    # Get channel statistics
-    cursor = db.execute("""
-        SELECT payment_channel, COUNT(*) as count 
-        FROM transactions 
-        WHERE status = 'paid' 
-        GROUP BY payment_channel
-    """)
-    channel_stats = cursor.fetchall()
-    
-    # Get user statistics
-    cursor = db.execute("SELECT COUNT(*) FROM users")
-    total_users = cursor.fetchone()[0]
-    
-    cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) = DATE('now')")
-    today_new_users = cursor.fetchone()[0]
-    
-    # Get referral statistics
-    cursor = db.execute("SELECT COUNT(*) FROM referrals WHERE status = 'rewarded'")
-    successful_invites = cursor.fetchone()[0]
-    
-    cursor = db.execute("SELECT COALESCE(SUM(total_rewards), 0) FROM referral_codes")
-    total_referral_rewards = float(cursor.fetchone()[0] or 0)
+    # All metrics come from the pre-aggregated rollups
+    stats = await StatsRepository.get_overview()
+    total_transactions = stats['total_transactions']
+    paid_transactions = stats['paid_transactions']
+    total_amount = stats['total_amount']
+    today_transactions = stats['today']['count']
+    today_amount = stats['today']['total']
+    yesterday_transactions = stats['yesterday']['count']
+    channel_stats = stats['channels']
+    total_users = stats['total_users']
+    today_new_users = stats['today_new_users']
+    successful_invites = stats['successful_invites']
+    total_referral_rewards = stats['referral_rewards']
     
     separator = format_separator(30)
     total_transactions_str = format_number_markdown(total_transactions)
@@ -727,6 +672,148 @@ async def cmd_add_word(message: Message):
         logger.error(f"Error in cmd_add_word: {e}", exc_info=True)
 
 
+@router.message(Command("purgeaicache"))
+async def cmd_purge_ai_cache(message: Message):
+    """Purge AI FAQ answer cache command"""
+    try:
+        if not is_admin(message.from_user.id):
+            await message.answer("❌ 您不是管理員，無權限執行此操作")
+            return
+        
+        from services.ai_service import get_ai_service
+        
+        cache = get_ai_service().response_cache
+        if cache is None:
+            await message.answer("ℹ️ AI 回答缓存未启用")
+            return
+        
+        stats = cache.stats()
+        removed = cache.purge()
+        text = (
+            f"✅ 已清空 AI 回答缓存：{removed} 条\n"
+            f"命中率：{stats['hit_rate'] * 100:.1f}% "
+            f"（精确 {stats['hits_exact']} / 近似 {stats['hits_similar']} / 未命中 {stats['misses']}）"
+        )
+        await message.answer(escape_markdown_v2(text), parse_mode="MarkdownV2")
+        logger.info(f"Admin {message.from_user.id} purged AI response cache ({removed} entries)")
+            
+    except Exception as e:
+        logger.error(f"Error in cmd_purge_ai_cache: {e}", exc_info=True)
+
+
+@router.message(Command("reconcilewallets"))
+async def cmd_reconcile_wallets(message: Message):
+    """Reconcile (or with "full" rebuild) the wallet ledger command"""
+    try:
+        if not is_admin(message.from_user.id):
+            await message.answer("❌ 您不是管理員，無權限執行此操作")
+            return
+        
+        from database.wallet_repository import WalletRepository
+        
+        args = message.text.split()
+        if len(args) > 1 and args[1] == "full":
+            written = await WalletRepository.rebuild()
+            text = f"✅ 钱包账本已重建：{written} 个用户"
+        else:
+            repaired = await WalletRepository.reconcile()
+            text = f"✅ 钱包账本对账完成，修复 {repaired} 个用户"
+        
+        await message.answer(escape_markdown_v2(text), parse_mode="MarkdownV2")
+        logger.info(f"Admin {message.from_user.id} ran wallet reconciliation: {text}")
+        
+    except Exception as e:
+        logger.error(f"Error in cmd_reconcile_wallets: {e}", exc_info=True)
+        await message.answer("❌ 对账失败，请查看日志")
+
+
+@router.message(Command("rebuildstats"))
+async def cmd_rebuild_stats(message: Message):
+    """Rebuild admin statistics rollups command"""
+    try:
+        if not is_admin(message.from_user.id):
+            await message.answer("❌ 您不是管理員，無權限執行此操作")
+            return
+        
+        from database.stats_repository import StatsRepository
+        from services.dashboard_metrics import dashboard_metrics
+        
+        await StatsRepository.rebuild()
+        dashboard_metrics.invalidate()
+        await message.answer(escape_markdown_v2("✅ 统计汇总表已重建"), parse_mode="MarkdownV2")
+        logger.info(f"Admin {message.from_user.id} rebuilt statistics rollups")
+        
+    except Exception as e:
+        logger.error(f"Error in cmd_rebuild_stats: {e}", exc_info=True)
+        await message.answer("❌ 重建失败，请查看日志")
+
+
+@router.message(Command("setrate"))
+async def cmd_set_rate(message: Message):
+    """Set the fee rate of a channel and VIP level command"""
+    try:
+        if not is_admin(message.from_user.id):
+            await message.answer("❌ 您不是管理員，無權限執行此操作")
+            return
+        
+        from database.rate_repository import RateRepository
+        
+        args = message.text.split()
+        usage = escape_markdown_v2("❌ 格式：/setrate <alipay|wechat> <VIP等级> <费率%>\n示例：/setrate alipay 1 0.55")
+        if len(args) < 4 or args[1] not in ("alipay", "wechat"):
+            await message.answer(usage, parse_mode="MarkdownV2")
+            return
+        
+        try:
+            vip_level = int(args[2])
+            percentage = float(args[3])
+        except ValueError:
+            await message.answer(usage, parse_mode="MarkdownV2")
+            return
+        
+        if not 0 <= percentage < 100:
+            await message.answer("❌ 费率必须在 0 到 100 之间")
+            return
+        
+        # Stored as a fraction; the rate table is reloaded on the next lookup
+        if RateRepository.set_rate(args[1], vip_level, percentage / 100):
+            text = f"✅ 已更新费率：{args[1]} VIP{vip_level} = {percentage}%"
+            logger.info(f"Admin {message.from_user.id} set rate {args[1]} VIP{vip_level} to {percentage}%")
+        else:
+            text = f"❌ 未找到 {args[1]} VIP{vip_level} 的费率配置"
+        await message.answer(escape_markdown_v2(text), parse_mode="MarkdownV2")
+    
+    except Exception as e:
+        logger.error(f"Error in cmd_set_rate: {e}", exc_info=True)
+        await message.answer("❌ 更新失败，请查看日志")
+
+
+@router.message(Command("sweeporders"))
+async def cmd_sweep_orders(message: Message):
+    """Expire due pending orders now and show sweep metrics command"""
+    try:
+        if not is_admin(message.from_user.id):
+            await message.answer("❌ 您不是管理員，無權限執行此操作")
+            return
+        
+        from services.order_expiry import order_expiry_sweeper
+        
+        expired = await order_expiry_sweeper.run_once()
+        stats = order_expiry_sweeper.stats
+        text = (
+            f"✅ 本次过期订单：{expired} 笔\n"
+            f"累计：{stats['expired']} 笔 / {stats['runs']} 次扫描"
+            f"（上次耗时 {stats['last_duration_ms']} ms）\n"
+            f"过期通知：成功 {stats['notified']} / 失败 {stats['notify_failed']}"
+        )
+        await message.answer(escape_markdown_v2(text), parse_mode="MarkdownV2")
+        logger.info(f"Admin {message.from_user.id} ran the order expiry sweep ({expired} expired)")
+        
+    except Exception as e:
+        logger.error(f"Error in cmd_sweep_orders: {e}", exc_info=True)
+        await message.answer("❌ 扫描失败，请查看日志")
+
+
 async def handle_admin_user_search(callback: CallbackQuery):
     """Handle user search functionality"""
     try:
@@ -775,46 +862,24 @@ async def handle_admin_user_search(callback: CallbackQuery):
 async def handle_admin_user_report(callback: CallbackQuery):
     """Handle user report functionality"""
     try:
-        from database.db import db
-        from utils.text_utils import format_separator, format_datetime_markdown
-        from datetime import datetime, timedelta
+        from database.stats_repository import StatsRepository
+        from services.dashboard_metrics import dashboard_metrics
+        from utils.text_utils import format_separator
         
         separator = format_separator(30)
         
-        # Get user growth statistics
-        cursor = db.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-        
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) = DATE('now')")
-        today_new = cursor.fetchone()[0]
-        
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) >= DATE('now', '-7 days')")
-        week_new = cursor.fetchone()[0]
-        
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) >= DATE('now', '-30 days')")
-        month_new = cursor.fetchone()[0]
-        
-        # Get active users (users active in last 7 days)
-        cursor = db.execute("""
-            SELECT COUNT(DISTINCT user_id) 
-            FROM transactions 
-            WHERE DATE(created_at) >= DATE('now', '-7 days')
-        """)
-        week_active = cursor.fetchone()[0] or 0
-        
-        # Get VIP users
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE vip_level > 0")
-        vip_users = cursor.fetchone()[0]
-        
-        # Get VIP distribution
-        cursor = db.execute("""
-            SELECT vip_level, COUNT(*) as count 
-            FROM users 
-            WHERE vip_level > 0 
-            GROUP BY vip_level 
-            ORDER BY vip_level
-        """)
-        vip_distribution = cursor.fetchall()
+        # User growth, activity and VIP metrics
+        metrics = await dashboard_metrics.get([
+            "users.total", "users.new_today", "users.new_7d", "users.new_30d",
+            "users.active_7d", "users.vip",
+        ])
+        total_users = metrics["users.total"]
+        today_new = metrics["users.new_today"]
+        week_new = metrics["users.new_7d"]
+        month_new = metrics["users.new_30d"]
+        week_active = metrics["users.active_7d"]
+        vip_users = metrics["users.vip"]
+        vip_distribution = await StatsRepository.get_vip_distribution()
         
         total_users_str = format_number_markdown(total_users)
         today_new_str = format_number_markdown(today_new)
@@ -875,65 +940,33 @@ async def handle_admin_user_report(callback: CallbackQuery):
 async def handle_admin_stats_time(callback: CallbackQuery):
     """Handle time-based statistics"""
     try:
-        from database.db import db
+        from database.stats_repository import StatsRepository
         from utils.text_utils import format_separator
         
         separator = format_separator(30)
         
-        # Get today's statistics
-        cursor = db.execute("""
-            SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            WHERE DATE(created_at) = DATE('now') AND status = 'paid'
-        """)
-        today_result = cursor.fetchone()
-        today_count = today_result['count'] or 0
-        today_amount = float(today_result['total'] or 0)
-        
-        # Get yesterday's statistics
-        cursor = db.execute("""
-            SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            WHERE DATE(created_at) = DATE('now', '-1 day') AND status = 'paid'
-        """)
-        yesterday_result = cursor.fetchone()
-        yesterday_count = yesterday_result['count'] or 0
-        yesterday_amount = float(yesterday_result['total'] or 0)
-        
-        # Get this week's statistics
-        cursor = db.execute("""
-            SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            WHERE DATE(created_at) >= DATE('now', '-7 days') AND status = 'paid'
-        """)
-        week_result = cursor.fetchone()
-        week_count = week_result['count'] or 0
-        week_amount = float(week_result['total'] or 0)
-        
-        # Get this month's statistics
-        cursor = db.execute("""
-            SELECT COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            WHERE DATE(created_at) >= DATE('now', 'start of month') AND status = 'paid'
-        """)
-        month_result = cursor.fetchone()
-        month_count = month_result['count'] or 0
-        month_amount = float(month_result['total'] or 0)
-        
-        # Get user statistics
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) = DATE('now')")
-        today_users = cursor.fetchone()[0]
-        
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) >= DATE('now', '-7 days')")
-        week_users = cursor.fetchone()[0]
-        
-        cursor = db.execute("SELECT COUNT(*) FROM users WHERE DATE(created_at) >= DATE('now', 'start of month')")
-        month_users = cursor.fetchone()[0]
+        # Paid totals and signups per period from the rollups
+        stats = await StatsRepository.get_time_stats()
+        last_24h_count = stats['last_24h']['count']
+        last_24h_amount = stats['last_24h']['total']
+        today_count = stats['today']['count']
+        today_amount = stats['today']['total']
+        yesterday_count = stats['yesterday']['count']
+        yesterday_amount = stats['yesterday']['total']
+        week_count = stats['week']['count']
+        week_amount = stats['week']['total']
+        month_count = stats['month']['count']
+        month_amount = stats['month']['total']
+        today_users = stats['today_users']
+        week_users = stats['week_users']
+        month_users = stats['month_users']
         
         # Calculate growth rates
         today_growth = ((today_amount - yesterday_amount) / yesterday_amount * 100) if yesterday_amount > 0 else 0
         week_growth = ((week_amount - (yesterday_amount * 7)) / (yesterday_amount * 7) * 100) if yesterday_amount > 0 else 0
         
+        last_24h_count_str = format_number_markdown(last_24h_count)
+        last_24h_amount_str = format_amount_markdown(last_24h_amount)
         today_count_str = format_number_markdown(today_count)
         today_amount_str = format_amount_markdown(today_amount)
         yesterday_count_str = format_number_markdown(yesterday_count)
@@ -954,6 +987,8 @@ async def handle_admin_stats_time(callback: CallbackQuery):
             f"{separator}\n\n"
             f"*💳 交易统计*\n"
             f"{separator}\n"
+            f"*近24小时*\n"
+            f"交易：{last_24h_count_str} 笔 / {last_24h_amount_str}\n\n"
             f"*今日*\n"
             f"交易：{today_count_str} 笔 / {today_amount_str}\n"
         )
@@ -1009,36 +1044,16 @@ async def handle_admin_stats_time(callback: CallbackQuery):
 async def handle_admin_stats_detail(callback: CallbackQuery):
     """Handle detailed statistics report"""
     try:
-        from database.db import db
+        from database.stats_repository import StatsRepository
         from utils.text_utils import format_separator
         
         separator = format_separator(30)
         
-        # Get detailed transaction statistics
-        cursor = db.execute("""
-            SELECT status, COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            GROUP BY status
-        """)
-        status_stats = cursor.fetchall()
-        
-        # Get channel statistics
-        cursor = db.execute("""
-            SELECT payment_channel, COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            WHERE status = 'paid'
-            GROUP BY payment_channel
-        """)
-        channel_stats = cursor.fetchall()
-        
-        # Get transaction type statistics
-        cursor = db.execute("""
-            SELECT transaction_type, COUNT(*) as count, COALESCE(SUM(amount), 0) as total 
-            FROM transactions 
-            WHERE status = 'paid'
-            GROUP BY transaction_type
-        """)
-        type_stats = cursor.fetchall()
+        # Per-status, per-channel and per-type totals from the rollups
+        stats = await StatsRepository.get_detail_stats()
+        status_stats = stats['status']
+        channel_stats = stats['channels']
+        type_stats = stats['types']
         
         text = (
             f"{separator}\n"
@@ -2,39 +2,20 @@
 AI chat handlers for user messages
 """
 import logging
+import time
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from keyboards.main_kb import get_main_keyboard
 from services.ai_service import get_ai_service, AIService
+from services.conversation_store import conversation_store
 from database.admin_repository import AdminRepository
 from config import Config
-from utils.text_utils import escape_markdown_v2
+from utils.message_streamer import MessageStreamer
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-# In-memory conversation history storage (simple implementation)
-# In production, you might want to store this in database
-_conversation_history: dict[int, list[dict[str, str]]] = {}
-
-
-def get_conversation_history(user_id: int) -> list[dict[str, str]]:
-    """Get conversation history for user"""
-    return _conversation_history.get(user_id, [])
-
-
-def add_to_history(user_id: int, role: str, content: str):
-    """Add message to conversation history"""
-    if user_id not in _conversation_history:
-        _conversation_history[user_id] = []
-    
-    _conversation_history[user_id].append({"role": role, "content": content})
-    
-    # Keep only last 10 messages
-    if len(_conversation_history[user_id]) > 10:
-        _conversation_history[user_id] = _conversation_history[user_id][-10:]
-
 
 @router.callback_query(F.data == "ai_chat")
 async def callback_ai_chat(callback: CallbackQuery):
@@ -44,7 +25,7 @@ async def callback_ai_chat(callback: CallbackQuery):
         is_admin = AdminRepository.is_admin(user_id)
         
         # Clear conversation history when starting new AI chat session
-        _conversation_history[user_id] = []
+        await conversation_store.clear(user_id)
         
         text = (
             "*🤖 AI 智能助手*\n\n"
@@ -95,7 +76,7 @@ async def handle_ai_message(message: Message):
         # Handle /exit command to exit AI mode
         if user_text.lower() == '/exit':
             # Clear conversation history
-            _conversation_history.pop(user_id, None)
+            await conversation_store.clear(user_id)
             is_admin = AdminRepository.is_admin(user_id)
             await message.answer(
                 "*🤖 AI 模式已退出*\n\n"
@@ -125,32 +106,33 @@ async def handle_ai_message(message: Message):
             )
             return
         
-        # Get conversation history
-        history = get_conversation_history(user_id)
+        # Get conversation history (before this message, it is sent separately)
+        history = await conversation_store.get_history(user_id)
         
         # Add user message to history
-        add_to_history(user_id, "user", user_text)
+        await conversation_store.append(user_id, "user", user_text)
         
-        # Show typing indicator (if supported)
-        try:
-            await message.bot.send_chat_action(message.chat.id, "typing")
-        except:
-            pass
+        # Show placeholder and edit it as the answer streams in
+        streamer = MessageStreamer(message, edit_interval=Config.AI_STREAM_EDIT_INTERVAL)
+        await streamer.start()
         
         # Generate AI response with user's language
-        ai_response = ai_service.generate_response(user_text, history, user_language)
+        stream = ai_service.stream_response(user_text, history, user_language)
+        try:
+            async for chunk in stream:
+                await streamer.push(chunk)
+        finally:
+            await stream.aclose()
+        ai_response = streamer.text.strip()
         
         # Add AI response to history
-        add_to_history(user_id, "assistant", ai_response)
+        await conversation_store.append(user_id, "assistant", ai_response)
         
         # Check if should show support button
         should_show_support = ai_service._should_escalate_to_human(ai_response) or \
                               "联系客服" in ai_response or \
                               "人工客服" in ai_response
         
-        # Escape MarkdownV2
-        escaped_response = escape_markdown_v2(ai_response)
-        
         # Create reply markup
         reply_markup = None
         if should_show_support:
@@ -172,14 +154,17 @@ async def handle_ai_message(message: Message):
                 )]
             ])
         
-        # Send AI response
-        await message.answer(
-            escaped_response,
-            parse_mode="MarkdownV2",
-            reply_markup=reply_markup
-        )
+        # Final edit with the complete answer and keyboard
+        await streamer.finish(reply_markup=reply_markup)
         
-        logger.info(f"User {user_id} received AI response")
+        # Time to first visible answer text is the latency users perceive
+        ttft = streamer.time_to_first_text
+        total = time.monotonic() - streamer.started_at
+        logger.info(
+            f"User {user_id} received AI response "
+            f"(first text: {f'{ttft:.2f}s' if ttft is not None else 'n/a'}, "
+            f"total: {total:.2f}s, edits: {streamer.edits})"
+        )
         
     except Exception as e:
         logger.error(f"Error in handle_ai_message: {e}", exc_info=True)
@@ -2,7 +2,10 @@
 Calculator-related handlers
 """
 import logging
+from dataclasses import replace
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, Message
 from keyboards.calculator_kb import (
     get_calculator_type_keyboard, get_calculator_channel_keyboard,
@@ -16,8 +19,17 @@ from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_
 router = Router()
 logger = logging.getLogger(__name__)
 
-# Store calculator state
-_calc_states = {}
+
+
+class CalculatorFlow(StatesGroup):
+    """Calculator waiting for an amount; data: channel or exchange_direction"""
+    fee = State()
+    exchange = State()
+
+
+def calc_context(state: FSMContext) -> FSMContext:
+    """The calculator's own FSM context, so it does not end a payment flow in progress"""
+    return FSMContext(storage=state.storage, key=replace(state.key, destiny="calculator"))
 
 
 @router.callback_query(F.data == "calculator")
@@ -43,10 +55,12 @@ async def callback_calculator(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "calc_fee")
-async def callback_calc_fee(callback: CallbackQuery):
+async def callback_calc_fee(callback: CallbackQuery, state: FSMContext):
     """Handle fee calculator"""
     try:
-        _calc_states[callback.from_user.id] = {"type": "fee"}
+        calc = calc_context(state)
+        await calc.set_state(CalculatorFlow.fee)
+        await calc.set_data({})
         
         text = (
             "*💰 费率计算器*\n\n"
@@ -67,16 +81,12 @@ async def callback_calc_fee(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("calc_channel_"))
-async def callback_calc_channel(callback: CallbackQuery):
+async def callback_calc_channel(callback: CallbackQuery, state: FSMContext):
     """Handle calculator channel selection"""
     try:
         channel = callback.data.split("_")[-1]
-        user_id = callback.from_user.id
-        
-        if user_id not in _calc_states:
-            _calc_states[user_id] = {}
         
-        _calc_states[user_id]["channel"] = channel
+        await calc_context(state).update_data(channel=channel)
         
         channel_text = "支付寶" if channel == "alipay" else "微信"
         
@@ -105,11 +115,12 @@ async def callback_calc_channel(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "calc_exchange")
-async def callback_calc_exchange(callback: CallbackQuery):
+async def callback_calc_exchange(callback: CallbackQuery, state: FSMContext):
     """Handle exchange rate calculator"""
     try:
-        user_id = callback.from_user.id
-        _calc_states[user_id] = {"type": "exchange"}
+        calc = calc_context(state)
+        await calc.set_state(CalculatorFlow.exchange)
+        await calc.set_data({})
         
         # Get current exchange rate (default 7.42)
         exchange_rate = 7.42  # Can be fetched from database or API
@@ -138,16 +149,12 @@ async def callback_calc_exchange(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("exchange_"))
-async def callback_exchange_direction(callback: CallbackQuery):
+async def callback_exchange_direction(callback: CallbackQuery, state: FSMContext):
     """Handle exchange direction selection"""
     try:
         direction = callback.data.replace("exchange_", "")
-        user_id = callback.from_user.id
-        
-        if user_id not in _calc_states:
-            _calc_states[user_id] = {}
         
-        _calc_states[user_id]["exchange_direction"] = direction
+        await calc_context(state).update_data(exchange_direction=direction)
         
         exchange_rate = 7.42  # Default rate
         rate_str = escape_markdown_v2(f"1 USDT = {exchange_rate} CNY")
@@ -184,28 +191,29 @@ async def callback_exchange_direction(callback: CallbackQuery):
 
 
 @router.message(F.text.regexp(r'^\d+(\.\d+)?$'))
-async def handle_calculator_amount(message: Message):
+async def handle_calculator_amount(message: Message, state: FSMContext):
     """Handle amount input for calculator (both fee and exchange)"""
     try:
         user_id = message.from_user.id
         
         # Check if user is in calculator mode
-        if user_id not in _calc_states:
+        calc = calc_context(state)
+        calc_type = await calc.get_state()
+        if calc_type is None:
             return  # Not in calculator mode
         
-        state = _calc_states[user_id]
-        calc_type = state.get("type")
+        data = await calc.get_data()
         
         try:
             amount = float(message.text)
             
             # Fee calculator
-            if calc_type == "fee":
+            if calc_type == CalculatorFlow.fee.state:
                 if amount < 1 or amount > 500000:
                     await message.answer("❌ 金额超出範圍（¥1 - ¥500,000）")
                     return
                 
-                channel = state.get("channel", "alipay")
+                channel = data.get("channel", "alipay")
                 
                 # Get user VIP level
                 user = UserRepository.get_user(user_id)
@@ -238,12 +246,12 @@ async def handle_calculator_amount(message: Message):
                 )
                 
                 # Clear state
-                _calc_states.pop(user_id, None)
+                await calc.clear()
             
             # Exchange calculator
-            elif calc_type == "exchange":
+            elif calc_type == CalculatorFlow.exchange.state:
                 exchange_rate = 7.42  # Default rate
-                direction = state.get("exchange_direction", "usdt_cny")
+                direction = data.get("exchange_direction", "usdt_cny")
                 
                 if direction == "usdt_cny":
                     result = CalculatorService.convert_currency(amount, "USDT", "CNY", exchange_rate)
@@ -277,7 +285,7 @@ async def handle_calculator_amount(message: Message):
                 )
                 
                 # Clear state
-                _calc_states.pop(user_id, None)
+                await calc.clear()
                 
         except ValueError:
             await message.answer("❌ 请输入有效的數字")
@@ -90,7 +90,7 @@ async def handle_group_message(message: Message):
         if message.text.startswith('/'):
             return
         
-        # Check sensitive words
+        # Check sensitive words (strictest action among all matched words)
         sensitive_word = SensitiveWordsRepository.check_message(message.text, group_id)
         
         if sensitive_word:
@@ -3,6 +3,8 @@ Payment-related handlers
 """
 import logging
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, Message
 from keyboards.payment_kb import (
     get_payment_type_keyboard, get_amount_quick_keyboard,
@@ -11,18 +13,24 @@ from keyboards.payment_kb import (
 from keyboards.main_kb import get_main_keyboard
 from services.transaction_service import TransactionService
 from services.calculator_service import CalculatorService
-from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_percentage_markdown
+from utils.text_utils import (
+    escape_markdown_v2, format_amount_markdown, format_money_markdown, format_percentage_markdown
+)
 from database.user_repository import UserRepository
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-# Store payment state (in production, use Redis or database)
-_payment_states = {}
+
+
+class PaymentFlow(StatesGroup):
+    """Steps of creating an order; data: channel, type, amount, vip_level"""
+    choosing_type = State()
+    confirming = State()
 
 
 @router.callback_query(F.data == "pay_ali")
-async def callback_pay_ali(callback: CallbackQuery):
+async def callback_pay_ali(callback: CallbackQuery, state: FSMContext):
     """Handle Alipay payment channel selection"""
     try:
         await callback.answer("正在启动支付宝通道...", show_alert=False)
@@ -38,7 +46,8 @@ async def callback_pay_ali(callback: CallbackQuery):
             reply_markup=get_payment_type_keyboard()
         )
         
-        _payment_states[callback.from_user.id] = {"channel": "alipay"}
+        await state.set_state(PaymentFlow.choosing_type)
+        await state.set_data({"channel": "alipay"})
         
         logger.info(f"User {callback.from_user.id} selected Alipay payment channel")
         
@@ -48,7 +57,7 @@ async def callback_pay_ali(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "pay_wechat")
-async def callback_pay_wechat(callback: CallbackQuery):
+async def callback_pay_wechat(callback: CallbackQuery, state: FSMContext):
     """Handle WeChat payment channel selection"""
     try:
         await callback.answer("正在啟動微信支付通道...", show_alert=False)
@@ -64,7 +73,8 @@ async def callback_pay_wechat(callback: CallbackQuery):
             reply_markup=get_payment_type_keyboard()
         )
         
-        _payment_states[callback.from_user.id] = {"channel": "wechat"}
+        await state.set_state(PaymentFlow.choosing_type)
+        await state.set_data({"channel": "wechat"})
         
         logger.info(f"User {callback.from_user.id} selected WeChat payment channel")
         
@@ -74,20 +84,20 @@ async def callback_pay_wechat(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.in_(["payment_receive", "payment_pay"]))
-async def callback_payment_type(callback: CallbackQuery):
+async def callback_payment_type(callback: CallbackQuery, state: FSMContext):
     """Handle payment type selection"""
     try:
         transaction_type = "receive" if callback.data == "payment_receive" else "pay"
-        user_id = callback.from_user.id
         
-        if user_id not in _payment_states:
+        data = await state.get_data()
+        if not data.get("channel"):
             await callback.answer("❌ 请重新选择支付通道", show_alert=True)
             return
         
-        _payment_states[user_id]["type"] = transaction_type
+        await state.update_data(type=transaction_type)
         
         type_text = "收款" if transaction_type == "receive" else "付款"
-        channel = _payment_states[user_id].get("channel", "支付宝")
+        channel = data["channel"]
         
         text = (
             f"*{type_text}* \\(通道: {channel}\\)\n\n"
@@ -112,31 +122,30 @@ async def callback_payment_type(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("amount_"))
-async def callback_amount_quick(callback: CallbackQuery):
+async def callback_amount_quick(callback: CallbackQuery, state: FSMContext):
     """Handle quick amount selection"""
     try:
         amount_str = callback.data.split("_")[1]
         amount = float(amount_str)
         
-        user_id = callback.from_user.id
-        if user_id not in _payment_states:
+        data = await state.get_data()
+        if not data.get("channel"):
             await callback.answer("❌ 请重新选择支付通道", show_alert=True)
             return
         
-        await process_amount(callback, amount)
+        await process_amount(callback, state, data, amount)
         
     except Exception as e:
         logger.error(f"Error in callback_amount_quick: {e}", exc_info=True)
         await callback.answer("❌ 系统错误，请稍后再试", show_alert=True)
 
 
-async def process_amount(callback: CallbackQuery, amount: float):
+async def process_amount(callback: CallbackQuery, state: FSMContext, data: dict, amount: float):
     """Process amount input and show order details"""
     user_id = callback.from_user.id
-    state = _payment_states.get(user_id, {})
     
-    channel = state.get("channel", "alipay")
-    transaction_type = state.get("type", "receive")
+    channel = data.get("channel", "alipay")
+    transaction_type = data.get("type", "receive")
     
     # Get user VIP level
     user = UserRepository.get_user(user_id)
@@ -145,9 +154,9 @@ async def process_amount(callback: CallbackQuery, amount: float):
     # Calculate fee
     calc_result = CalculatorService.calculate_fee(amount, channel, vip_level)
     
-    # Store calculation result
-    _payment_states[user_id]["amount"] = amount
-    _payment_states[user_id]["calc_result"] = calc_result
+    # The fee is computed again from the same inputs when the order is created
+    await state.update_data(amount=amount, vip_level=calc_result['vip_level'])
+    await state.set_state(PaymentFlow.confirming)
     
     type_text = "收款" if transaction_type == "receive" else "付款"
     channel_text = "支付宝" if channel == "alipay" else "微信"
@@ -178,20 +187,19 @@ async def process_amount(callback: CallbackQuery, amount: float):
 
 
 @router.callback_query(F.data.startswith("confirm_order_"))
-async def callback_confirm_order(callback: CallbackQuery):
+async def callback_confirm_order(callback: CallbackQuery, state: FSMContext):
     """Handle order confirmation"""
     try:
         user_id = callback.from_user.id
-        state = _payment_states.get(user_id, {})
+        data = await state.get_data()
         
-        if not state.get("amount") or not state.get("calc_result"):
+        if not data.get("amount") or "vip_level" not in data:
             await callback.answer("❌ 订单信息不完整，请重新操作", show_alert=True)
             return
         
-        channel = state.get("channel", "alipay")
-        transaction_type = state.get("type", "receive")
-        amount = state["amount"]
-        calc_result = state["calc_result"]
+        channel = data.get("channel", "alipay")
+        transaction_type = data.get("type", "receive")
+        amount = data["amount"]
         
         # Create transaction
         transaction = TransactionService.create_transaction(
@@ -199,19 +207,21 @@ async def callback_confirm_order(callback: CallbackQuery):
             transaction_type=transaction_type,
             payment_channel=channel,
             amount=amount,
-            description=f"{'收款' if transaction_type == 'receive' else '付款'}订单"
+            description=f"{'收款' if transaction_type == 'receive' else '付款'}订单",
+            vip_level=data["vip_level"]
         )
         
         order_id = transaction["order_id"]
         
         # Clear state
-        _payment_states.pop(user_id, None)
+        await state.clear()
         
         type_text = "收款" if transaction_type == "receive" else "付款"
         channel_text = "支付宝" if channel == "alipay" else "微信"
-        amount_str = format_amount_markdown(amount)
-        fee_str = format_amount_markdown(calc_result['fee'])
-        actual_str = format_amount_markdown(calc_result['actual_amount'])
+        currency = transaction["currency"]
+        amount_str = format_money_markdown(transaction["amount_minor"], currency)
+        fee_str = format_money_markdown(transaction["fee_minor"], currency)
+        actual_str = format_money_markdown(transaction["actual_amount_minor"], currency)
         action_text = escape_markdown_v2('到账' if transaction_type == 'receive' else '支付')
         order_id_escaped = escape_markdown_v2(order_id)
         
@@ -9,7 +9,7 @@ from keyboards.main_kb import get_main_keyboard
 from database.referral_repository import ReferralRepository
 from database.user_repository import UserRepository
 from database.admin_repository import AdminRepository
-from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_number_markdown, format_separator
+from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_money_markdown, format_number_markdown, format_separator
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -182,14 +182,14 @@ async def callback_referral_rewards(callback: CallbackQuery):
         # Get reward records
         rewards = ReferralRepository.get_user_rewards(user_id, limit=10)
         
-        # Calculate totals
-        total_rewards = sum(float(r['amount']) for r in rewards if r['status'] == 'paid')
-        pending_rewards = sum(float(r['amount']) for r in rewards if r['status'] == 'pending')
+        # Calculate totals (integer micro-USDT)
+        total_rewards = sum(r['amount_minor'] for r in rewards if r['status'] == 'paid')
+        pending_rewards = sum(r['amount_minor'] for r in rewards if r['status'] == 'pending')
         
         separator = format_separator(30)
-        total_str = format_amount_markdown(total_rewards, currency="USDT")
-        pending_str = format_amount_markdown(pending_rewards, currency="USDT")
-        paid_str = format_amount_markdown(total_rewards - pending_rewards, currency="USDT")
+        total_str = format_money_markdown(total_rewards, "USDT")
+        pending_str = format_money_markdown(pending_rewards, "USDT")
+        paid_str = format_money_markdown(total_rewards - pending_rewards, "USDT")
         
         text = (
             f"{separator}\n"
@@ -211,7 +211,7 @@ async def callback_referral_rewards(callback: CallbackQuery):
         else:
             for reward in rewards[:10]:
                 status_icon = "✅" if reward['status'] == 'paid' else "⏳"
-                amount_str = format_amount_markdown(float(reward['amount']), currency="USDT")
+                amount_str = format_money_markdown(reward['amount_minor'], "USDT")
                 desc_escaped = escape_markdown_v2(reward.get('description', '奖励'))
                 date_str = escape_markdown_v2(str(reward['created_at'])[:10])
                 
@@ -39,8 +39,7 @@ async def callback_settings(callback: CallbackQuery):
         total_pay = TransactionRepository.get_transaction_count(user_id, "pay")
         
         # Get VIP rate (example: alipay channel)
-        rate_config = RateRepository.get_rate("alipay", vip_level)
-        vip_rate = rate_config.get('rate_percentage', 0.6) if rate_config else 0.6
+        vip_rate = RateRepository.get_rate_value("alipay", vip_level) * 100
         
         # Format VIP level text
         vip_levels = {
@@ -52,7 +51,7 @@ async def callback_settings(callback: CallbackQuery):
         vip_text = vip_levels.get(vip_level, f"VIP{vip_level}")
         
         # Language setting
-        language = user.get('language_code', 'zh-CN') or 'zh-CN'
+        language = user.get('preferred_language') or user.get('language_code', 'zh-CN') or 'zh-CN'
         if language.startswith('zh'):
             language_text = '简体中文' if language == 'zh-CN' else '繁體中文'
         else:
@@ -192,13 +191,16 @@ async def callback_set_language(callback: CallbackQuery):
         lang_code = callback.data.replace("set_lang_", "")
         user_id = callback.from_user.id
         
-        # Update language (if we have this field in database)
-        # For now, just show confirmation
         lang_map = {
             "zh-CN": "简体中文",
             "zh-TW": "繁體中文",
             "en": "English"
         }
+        if lang_code not in lang_map:
+            await callback.answer("❌ 不支持的语言", show_alert=True)
+            return
+        
+        UserRepository.update_preferred_language(user_id, lang_code)
         
         text = f"*✅ 语言设置已更新*\n\n已设置为：{lang_map.get(lang_code, lang_code)}"
         
@@ -378,15 +380,6 @@ async def callback_settings_vip(callback: CallbackQuery):
         total_transactions = user.get('total_transactions', 0)
         total_amount = user.get('total_amount', 0)
         
-        # Get rates for different VIP levels
-        rates = {}
-        for level in range(4):
-            rate_config = RateRepository.get_rate("alipay", level)
-            if rate_config:
-                rates[level] = float(rate_config.get('rate_percentage', 0.6))
-            else:
-                rates[level] = 0.6 - (level * 0.05)  # Default decreasing rates
-        
         vip_levels = {
             0: ("普通会员", "基础服务"),
             1: ("VIP1 银卡会员", "专属费率 0.55%"),
@@ -395,7 +388,7 @@ async def callback_settings_vip(callback: CallbackQuery):
         }
         
         current_vip_text, current_vip_desc = vip_levels.get(vip_level, (f"VIP{vip_level}", ""))
-        current_rate = rates.get(vip_level, 0.6)
+        current_rate = RateRepository.get_rate_value("alipay", vip_level) * 100
         
         separator = format_separator(30)
         current_rate_str = format_number_markdown(current_rate, decimal_places=2)
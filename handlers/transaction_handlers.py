@@ -12,7 +12,7 @@ from keyboards.transaction_kb import (
 from keyboards.main_kb import get_main_keyboard
 from database.admin_repository import AdminRepository
 from services.transaction_service import TransactionService
-from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_number_markdown
+from utils.text_utils import escape_markdown_v2, format_money_markdown, format_number_markdown
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -42,7 +42,7 @@ async def callback_transactions(callback: CallbackQuery):
                 status_icon = "✅" if trans['status'] == 'paid' else "⏳" if trans['status'] == 'pending' else "❌"
                 type_text = "收款" if trans['transaction_type'] == 'receive' else "付款"
                 channel_text = "支付宝" if trans['payment_channel'] == 'alipay' else "微信"
-                amount_str = format_amount_markdown(trans['amount'])
+                amount_str = format_money_markdown(trans['amount_minor'], trans['currency'])
                 order_id_escaped = escape_markdown_v2(trans['order_id'])
                 created_at_escaped = escape_markdown_v2(str(trans['created_at']))
                 
@@ -72,106 +72,90 @@ async def callback_transactions(callback: CallbackQuery):
         await callback.answer("❌ 获取交易记录失败，请稍后再试", show_alert=True)
 
 
+# Transactions shown per history page
+TRANSACTIONS_PAGE_SIZE = 10
+
+FILTER_NAMES = {
+    "today": "今天",
+    "week": "本周",
+    "month": "本月",
+    "receive": "收款",
+    "pay": "付款",
+    "alipay": "支付宝",
+    "wechat": "微信",
+    "all": "全部"
+}
+
+
+def _filter_params(filter_type: str) -> dict:
+    """Repository filters of a filter button"""
+    from datetime import datetime, timedelta
+    
+    if filter_type == "today":
+        return {'since': datetime.now().strftime("%Y-%m-%d")}
+    if filter_type == "week":
+        return {'since': (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")}
+    if filter_type == "month":
+        return {'since': (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")}
+    if filter_type in ("receive", "pay"):
+        return {'transaction_type': filter_type}
+    if filter_type in ("alipay", "wechat"):
+        return {'payment_channel': filter_type}
+    return {}  # "all": no filter
+
+
+async def _show_transaction_page(callback: CallbackQuery, filter_type: str,
+                                 cursor: Optional[str] = None, backward: bool = False):
+    """Render one page of the filtered transaction history"""
+    from database.transaction_repository import TransactionRepository
+    
+    page = await TransactionRepository.get_user_transactions_page_async(
+        callback.from_user.id, limit=TRANSACTIONS_PAGE_SIZE,
+        cursor=cursor, backward=backward, **_filter_params(filter_type)
+    )
+    transactions = page['transactions']
+    
+    if not transactions:
+        text = "*📜 交易记录*\n\n暂无符合条件的交易记录"
+    else:
+        filter_name = escape_markdown_v2(FILTER_NAMES.get(filter_type, filter_type))
+        text = f"*📜 交易记录*\n\n*{filter_name}：*\n\n"
+        
+        for trans in transactions:
+            status_icon = "✅" if trans['status'] == 'paid' else "⏳" if trans['status'] == 'pending' else "❌"
+            type_text = "收款" if trans['transaction_type'] == 'receive' else "付款"
+            channel_text = "支付宝" if trans['payment_channel'] == 'alipay' else "微信"
+            
+            created_at = trans['created_at'] if isinstance(trans['created_at'], str) else str(trans['created_at'])
+            if len(created_at) > 10:
+                created_at = created_at[:16]
+            
+            amount_str = format_money_markdown(trans['amount_minor'], trans['currency'])
+            order_id_escaped = escape_markdown_v2(trans['order_id'])
+            created_at_escaped = escape_markdown_v2(str(created_at))
+            
+            text += (
+                f"{status_icon} {type_text} {amount_str} \\| "
+                f"{channel_text} \\| {created_at_escaped}\n"
+                f"  订单号：`{order_id_escaped}`\n\n"
+            )
+    
+    await callback.message.edit_text(
+        text=text,
+        parse_mode="MarkdownV2",
+        reply_markup=get_transaction_list_keyboard(filter_type, page['prev_cursor'], page['next_cursor'])
+    )
+
+
 @router.callback_query(F.data.startswith("filter_"))
 async def callback_filter_transactions(callback: CallbackQuery):
     """Handle transaction filtering"""
     try:
-        from datetime import datetime, timedelta
-        from database.db import db
-        
         filter_type = callback.data.split("_")[1]
-        user_id = callback.from_user.id
         
-        transaction_type = None
-        channel = None
-        date_filter = None
-        
-        # Date filters
-        if filter_type == "today":
-            date_filter = datetime.now().strftime("%Y-%m-%d")
-        elif filter_type == "week":
-            week_ago = datetime.now() - timedelta(days=7)
-            date_filter = week_ago.strftime("%Y-%m-%d")
-        elif filter_type == "month":
-            month_ago = datetime.now() - timedelta(days=30)
-            date_filter = month_ago.strftime("%Y-%m-%d")
-        elif filter_type == "receive":
-            transaction_type = "receive"
-        elif filter_type == "pay":
-            transaction_type = "pay"
-        elif filter_type == "alipay":
-            channel = "alipay"
-        elif filter_type == "wechat":
-            channel = "wechat"
-        elif filter_type == "all":
-            pass  # No filter
-        
-        # Build query with filters
-        query = "SELECT * FROM transactions WHERE user_id = ?"
-        params = [user_id]
-        
-        if date_filter:
-            # SQLite date comparison
-            query += " AND DATE(created_at) >= ?"
-            params.append(date_filter)
-        
-        if transaction_type:
-            query += " AND transaction_type = ?"
-            params.append(transaction_type)
-        
-        if channel:
-            query += " AND payment_channel = ?"
-            params.append(channel)
-        
-        query += " ORDER BY created_at DESC LIMIT 20"
-        
-        cursor = db.execute(query, tuple(params))
-        transactions = [dict(row) for row in cursor.fetchall()]
+        await _show_transaction_page(callback, filter_type)
         
-        if not transactions:
-            text = "*📜 交易记录*\n\n暂无符合条件的交易记录"
-        else:
-            text = f"*📜 交易记录*\n\n*找到 {len(transactions)} 笔交易：*\n\n"
-            
-            for trans in transactions[:10]:
-                status_icon = "✅" if trans['status'] == 'paid' else "⏳" if trans['status'] == 'pending' else "❌"
-                type_text = "收款" if trans['transaction_type'] == 'receive' else "付款"
-                channel_text = "支付宝" if trans['payment_channel'] == 'alipay' else "微信"
-                
-                created_at = trans['created_at'] if isinstance(trans['created_at'], str) else str(trans['created_at'])
-                if len(created_at) > 10:
-                    created_at = created_at[:16]
-                
-                amount_str = format_amount_markdown(trans['amount'])
-                order_id_escaped = escape_markdown_v2(trans['order_id'])
-                created_at_escaped = escape_markdown_v2(str(created_at))
-                
-                text += (
-                    f"{status_icon} {type_text} {amount_str} \\| "
-                    f"{channel_text} \\| {created_at_escaped}\n"
-                    f"  订单号：`{order_id_escaped}`\n\n"
-                )
-            
-            if len(transactions) > 10:
-                text += f"\n还有 {len(transactions) - 10} 笔..."
-        
-        await callback.message.edit_text(
-            text=text,
-            parse_mode="MarkdownV2",
-            reply_markup=get_transaction_list_keyboard(0, len(transactions) > 10)
-        )
-        
-        filter_name_map = {
-            "today": "今天",
-            "week": "本周",
-            "month": "本月",
-            "receive": "收款",
-            "pay": "付款",
-            "alipay": "支付宝",
-            "wechat": "微信",
-            "all": "全部"
-        }
-        filter_name = filter_name_map.get(filter_type, filter_type)
+        filter_name = FILTER_NAMES.get(filter_type, filter_type)
         await callback.answer(f"已筛选：{filter_name}")
         
     except Exception as e:
@@ -179,6 +163,23 @@ async def callback_filter_transactions(callback: CallbackQuery):
         await callback.answer("❌ 筛选失败，请稍后再试", show_alert=True)
 
 
+@router.callback_query(F.data.startswith("trans_page_"))
+async def callback_transaction_page(callback: CallbackQuery):
+    """Handle transaction history next/previous page"""
+    try:
+        # trans_page_<filter>_<n|p>_<cursor>; cursors may contain "_"
+        _, _, filter_type, direction, cursor = callback.data.split("_", 4)
+        
+        await _show_transaction_page(callback, filter_type, cursor, backward=direction == "p")
+        await callback.answer()
+        
+    except ValueError:
+        await callback.answer("❌ 页面已失效，请重新筛选", show_alert=True)
+    except Exception as e:
+        logger.error(f"Error in callback_transaction_page: {e}", exc_info=True)
+        await callback.answer("❌ 获取交易记录失败，请稍后再试", show_alert=True)
+
+
 @router.callback_query(F.data.startswith("order_detail_"))
 async def callback_order_detail(callback: CallbackQuery):
     """Handle order detail view"""
@@ -200,7 +201,8 @@ async def callback_order_detail(callback: CallbackQuery):
             'paid': '✅ 支付成功',
             'failed': '❌ 支付失败',
             'refunded': '↩️ 已退款',
-            'cancelled': '🚫 已取消'
+            'cancelled': '🚫 已取消',
+            'expired': '⌛ 已过期'
         }
         
         type_map = {
@@ -215,9 +217,9 @@ async def callback_order_detail(callback: CallbackQuery):
         }
         
         order_id_escaped = escape_markdown_v2(transaction['order_id'])
-        amount_str = format_amount_markdown(transaction['amount'])
-        fee_str = format_amount_markdown(transaction['fee'])
-        actual_str = format_amount_markdown(transaction['actual_amount'])
+        amount_str = format_money_markdown(transaction['amount_minor'], transaction['currency'])
+        fee_str = format_money_markdown(transaction['fee_minor'], transaction['currency'])
+        actual_str = format_money_markdown(transaction['actual_amount_minor'], transaction['currency'])
         action_text = escape_markdown_v2('到账' if transaction['transaction_type'] == 'receive' else '支付')
         created_at_escaped = escape_markdown_v2(str(transaction['created_at']))
         
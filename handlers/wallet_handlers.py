@@ -10,9 +10,9 @@ from keyboards.main_kb import get_main_keyboard
 from database.admin_repository import AdminRepository
 from database.user_repository import UserRepository
 from database.transaction_repository import TransactionRepository
+from database.wallet_repository import WalletRepository
 from services.transaction_service import TransactionService
-from database.db import db
-from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_number_markdown, format_separator, format_datetime_markdown
+from utils.text_utils import escape_markdown_v2, format_amount_markdown, format_money_markdown, format_number_markdown, format_separator, format_datetime_markdown
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -30,42 +30,17 @@ async def callback_wallet(callback: CallbackQuery):
             await callback.answer("❌ 用户信息不存在", show_alert=True)
             return
         
-        # Calculate balance from transactions (if balance field doesn't exist)
-        # For now, we'll calculate from completed transactions
-        cursor = db.execute("""
-            SELECT transaction_type, actual_amount 
-            FROM transactions 
-            WHERE user_id = ? AND status = 'paid'
-        """, (user_id,))
-        transactions = cursor.fetchall()
-        
-        balance = 0.0
-        for trans in transactions:
-            if trans['transaction_type'] == 'receive':
-                balance += float(trans['actual_amount'])
-            elif trans['transaction_type'] == 'pay':
-                balance -= float(trans['actual_amount'])
-        
-        # Get today's statistics
-        today = datetime.now().strftime("%Y-%m-%d")
-        cursor = db.execute("""
-            SELECT transaction_type, actual_amount 
-            FROM transactions 
-            WHERE user_id = ? AND status = 'paid' 
-            AND DATE(created_at) = DATE('now')
-        """, (user_id,))
-        today_transactions = cursor.fetchall()
-        
-        today_receive = sum(float(t['actual_amount']) for t in today_transactions 
-                           if t['transaction_type'] == 'receive')
-        today_pay = sum(float(t['actual_amount']) for t in today_transactions 
-                       if t['transaction_type'] == 'pay')
+        # Balance and today's statistics from the wallet ledger
+        overview = await WalletRepository.get_overview(user_id)
+        balance = overview['balance']
+        today_receive = overview['today_receive']
+        today_pay = overview['today_pay']
         
         balance_str = format_number_markdown(balance, 2)
         today_receive_str = format_amount_markdown(today_receive)
         today_pay_str = format_number_markdown(today_pay, 2)
         total_transactions = format_number_markdown(user.get('total_transactions', 0))
-        total_amount_str = format_amount_markdown(user.get('total_amount', 0))
+        total_amount_str = format_money_markdown(user.get('total_amount_minor', 0))
         separator = format_separator(30)
         
         text = (
@@ -148,18 +123,8 @@ async def callback_wallet_withdraw(callback: CallbackQuery):
         user_id = callback.from_user.id
         user = UserRepository.get_user(user_id)
         
-        # Calculate balance
-        cursor = db.execute("""
-            SELECT transaction_type, actual_amount 
-            FROM transactions 
-            WHERE user_id = ? AND status = 'paid'
-        """, (user_id,))
-        transactions = cursor.fetchall()
-        
-        balance = sum(float(t['actual_amount']) for t in transactions 
-                     if t['transaction_type'] == 'receive')
-        balance -= sum(float(t['actual_amount']) for t in transactions 
-                      if t['transaction_type'] == 'pay')
+        # Balance from the wallet ledger
+        balance = (await WalletRepository.get_overview(user_id))['balance']
         
         balance_str = format_number_markdown(balance, 2)
         
@@ -209,35 +174,11 @@ async def callback_wallet_details(callback: CallbackQuery):
             await callback.answer("❌ 用户信息不存在", show_alert=True)
             return
         
-        # Calculate balance and today's statistics
-        cursor = db.execute("""
-            SELECT transaction_type, actual_amount 
-            FROM transactions 
-            WHERE user_id = ? AND status = 'paid'
-        """, (user_id,))
-        all_transactions = cursor.fetchall()
-        
-        balance = 0.0
-        for trans in all_transactions:
-            if trans['transaction_type'] == 'receive':
-                balance += float(trans['actual_amount'])
-            elif trans['transaction_type'] == 'pay':
-                balance -= float(trans['actual_amount'])
-        
-        # Get today's statistics
-        today = datetime.now().strftime("%Y-%m-%d")
-        cursor = db.execute("""
-            SELECT transaction_type, actual_amount 
-            FROM transactions 
-            WHERE user_id = ? AND status = 'paid' 
-            AND DATE(created_at) = DATE('now')
-        """, (user_id,))
-        today_transactions = cursor.fetchall()
-        
-        today_receive = sum(float(t['actual_amount']) for t in today_transactions 
-                           if t['transaction_type'] == 'receive')
-        today_pay = sum(float(t['actual_amount']) for t in today_transactions 
-                       if t['transaction_type'] == 'pay')
+        # Balance and today's statistics from the wallet ledger
+        overview = await WalletRepository.get_overview(user_id)
+        balance = overview['balance']
+        today_receive = overview['today_receive']
+        today_pay = overview['today_pay']
         
         # Get recent transactions
         transactions = TransactionRepository.get_user_transactions(user_id, limit=10)
@@ -290,7 +231,7 @@ async def callback_wallet_details(callback: CallbackQuery):
                 amount_sign = "+" if trans['transaction_type'] == 'receive' else "-"
                 amount_sign_escaped = escape_markdown_v2(amount_sign)
                 
-                amount_str = format_amount_markdown(trans['actual_amount'])
+                amount_str = format_money_markdown(trans['actual_amount_minor'], trans['currency'])
                 order_id_short = escape_markdown_v2(trans['order_id'][:16] + "...")
                 
                 # Fix: Use format_datetime_markdown for proper date formatting
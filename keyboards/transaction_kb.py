@@ -27,15 +27,16 @@ def get_transaction_filter_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def get_transaction_list_keyboard(page: int = 0, has_next: bool = False) -> InlineKeyboardMarkup:
-    """Keyboard for transaction list pagination"""
+def get_transaction_list_keyboard(filter_type: str = "all", prev_cursor: str = None,
+                                  next_cursor: str = None) -> InlineKeyboardMarkup:
+    """Keyboard for transaction list pagination (keyset cursors)"""
     buttons = []
     
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton(text="⬅️ 上一页", callback_data=f"trans_page_{page-1}"))
-    if has_next:
-        nav_buttons.append(InlineKeyboardButton(text="下一页 ➡️", callback_data=f"trans_page_{page+1}"))
+    if prev_cursor:
+        nav_buttons.append(InlineKeyboardButton(text="⬅️ 上一页", callback_data=f"trans_page_{filter_type}_p_{prev_cursor}"))
+    if next_cursor:
+        nav_buttons.append(InlineKeyboardButton(text="下一页 ➡️", callback_data=f"trans_page_{filter_type}_n_{next_cursor}"))
     
     if nav_buttons:
         buttons.append(nav_buttons)
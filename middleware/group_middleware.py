@@ -4,7 +4,7 @@ Middleware for group operations
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message
-from database.group_repository import GroupRepository
+from database.group_registry import group_registry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,11 +36,8 @@ class GroupMiddleware(BaseMiddleware):
                 group_id = event.chat.id
                 group_title = event.chat.title
                 
-                # Register or update group
-                GroupRepository.create_or_update_group(
-                    group_id=group_id,
-                    group_title=group_title
-                )
+                # Write only when the group is new or its title changed
+                await group_registry.ensure_registered(group_id, group_title)
             except Exception as e:
                 logger.error(f"Error registering group: {e}")
         
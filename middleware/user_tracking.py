@@ -4,8 +4,7 @@ Middleware for tracking user activity
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from services.user_service import UserService
-from database.user_repository import UserRepository
+from services.user_activity import activity_tracker
 
 
 class UserTrackingMiddleware(BaseMiddleware):
@@ -38,9 +37,9 @@ class UserTrackingMiddleware(BaseMiddleware):
         elif hasattr(event, "callback_query") and event.callback_query and event.callback_query.from_user:
             user = event.callback_query.from_user
         
-        # Register or update user data in database
+        # Register user or buffer the activity update (flushed in batches)
         if user:
-            UserService.register_user(user)
+            await activity_tracker.track(user)
         
         # Continue processing
         return await handler(event, data)
@@ -0,0 +1,210 @@
+"""
+FAQ answer cache in front of the LLM providers
+"""
+import re
+import time
+import unicodedata
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Everything that is not a letter or digit (CJK characters count as letters)
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_DIGITS = re.compile(r"\d+")
+
+CacheKey = Tuple[str, str]  # (language, normalized question)
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question for cache lookups.
+
+    Applies NFKC (full-width -> half-width), lowercases and drops
+    punctuation and whitespace, so "如何充值？" and "如何 充值" collide.
+
+    Args:
+        text: Raw user message
+
+    Returns:
+        Normalized question text
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _NON_WORD.sub("", text)
+
+
+def _ngrams(text: str, n: int = 2) -> FrozenSet[str]:
+    """Character n-grams of a normalized question"""
+    if len(text) <= n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class AIResponseCache:
+    """
+    TTL + LRU cache of AI answers keyed by (language, normalized question).
+
+    Lookups try an exact match on the normalized text first, then an
+    optional character-bigram similarity tier (Jaccard) backed by an
+    inverted index, so near-duplicate phrasings of the same FAQ share one
+    answer. Questions whose numbers differ ("100元手续费" vs "900元手续费")
+    never match by similarity. Only use it for context-free questions
+    (empty history).
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0,
+                 similarity_threshold: float = 0.0, min_length: int = 2):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Maximum number of cached answers (LRU eviction)
+            ttl: Seconds an answer stays valid
+            similarity_threshold: Minimum bigram Jaccard similarity for a
+                near-duplicate hit (0, the default, disables the similarity tier)
+            min_length: Minimum normalized question length worth caching
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.min_length = min_length
+
+        # key -> (answer, expires_at, ngrams)
+        self._entries: "OrderedDict[CacheKey, Tuple[str, float, FrozenSet[str]]]" = OrderedDict()
+        # (language, ngram) -> keys containing it
+        self._index: Dict[Tuple[str, str], Set[CacheKey]] = {}
+
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Number of cached answers"""
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from cache"""
+        lookups = self.hits_exact + self.hits_similar + self.misses
+        return (self.hits_exact + self.hits_similar) / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Cache counters"""
+        return {
+            "entries": len(self._entries),
+            "hits_exact": self.hits_exact,
+            "hits_similar": self.hits_similar,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def _remove(self, key: CacheKey):
+        """Drop an entry and its index postings"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        language = key[0]
+        for gram in entry[2]:
+            postings = self._index.get((language, gram))
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._index[(language, gram)]
+
+    def _find_similar(self, language: str, normalized: str) -> Optional[CacheKey]:
+        """Best near-duplicate key above the similarity threshold"""
+        grams = _ngrams(normalized)
+        numbers = _DIGITS.findall(normalized)
+        shared: Counter = Counter()
+        for gram in grams:
+            for key in self._index.get((language, gram), ()):
+                shared[key] += 1
+
+        best_key, best_score = None, 0.0
+        for key, common in shared.items():
+            # Amounts, order numbers and the like change the answer
+            if _DIGITS.findall(key[1]) != numbers:
+                continue
+            other = self._entries[key][2]
+            score = common / (len(grams) + len(other) - common)
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key is not None and best_score >= self.similarity_threshold:
+            return best_key
+        return None
+
+    def get(self, question: str, language: str) -> Optional[str]:
+        """
+        Look up a cached answer.
+
+        Args:
+            question: Raw user message
+            language: Normalized language code
+
+        Returns:
+            Cached answer or None
+        """
+        normalized = normalize_question(question)
+        if len(normalized) < self.min_length:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        key = (language, normalized)
+        tier = "exact"
+        if key not in self._entries and self.similarity_threshold > 0:
+            key = self._find_similar(language, normalized)
+            tier = "similar"
+
+        entry = self._entries.get(key) if key else None
+        if entry is None or entry[1] < now:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if tier == "exact":
+            self.hits_exact += 1
+        else:
+            self.hits_similar += 1
+        return entry[0]
+
+    def put(self, question: str, language: str, answer: str):
+        """
+        Store an answer.
+
+        Args:
+            question: Raw user message
+            language: Normalized language code
+            answer: Provider answer
+        """
+        normalized = normalize_question(question)
+        if len(normalized) < self.min_length or not answer:
+            return
+
+        key = (language, normalized)
+        self._remove(key)
+        grams = _ngrams(normalized)
+        self._entries[key] = (answer, time.monotonic() + self.ttl, grams)
+        for gram in grams:
+            self._index.setdefault((language, gram), set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def purge(self) -> int:
+        """
+        Drop all cached answers.
+
+        Returns:
+            Number of entries removed
+        """
+        count = len(self._entries)
+        self._entries.clear()
+        self._index.clear()
+        logger.info(f"AI response cache purged ({count} entries)")
+        return count
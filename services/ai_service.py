@@ -2,12 +2,145 @@
 AI Service for handling OpenAI and Gemini API calls with automatic fallback
 """
 import os
+import asyncio
 import logging
-from typing import Optional, List, Dict
+import random
+from typing import AsyncIterator, Awaitable, Callable, Optional, List, Dict, Tuple
 from config import Config
+from services.ai_cache import AIResponseCache
+from services.prompt_builder import PromptBuilder
 
 logger = logging.getLogger(__name__)
 
+# Provider coroutine: (user_message, conversation_history, user_language) -> answer or None
+ProviderFn = Callable[[str, Optional[List[Dict[str, str]]], Optional[str]], Awaitable[Optional[str]]]
+# Streaming provider: same arguments, yields answer text chunks as they arrive
+StreamProviderFn = Callable[[str, Optional[List[Dict[str, str]]], Optional[str]], AsyncIterator[str]]
+
+
+class FakeAIProvider:
+    """
+    Local provider that answers after a simulated latency.
+    
+    Used to benchmark latency and throughput of AIService offline
+    (set AI_FAKE_PROVIDER=1 to run the bot against it).
+    """
+    
+    def __init__(self, latency: float = 1.0, jitter: float = 0.5,
+                 tail_rate: float = 0.0, tail_latency: float = 10.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Initialize fake provider.
+        
+        Args:
+            latency: Mean response time in seconds
+            jitter: Maximum random deviation from latency in seconds
+            tail_rate: Probability of a slow (tail latency) response
+            tail_latency: Response time of slow responses in seconds
+            failure_rate: Probability of returning no answer
+            seed: Random seed for reproducible runs
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+    
+    async def __call__(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        user_language: Optional[str] = None
+    ) -> Optional[str]:
+        """Return a canned answer after the simulated latency"""
+        self.calls += 1
+        if self._random.random() < self.tail_rate:
+            delay = self.tail_latency
+        else:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+        if self._random.random() < self.failure_rate:
+            return None
+        return f"[fake] {user_message}"
+    
+    async def stream(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        user_language: Optional[str] = None,
+        chunks: int = 10
+    ) -> AsyncIterator[str]:
+        """Yield the canned answer in chunks spread over the simulated latency"""
+        self.calls += 1
+        if self._random.random() < self.tail_rate:
+            # A slow response stalls before its first chunk
+            await asyncio.sleep(self.tail_latency)
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if self._random.random() < self.failure_rate:
+            await asyncio.sleep(delay)
+            return
+        answer = f"[fake] {user_message}"
+        step = max(1, -(-len(answer) // chunks))
+        for i in range(0, len(answer), step):
+            await asyncio.sleep(delay / chunks)
+            yield answer[i:i + step]
+
+
+class ProviderStream:
+    """
+    One provider's answer stream with the per-request timeout applied to
+    each chunk.
+    
+    Errors and stalls end the iteration instead of raising; ``complete``
+    tells whether the provider finished its answer normally.
+    """
+    
+    def __init__(self, name: str, stream: AsyncIterator[str], chunk_timeout: float):
+        """
+        Initialize stream.
+        
+        Args:
+            name: Provider name (for logging)
+            stream: Provider's chunk iterator
+            chunk_timeout: Maximum seconds to wait for the next chunk
+        """
+        self.name = name
+        self.complete = False
+        self._stream = stream
+        self._chunk_timeout = chunk_timeout
+        self._done = False
+    
+    def __aiter__(self) -> "ProviderStream":
+        return self
+    
+    async def __anext__(self) -> str:
+        """Next non-empty chunk"""
+        while not self._done:
+            try:
+                chunk = await asyncio.wait_for(self._stream.__anext__(), timeout=self._chunk_timeout)
+            except StopAsyncIteration:
+                self.complete = True
+                self._done = True
+            except asyncio.TimeoutError:
+                logger.warning(f"AI provider {self.name} stream stalled for {self._chunk_timeout}s")
+                self._done = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"AI provider {self.name} stream failed: {e}", exc_info=True)
+                self._done = True
+            else:
+                if chunk:
+                    return chunk
+        raise StopAsyncIteration
+    
+    async def aclose(self):
+        """Close the provider's stream"""
+        self._done = True
+        await self._stream.aclose()
+
 
 class AIService:
     """Service for AI chat functionality with OpenAI (priority) and Gemini (fallback)"""
@@ -43,20 +176,75 @@ class AIService:
 - 如果无法回答或需要人工协助，请明确告知用户可以点击"转人工客服"按钮联系 @wushizhifu_jianglai。
 """
     
-    def __init__(self):
-        """Initialize AI service with OpenAI (priority) and Gemini (fallback)"""
+    def __init__(self, providers: Optional[List[Tuple[str, ProviderFn]]] = None,
+                 max_concurrency: int = Config.AI_MAX_CONCURRENCY,
+                 request_timeout: float = Config.AI_REQUEST_TIMEOUT,
+                 hedge_delay: float = Config.AI_HEDGE_DELAY,
+                 response_cache: Optional[AIResponseCache] = None,
+                 prompt_token_budget: int = Config.AI_PROMPT_TOKEN_BUDGET):
+        """
+        Initialize AI service with OpenAI (priority) and Gemini (fallback).
+        
+        Args:
+            providers: Explicit (name, coroutine) providers in priority order;
+                when omitted they are configured from the environment
+            max_concurrency: Maximum number of in-flight AI requests
+            request_timeout: Timeout of a single provider call in seconds
+            hedge_delay: Latency budget of a provider before the next one
+                is started in parallel (0 disables hedging)
+            response_cache: FAQ answer cache for context-free questions;
+                when omitted it is configured from Config
+            prompt_token_budget: Maximum estimated tokens of a provider prompt
+        """
+        self.request_timeout = request_timeout
+        self.hedge_delay = hedge_delay
+        if response_cache is None and Config.AI_CACHE_ENABLED:
+            response_cache = AIResponseCache(
+                max_entries=Config.AI_CACHE_MAX_ENTRIES,
+                ttl=Config.AI_CACHE_TTL,
+                similarity_threshold=Config.AI_CACHE_SIMILARITY
+            )
+        self.response_cache = response_cache
+        self.prompt_builder = PromptBuilder(
+            self.KNOWLEDGE_BASE,
+            self._get_language_instruction,
+            token_budget=prompt_token_budget,
+            summary_tokens=Config.AI_SUMMARY_TOKENS
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._providers: List[Tuple[str, ProviderFn]] = []
+        self._stream_providers: Dict[str, StreamProviderFn] = {}
+        
         self.openai_available = False
         self.gemini_available = False
         self.openai_client = None
         self.gemini_model = None
         self.current_provider = None
         
+        if providers is None and os.getenv("AI_FAKE_PROVIDER") == "1":
+            providers = [("fake", FakeAIProvider())]
+            logger.info("✅ Fake AI provider enabled")
+        
+        if providers is None:
+            self._init_providers_from_env()
+        else:
+            self._providers = list(providers)
+            for name, provider in self._providers:
+                if callable(getattr(provider, "stream", None)):
+                    self._stream_providers[name] = provider.stream
+            self.current_provider = self._providers[0][0] if self._providers else None
+        
+        if not self._providers:
+            logger.warning("⚠️ No AI service available. Please configure OPENAI_API_KEY or GEMINI_API_KEY")
+    
+    def _init_providers_from_env(self):
+        """Initialize OpenAI (priority) and Gemini (fallback) from API keys"""
         # Try to initialize OpenAI first (priority)
         openai_key = os.getenv("OPENAI_API_KEY")
         if openai_key:
             try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=openai_key)
+                from openai import AsyncOpenAI
+                self.openai_client = AsyncOpenAI(api_key=openai_key)
                 self.openai_available = True
                 self.current_provider = "openai"
                 logger.info("✅ OpenAI service initialized successfully")
@@ -88,17 +276,22 @@ class AIService:
             except Exception as e:
                 logger.warning(f"Failed to initialize Gemini service: {e}")
         
-        if not self.openai_available and not self.gemini_available:
-            logger.warning("⚠️ No AI service available. Please configure OPENAI_API_KEY or GEMINI_API_KEY")
+        if self.openai_available:
+            self._providers.append(("openai", self._generate_with_openai))
+            self._stream_providers["openai"] = self._stream_with_openai
+        if self.gemini_available:
+            self._providers.append(("gemini", self._generate_with_gemini))
+            self._stream_providers["gemini"] = self._stream_with_gemini
     
     def is_available(self) -> bool:
         """Check if any AI service is available"""
-        return self.openai_available or self.gemini_available
+        return bool(self._providers)
     
-    def _generate_with_openai(
+    async def _generate_with_openai(
         self, 
         user_message: str, 
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        user_language: Optional[str] = None
     ) -> Optional[str]:
         """Generate response using OpenAI"""
         if not self.openai_available or not self.openai_client:
@@ -106,25 +299,10 @@ class AIService:
         
         try:
             openai_model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+            messages = self._build_openai_messages(user_message, conversation_history, user_language)
             
-            # Build system message with language instruction
-            language_instruction = self._get_language_instruction(user_language)
-            system_message = self.KNOWLEDGE_BASE + "\n\n" + language_instruction
-            
-            # Build messages for OpenAI API
-            messages = [{"role": "system", "content": system_message}]
-            
-            # Add conversation history
-            if conversation_history:
-                for msg in conversation_history[-10:]:  # Keep last 10 messages
-                    role = "user" if msg.get("role") == "user" else "assistant"
-                    messages.append({"role": role, "content": msg.get("content", "")})
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
-            
-            # Call OpenAI API (new SDK format)
-            response = self.openai_client.chat.completions.create(
+            # Call OpenAI API (async client, does not block the event loop)
+            response = await self.openai_client.chat.completions.create(
                 model=openai_model,
                 messages=messages,
                 temperature=0.7,
@@ -135,11 +313,13 @@ class AIService:
             logger.info(f"OpenAI response generated successfully")
             return answer
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error generating OpenAI response: {e}", exc_info=True)
             return None
     
-    def _generate_with_gemini(
+    async def _generate_with_gemini(
         self, 
         user_message: str, 
         conversation_history: Optional[List[Dict[str, str]]] = None,
@@ -150,20 +330,10 @@ class AIService:
             return None
         
         try:
-            # Build prompt with knowledge base, language instruction, and conversation history
-            language_instruction = self._get_language_instruction(user_language)
-            prompt = self.KNOWLEDGE_BASE + "\n\n" + language_instruction + "\n\n"
-            
-            # Add conversation history if available
-            if conversation_history:
-                for msg in conversation_history[-10:]:  # Keep last 10 messages
-                    role = "用戶" if msg.get("role") == "user" else "助手"
-                    prompt += f"{role}：{msg.get('content', '')}\n"
-            
-            prompt += f"\n用戶問題：{user_message}\n\n請回答："
+            prompt = self._build_gemini_prompt(user_message, conversation_history, user_language)
             
             # Generate response
-            response = self.gemini_model.generate_content(prompt)
+            response = await self.gemini_model.generate_content_async(prompt)
             # Handle both string and object response types
             if hasattr(response, 'text'):
                 answer = response.text.strip()
@@ -172,11 +342,169 @@ class AIService:
             logger.info(f"Gemini response generated successfully")
             return answer
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error generating Gemini response: {e}", exc_info=True)
             return None
     
-    def generate_response(
+    def _build_openai_messages(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> List[Dict[str, str]]:
+        """Build chat messages (system prompt, summary, recent history, question) for OpenAI"""
+        prompt = self.prompt_builder.build(user_message, conversation_history, user_language)
+        
+        messages = [{"role": "system", "content": prompt.system}]
+        if prompt.summary:
+            messages.append({"role": "system", "content": "用户此前问过：\n" + prompt.summary})
+        
+        for msg in prompt.history:
+            role = "user" if msg.get("role") == "user" else "assistant"
+            messages.append({"role": role, "content": msg.get("content", "")})
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def _build_gemini_prompt(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> str:
+        """Build prompt with system prompt, summary and recent history for Gemini"""
+        prompt = self.prompt_builder.build(user_message, conversation_history, user_language)
+        
+        parts = [prompt.system, "\n\n"]
+        if prompt.summary:
+            parts.append("用戶此前問過：\n" + prompt.summary + "\n\n")
+        
+        for msg in prompt.history:
+            role = "用戶" if msg.get("role") == "user" else "助手"
+            parts.append(f"{role}：{msg.get('content', '')}\n")
+        
+        parts.append(f"\n用戶問題：{user_message}\n\n請回答：")
+        return "".join(parts)
+    
+    async def _stream_with_openai(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        user_language: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream response chunks from OpenAI"""
+        if not self.openai_available or not self.openai_client:
+            return
+        
+        openai_model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        stream = await self.openai_client.chat.completions.create(
+            model=openai_model,
+            messages=self._build_openai_messages(user_message, conversation_history, user_language),
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def _stream_with_gemini(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        user_language: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream response chunks from Gemini"""
+        if not self.gemini_available or not self.gemini_model:
+            return
+        
+        prompt = self._build_gemini_prompt(user_message, conversation_history, user_language)
+        response = await self.gemini_model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+    
+    async def _call_provider(
+        self,
+        name: str,
+        provider: ProviderFn,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> Optional[str]:
+        """Call one provider with the per-request timeout"""
+        try:
+            return await asyncio.wait_for(
+                provider(user_message, conversation_history, user_language),
+                timeout=self.request_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"AI provider {name} timed out after {self.request_timeout}s")
+        except Exception as e:
+            logger.error(f"AI provider {name} failed: {e}", exc_info=True)
+        return None
+    
+    async def _generate_hedged(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Run providers in priority order, hedging to the next one on failure
+        or when the latency budget is exceeded.
+        
+        Returns:
+            (answer, provider name) or (None, None) if every provider failed
+        """
+        pending: Dict[asyncio.Task, str] = {}
+        next_index = 0
+        
+        def launch_next():
+            nonlocal next_index
+            name, provider = self._providers[next_index]
+            next_index += 1
+            task = asyncio.create_task(self._call_provider(
+                name, provider, user_message, conversation_history, user_language
+            ))
+            pending[task] = name
+        
+        launch_next()
+        try:
+            while pending:
+                can_hedge = next_index < len(self._providers)
+                timeout = self.hedge_delay if can_hedge and self.hedge_delay > 0 else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if not done:
+                    logger.info(f"AI providers {list(pending.values())} exceeded {self.hedge_delay}s, "
+                                f"hedging to {self._providers[next_index][0]}")
+                    launch_next()
+                    continue
+                
+                for task in done:
+                    name = pending.pop(task)
+                    answer = task.result()
+                    if answer:
+                        return answer, name
+                    logger.info(f"AI provider {name} returned no answer")
+                
+                if next_index < len(self._providers):
+                    launch_next()
+            
+            return None, None
+        finally:
+            # Cancel slower providers (and everything if we were cancelled)
+            for task in pending:
+                task.cancel()
+    
+    async def generate_response(
         self, 
         user_message: str, 
         conversation_history: Optional[List[Dict[str, str]]] = None,
@@ -186,6 +514,15 @@ class AIService:
         Generate AI response to user message with automatic fallback.
         Priority: OpenAI -> Gemini
         
+        At most ``max_concurrency`` requests run at once. If the current
+        provider fails, or has not answered within ``hedge_delay`` seconds,
+        the next provider is started and the first answer wins; the slower
+        call is cancelled.
+        
+        Questions asked without conversation history are answered from
+        ``response_cache`` when an equal or near-duplicate question was
+        answered before in the same language.
+        
         Args:
             user_message: User's message
             conversation_history: List of previous messages [{"role": "user|assistant", "content": "..."}]
@@ -195,65 +532,305 @@ class AIService:
             AI generated response
         """
         if not self.is_available():
-            # Return message in user's language
-            if user_language == "zh-TW":
-                return "抱歉，AI 服務暫時不可用，請聯繫人工客服 @wushizhifu_jianglai"
-            elif user_language and user_language.startswith("en"):
-                return "Sorry, AI service is temporarily unavailable. Please contact customer service @wushizhifu_jianglai"
-            else:
-                return "抱歉，AI 服务暂时不可用，请联系人工客服 @wushizhifu_jianglai"
-        
-        answer = None
-        used_provider = None
+            return self._unavailable_message(user_language)
         
-        # Normalize user language (default to zh-CN for Simplified Chinese)
-        if not user_language:
-            user_language = "zh-CN"
-        elif user_language.startswith("zh"):
-            # zh, zh-CN -> zh-CN (简体中文)
-            # zh-TW, zh-HK -> zh-TW (繁体中文)
-            if user_language in ["zh-TW", "zh-HK", "zh-Hant"]:
-                user_language = "zh-TW"
-            else:
-                user_language = "zh-CN"
+        user_language = self._normalize_language(user_language)
         
-        # Try OpenAI first (priority)
-        if self.openai_available:
-            answer = self._generate_with_openai(user_message, conversation_history, user_language)
-            if answer:
-                used_provider = "openai"
-                self.current_provider = "openai"
+        # Cached answers are only valid when no earlier turn shapes the reply
+        use_cache = self.response_cache is not None and not conversation_history
+        answer = self.response_cache.get(user_message, user_language) if use_cache else None
         
-        # Fallback to Gemini if OpenAI failed or unavailable
-        if not answer and self.gemini_available:
-            logger.info("OpenAI failed or unavailable, falling back to Gemini")
-            answer = self._generate_with_gemini(user_message, conversation_history, user_language)
-            if answer:
-                used_provider = "gemini"
-                self.current_provider = "gemini"
+        if answer:
+            logger.info("AI response served from cache")
+        else:
+            async with self._semaphore:
+                answer, used_provider = await self._generate_hedged(
+                    user_message, conversation_history, user_language
+                )
+            if used_provider:
+                self.current_provider = used_provider
+            if answer and use_cache:
+                self.response_cache.put(user_message, user_language, answer)
         
         if not answer:
-            logger.error("Both OpenAI and Gemini failed to generate response")
-            # Return error message in user's language
-            if user_language == "zh-TW":
-                return "抱歉，處理您的問題時遇到錯誤，請聯繫人工客服 @wushizhifu_jianglai"
-            elif user_language and user_language.startswith("en"):
-                return "Sorry, an error occurred while processing your request. Please contact customer service @wushizhifu_jianglai"
-            else:
-                return "抱歉，处理您的问题时遇到错误，请联系人工客服 @wushizhifu_jianglai"
+            logger.error("All AI providers failed to generate response")
+            return self._error_message(user_language)
         
         # Check if response indicates need for human support
         if self._should_escalate_to_human(answer):
-            # Add escalation message in user's language
-            if user_language == "zh-TW":
-                return answer + "\n\n如果以上信息無法解決您的問題，請點擊下方按鈕聯繫人工客服。"
-            elif user_language and user_language.startswith("en"):
-                return answer + "\n\nIf the above information cannot solve your problem, please click the button below to contact customer service."
-            else:
-                return answer + "\n\n如果以上信息无法解决您的问题，请点击下方按钮联系人工客服。"
+            return answer + self._escalation_message(user_language)
         
         return answer
     
+    async def stream_response(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        user_language: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate AI response as a stream of text chunks.
+        
+        Providers are hedged on their first chunk like in
+        ``generate_response``: a provider that fails before producing any
+        text, or has produced none within ``hedge_delay`` seconds, gets the
+        next provider started in parallel, and the first one to produce
+        text wins. Once text has been yielded the answer is committed to
+        that provider. If its stream breaks off, the error message follows
+        the partial answer, which is neither cached nor checked for
+        escalation. Providers without a streaming implementation yield
+        their full answer as one chunk, and cached answers are yielded at
+        once.
+        
+        The provider is read by a background task that holds the
+        concurrency slot only while it talks to the provider; chunks are
+        buffered for the caller, so a slow consumer (Telegram edits and
+        their flood-control waits) never keeps a slot busy.
+        
+        Args:
+            user_message: User's message
+            conversation_history: List of previous messages [{"role": "user|assistant", "content": "..."}]
+            user_language: User's language code (e.g., 'zh', 'zh-CN', 'zh-TW', 'en'). Default: 'zh-CN' (简体中文)
+            
+        Yields:
+            Answer text chunks; concatenated they form the full response
+        """
+        if not self.is_available():
+            yield self._unavailable_message(user_language)
+            return
+        
+        user_language = self._normalize_language(user_language)
+        
+        use_cache = self.response_cache is not None and not conversation_history
+        cached = self.response_cache.get(user_message, user_language) if use_cache else None
+        if cached:
+            logger.info("AI response served from cache")
+            yield cached
+            if self._should_escalate_to_human(cached):
+                yield self._escalation_message(user_language)
+            return
+        
+        # Unbounded, but an answer is capped at the providers' max_tokens
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        producer = asyncio.create_task(
+            self._produce_stream(queue, user_message, conversation_history, user_language)
+        )
+        parts: List[str] = []
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                parts.append(chunk)
+                yield chunk
+            complete = await producer
+        finally:
+            # The caller stopped reading: stop the provider too
+            producer.cancel()
+        
+        answer = "".join(parts).strip()
+        if not answer:
+            logger.error("All AI providers failed to generate response")
+            yield self._error_message(user_language)
+            return
+        
+        if not complete:
+            # The user already saw the beginning; say it was cut off, and
+            # never cache or judge a truncated answer
+            logger.warning(f"AI provider {self.current_provider} stream was interrupted "
+                           f"after {len(answer)} characters")
+            yield "\n\n" + self._error_message(user_language)
+            return
+        
+        if use_cache:
+            self.response_cache.put(user_message, user_language, answer)
+        if self._should_escalate_to_human(answer):
+            yield self._escalation_message(user_language)
+    
+    async def _produce_stream(
+        self,
+        queue: "asyncio.Queue[Optional[str]]",
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> bool:
+        """
+        Put the winning provider's chunks into ``queue``, then None.
+        
+        Returns:
+            True if the provider finished its answer normally
+        """
+        try:
+            async with self._semaphore:
+                stream, first = await self._open_hedged_stream(
+                    user_message, conversation_history, user_language
+                )
+                if stream is None:
+                    return False
+                self.current_provider = stream.name
+                try:
+                    queue.put_nowait(first)
+                    async for chunk in stream:
+                        queue.put_nowait(chunk)
+                finally:
+                    await stream.aclose()
+                return stream.complete
+        finally:
+            queue.put_nowait(None)
+    
+    async def _open_hedged_stream(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> Tuple[Optional["ProviderStream"], Optional[str]]:
+        """
+        Open provider streams in priority order, hedging to the next one on
+        failure or when the first chunk exceeds the latency budget.
+        
+        Returns:
+            (stream, its first chunk) or (None, None) if every provider failed
+        """
+        pending: Dict[asyncio.Task, ProviderStream] = {}
+        next_index = 0
+        
+        async def first_chunk(stream: ProviderStream) -> Optional[str]:
+            try:
+                return await stream.__anext__()
+            except StopAsyncIteration:
+                return None
+        
+        def launch_next():
+            nonlocal next_index
+            name, provider = self._providers[next_index]
+            next_index += 1
+            stream = self._stream_provider(
+                name, provider, user_message, conversation_history, user_language
+            )
+            pending[asyncio.create_task(first_chunk(stream))] = stream
+        
+        launch_next()
+        try:
+            while pending:
+                can_hedge = next_index < len(self._providers)
+                timeout = self.hedge_delay if can_hedge and self.hedge_delay > 0 else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if not done:
+                    logger.info(f"AI providers {[s.name for s in pending.values()]} produced no text "
+                                f"within {self.hedge_delay}s, hedging to {self._providers[next_index][0]}")
+                    launch_next()
+                    continue
+                
+                for task in done:
+                    stream = pending.pop(task)
+                    chunk = task.result()
+                    if chunk:
+                        return stream, chunk
+                    await stream.aclose()
+                    logger.info(f"AI provider {stream.name} returned no answer")
+                
+                if next_index < len(self._providers):
+                    launch_next()
+            
+            return None, None
+        finally:
+            # Cancel slower providers (and everything if we were cancelled)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for stream in pending.values():
+                await stream.aclose()
+    
+    def _stream_provider(
+        self,
+        name: str,
+        provider: ProviderFn,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        user_language: Optional[str]
+    ) -> "ProviderStream":
+        """
+        Open one provider's answer stream.
+        
+        Providers without a streaming implementation produce their full
+        answer as one chunk.
+        """
+        stream_provider = self._stream_providers.get(name)
+        if stream_provider is None:
+            async def single_chunk(*args) -> AsyncIterator[str]:
+                answer = await self._call_provider(name, provider, *args)
+                if answer:
+                    yield answer
+            stream_provider = single_chunk
+        return ProviderStream(
+            name, stream_provider(user_message, conversation_history, user_language),
+            self.request_timeout
+        )
+    
+    @staticmethod
+    def _normalize_language(user_language: Optional[str]) -> str:
+        """Normalize user language (default to zh-CN for Simplified Chinese)"""
+        if not user_language:
+            return "zh-CN"
+        if user_language.startswith("zh"):
+            # zh, zh-CN -> zh-CN (简体中文)
+            # zh-TW, zh-HK -> zh-TW (繁体中文)
+            if user_language in ["zh-TW", "zh-HK", "zh-Hant"]:
+                return "zh-TW"
+            return "zh-CN"
+        return user_language
+    
+    @staticmethod
+    def _unavailable_message(user_language: Optional[str]) -> str:
+        """Service unavailable message in user's language"""
+        if user_language == "zh-TW":
+            return "抱歉，AI 服務暫時不可用，請聯繫人工客服 @wushizhifu_jianglai"
+        elif user_language and user_language.startswith("en"):
+            return "Sorry, AI service is temporarily unavailable. Please contact customer service @wushizhifu_jianglai"
+        else:
+            return "抱歉，AI 服务暂时不可用，请联系人工客服 @wushizhifu_jianglai"
+    
+    @staticmethod
+    def _error_message(user_language: Optional[str]) -> str:
+        """Provider failure message in user's language"""
+        if user_language == "zh-TW":
+            return "抱歉，處理您的問題時遇到錯誤，請聯繫人工客服 @wushizhifu_jianglai"
+        elif user_language and user_language.startswith("en"):
+            return "Sorry, an error occurred while processing your request. Please contact customer service @wushizhifu_jianglai"
+        else:
+            return "抱歉，处理您的问题时遇到错误，请联系人工客服 @wushizhifu_jianglai"
+    
+    @staticmethod
+    def _escalation_message(user_language: Optional[str]) -> str:
+        """Human support hint appended to uncertain answers"""
+        if user_language == "zh-TW":
+            return "\n\n如果以上信息無法解決您的問題，請點擊下方按鈕聯繫人工客服。"
+        elif user_language and user_language.startswith("en"):
+            return "\n\nIf the above information cannot solve your problem, please click the button below to contact customer service."
+        else:
+            return "\n\n如果以上信息无法解决您的问题，请点击下方按钮联系人工客服。"
+    
+    def _get_language_instruction(self, user_language: Optional[str]) -> str:
+        """
+        Get reply-language instruction for the prompt.
+        
+        Args:
+            user_language: Normalized language code (zh-CN, zh-TW, en, ...)
+            
+        Returns:
+            Instruction appended to the system prompt
+        """
+        if not user_language or user_language == "zh-CN":
+            return "请使用简体中文回复。"
+        if user_language == "zh-TW":
+            return "請使用繁體中文回覆。"
+        if user_language.startswith("en"):
+            return "Please reply in English."
+        return f"Please reply in the user's language (language code: {user_language})."
+    
     def _should_escalate_to_human(self, response: str) -> bool:
         """
         Check if response indicates need for human support.
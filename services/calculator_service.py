@@ -1,8 +1,10 @@
 """
 Calculator service for fee and exchange rate calculations
 """
+from decimal import Decimal
 from typing import Tuple
 from database.rate_repository import RateRepository
+from utils.money import convert_minor, from_minor, to_minor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,21 +24,25 @@ class CalculatorService:
             vip_level: VIP level (0-3)
             
         Returns:
-            Dictionary with fee calculation results
+            Dictionary with fee calculation results (fee and actual_amount as
+            exact Decimals, plus the minor-unit values)
         """
         try:
-            fee, actual_amount = RateRepository.calculate_fee(amount, channel, vip_level)
-            
-            rate_config = RateRepository.get_rate(channel, vip_level)
-            rate_percentage = float(rate_config['rate_percentage']) * 100 if rate_config else 0.6
+            # Both lookups are served from the in-memory rate table
+            amount_minor = to_minor(amount)
+            fee_minor, actual_minor = RateRepository.calculate_fee(amount_minor, channel, vip_level)
+            rate_percentage = RateRepository.get_rate_ppm(channel, vip_level) / 10_000
             
             return {
                 "amount": amount,
                 "channel": channel,
                 "vip_level": vip_level,
                 "rate_percentage": rate_percentage,
-                "fee": fee,
-                "actual_amount": actual_amount
+                "fee": from_minor(fee_minor),
+                "actual_amount": from_minor(actual_minor),
+                "amount_minor": amount_minor,
+                "fee_minor": fee_minor,
+                "actual_amount_minor": actual_minor
             }
         except Exception as e:
             logger.error(f"Error calculating fee: {e}")
@@ -52,13 +58,19 @@ class CalculatorService:
             amount: Amount to convert
             from_currency: Source currency
             to_currency: Target currency
-            exchange_rate: Exchange rate
+            exchange_rate: CNY per USDT
             
         Returns:
-            Dictionary with conversion results
+            Dictionary with conversion results (converted_amount as an exact
+            Decimal rounded to the target currency's minor unit)
         """
         try:
-            converted_amount = round(amount * exchange_rate, 2)
+            rate = Decimal(str(exchange_rate))
+            if from_currency == "CNY":
+                rate = 1 / rate
+            converted_minor = convert_minor(to_minor(amount, from_currency),
+                                            from_currency, to_currency, rate)
+            converted_amount = from_minor(converted_minor, to_currency)
             
             return {
                 "original_amount": amount,
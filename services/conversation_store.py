@@ -0,0 +1,345 @@
+"""
+Bounded store of AI chat conversations.
+
+Sessions live in an in-memory LRU capped by user count and total bytes and
+expire after ``idle_ttl`` seconds without activity. With ``persistent=True``
+every session is also written through to the ``ai_conversations`` table (one
+compact JSON row per user), so history survives restarts; memory is then a
+cache in front of it, which is only right while this process is the only one
+serving the user. When several processes serve the same users (webhook
+workers sharing a port), ``shared=True`` makes the table authoritative: every
+read goes to it and every append is one read-modify-write transaction.
+
+History is trimmed by an estimated token budget rather than a fixed number of
+messages; trimmed turns are folded into a rolling summary that is returned as
+the first history entry (role ``summary``).
+"""
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from database.db import db
+from services.prompt_builder import SUMMARY_ROLE, summarize_turns
+from utils.token_utils import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-message memory overhead (list slot, tuple, str headers)
+_MESSAGE_OVERHEAD_BYTES = 120
+# Compact role codes used in persisted rows
+_ROLE_CODES = {"user": "u", "assistant": "a", SUMMARY_ROLE: "s"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+
+class _Session:
+    """Messages of one user with cached size accounting"""
+
+    __slots__ = ("messages", "summary", "tokens", "bytes", "last_active")
+
+    def __init__(self, messages: List[Tuple[str, str]], last_active: float, summary: str = ""):
+        self.messages = messages
+        self.summary = summary
+        self.tokens = sum(estimate_message_tokens(content) for _, content in messages)
+        self.bytes = sum(_message_bytes(content) for _, content in messages) + len(summary.encode("utf-8"))
+        self.last_active = last_active
+
+
+def _message_bytes(content: str) -> int:
+    """Approximate memory held by one message"""
+    return len(content.encode("utf-8")) + _MESSAGE_OVERHEAD_BYTES
+
+
+class ConversationStore:
+    """LRU + idle-expiry conversation history with optional SQLite tier"""
+
+    def __init__(self, max_users: int = 10000, max_bytes: int = 16 * 1024 * 1024,
+                 idle_ttl: float = 3600.0, token_budget: int = 1500,
+                 summary_tokens: int = 200, persistent: bool = False, shared: bool = False):
+        """
+        Initialize store.
+
+        Args:
+            max_users: Maximum number of sessions kept in memory
+            max_bytes: Maximum approximate memory of all sessions in memory
+            idle_ttl: Seconds of inactivity after which a session is dropped
+            token_budget: Maximum estimated tokens of history kept per user
+            summary_tokens: Maximum estimated tokens of the rolling summary
+            persistent: Also keep sessions in the ``ai_conversations`` table
+            shared: Other processes serve the same users; read and write
+                the table directly instead of caching (needs ``persistent``)
+        """
+        if shared and not persistent:
+            raise ValueError("A shared conversation store must be persistent")
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.persistent = persistent
+        self.shared = shared
+
+        # user_id -> session, least recently used first
+        self._sessions: "OrderedDict[int, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._last_db_sweep = time.monotonic()
+
+        self.stats = {"evicted": 0, "expired": 0, "loaded": 0}
+
+    def __len__(self) -> int:
+        """Number of sessions in memory"""
+        return len(self._sessions)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate memory held by sessions"""
+        return self._bytes
+
+    # ------------------------------------------------------------------
+    # In-memory tier
+    # ------------------------------------------------------------------
+
+    def _drop(self, user_id: int) -> Optional[_Session]:
+        """Remove a session from memory"""
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            self._bytes -= session.bytes
+        return session
+
+    def _put(self, user_id: int, session: _Session):
+        """Insert or refresh a session and enforce memory limits"""
+        self._drop(user_id)
+        self._sessions[user_id] = session
+        self._bytes += session.bytes
+        self._enforce_limits(keep=user_id)
+
+    def _enforce_limits(self, keep: Optional[int] = None):
+        """Evict expired, then least recently used sessions"""
+        self.purge_expired()
+        while self._sessions and (len(self._sessions) > self.max_users or self._bytes > self.max_bytes):
+            user_id = next(iter(self._sessions))
+            if user_id == keep:
+                break
+            self._drop(user_id)
+            self.stats["evicted"] += 1
+
+    def purge_expired(self) -> int:
+        """
+        Drop sessions idle for longer than ``idle_ttl``.
+
+        Sessions are ordered by last activity, so only the expired head of
+        the LRU is visited.
+
+        Returns:
+            Number of sessions dropped
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        dropped = 0
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            self._drop(user_id)
+            dropped += 1
+        self.stats["expired"] += dropped
+        return dropped
+
+    def _trim(self, session: _Session):
+        """Fold oldest messages into the summary until the session fits the token budget"""
+        messages = session.messages
+        drop = 0
+        # Always keep the latest message, even if it alone exceeds the budget
+        while session.tokens > self.token_budget and len(messages) - drop > 1:
+            _, content = messages[drop]
+            session.tokens -= estimate_message_tokens(content)
+            session.bytes -= _message_bytes(content)
+            drop += 1
+        if drop:
+            session.bytes -= len(session.summary.encode("utf-8"))
+            session.summary = summarize_turns(
+                [{"role": role, "content": content} for role, content in messages[:drop]],
+                session.summary, self.summary_tokens
+            )
+            session.bytes += len(session.summary.encode("utf-8"))
+            del messages[:drop]
+
+    # ------------------------------------------------------------------
+    # SQLite tier
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _encode(session: _Session) -> str:
+        """Compact JSON row payload: [["s", "..."], ["u", "..."], ["a", "..."]]"""
+        entries = [["s", session.summary]] if session.summary else []
+        entries.extend([_ROLE_CODES.get(role, "a"), content] for role, content in session.messages)
+        return json.dumps(entries, ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def _decode(payload: str) -> Tuple[List[Tuple[str, str]], str]:
+        """Decode a persisted row payload into (messages, summary)"""
+        messages, summary = [], ""
+        for code, content in json.loads(payload):
+            role = _ROLE_NAMES.get(code, "assistant")
+            if role == SUMMARY_ROLE:
+                summary = content
+            else:
+                messages.append((role, content))
+        return messages, summary
+
+    def _cutoff_timestamp(self) -> str:
+        """Oldest ``updated_at`` of a session that is still active"""
+        return (datetime.utcnow() - timedelta(seconds=self.idle_ttl)).strftime("%Y-%m-%d %H:%M:%S")
+
+    _SELECT = "SELECT messages FROM ai_conversations WHERE user_id = ? AND updated_at >= ?"
+    _UPSERT = """
+        INSERT INTO ai_conversations (user_id, messages, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            messages = excluded.messages,
+            updated_at = excluded.updated_at
+    """
+
+    def _session_from_row(self, user_id: int, row) -> Optional[_Session]:
+        """Decode a selected row (None if missing or unreadable)"""
+        if row is None:
+            return None
+        try:
+            messages, summary = self._decode(row["messages"])
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable conversation of user {user_id}: {e}")
+            return None
+        self.stats["loaded"] += 1
+        return _Session(messages, time.monotonic(), summary)
+
+    async def _load(self, user_id: int) -> Optional[_Session]:
+        """Load a session from the database"""
+        row = await db.fetch_one(self._SELECT, (user_id, self._cutoff_timestamp()))
+        return self._session_from_row(user_id, row)
+
+    async def _save(self, user_id: int, session: _Session):
+        """Write a session through to the database"""
+        now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        await db.execute_async(self._UPSERT, (user_id, self._encode(session), now_str))
+        await self._sweep()
+
+    def _append_row(self, conn: sqlite3.Connection, user_id: int, role: str, content: str):
+        """Append a message to the persisted session in one write transaction"""
+        # Take the write lock before reading, so appends from other processes wait
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(self._SELECT, (user_id, self._cutoff_timestamp())).fetchone()
+        session = self._session_from_row(user_id, row) or _Session([], time.monotonic())
+        self._add_message(session, role, content)
+        now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute(self._UPSERT, (user_id, self._encode(session), now_str))
+
+    async def _sweep(self):
+        """Delete expired rows, at most once per idle_ttl"""
+        if time.monotonic() - self._last_db_sweep >= self.idle_ttl:
+            self._last_db_sweep = time.monotonic()
+            cursor = await db.execute_async(
+                "DELETE FROM ai_conversations WHERE updated_at < ?",
+                (self._cutoff_timestamp(),)
+            )
+            if cursor.rowcount:
+                logger.info(f"Deleted {cursor.rowcount} expired AI conversations")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def _session(self, user_id: int) -> Optional[_Session]:
+        """Get a live session from memory or the database"""
+        if self.shared:
+            return await self._load(user_id)
+        session = self._sessions.get(user_id)
+        if session is not None and session.last_active < time.monotonic() - self.idle_ttl:
+            self._drop(user_id)
+            self.stats["expired"] += 1
+            session = None
+        if session is None and self.persistent:
+            session = await self._load(user_id)
+            if session is not None:
+                self._put(user_id, session)
+        return session
+
+    async def get_history(self, user_id: int) -> List[Dict[str, str]]:
+        """
+        Get conversation history for user.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            Copy of the messages [{"role": "user|assistant", "content": "..."}], oldest first,
+            led by a {"role": "summary"} entry when older turns were summarized
+        """
+        session = await self._session(user_id)
+        if session is None:
+            return []
+        session.last_active = time.monotonic()
+        if user_id in self._sessions:
+            self._sessions.move_to_end(user_id)
+        history = [{"role": SUMMARY_ROLE, "content": session.summary}] if session.summary else []
+        history.extend({"role": role, "content": content} for role, content in session.messages)
+        return history
+
+    async def append(self, user_id: int, role: str, content: str):
+        """
+        Add message to conversation history.
+
+        Args:
+            user_id: Telegram user ID
+            role: "user" or "assistant"
+            content: Message text
+        """
+        if self.shared:
+            await db.transaction(lambda conn: self._append_row(conn, user_id, role, content))
+            await self._sweep()
+            return
+
+        session = await self._session(user_id)
+        if session is None:
+            session = _Session([], time.monotonic())
+        # Take it out of the accounting while it changes size
+        self._drop(user_id)
+
+        self._add_message(session, role, content)
+        self._put(user_id, session)
+
+        if self.persistent:
+            await self._save(user_id, session)
+
+    def _add_message(self, session: _Session, role: str, content: str):
+        """Add a message to a session and trim it to the token budget"""
+        session.messages.append((role, content))
+        session.tokens += estimate_message_tokens(content)
+        session.bytes += _message_bytes(content)
+        session.last_active = time.monotonic()
+        self._trim(session)
+
+    async def clear(self, user_id: int):
+        """
+        Forget conversation history of a user.
+
+        Args:
+            user_id: Telegram user ID
+        """
+        self._drop(user_id)
+        if self.persistent:
+            await db.execute_async("DELETE FROM ai_conversations WHERE user_id = ?", (user_id,))
+
+
+# Global conversation store instance
+conversation_store = ConversationStore(
+    max_users=Config.AI_HISTORY_MAX_USERS,
+    max_bytes=Config.AI_HISTORY_MAX_BYTES,
+    idle_ttl=Config.AI_HISTORY_IDLE_TTL,
+    token_budget=Config.AI_HISTORY_TOKEN_BUDGET,
+    summary_tokens=Config.AI_SUMMARY_TOKENS,
+    persistent=Config.AI_HISTORY_PERSISTENT,
+    # Webhook workers sharing a port get a user's messages in turn
+    shared=Config.AI_HISTORY_PERSISTENT and Config.WEBHOOK_WORKERS > 1
+)
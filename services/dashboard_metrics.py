@@ -0,0 +1,191 @@
+"""
+Declarative metrics for the admin dashboards.
+
+Each screen asks for the metrics it shows by name; the planner groups them by
+table and computes each group in one conditional-aggregate pass
+(``SUM(CASE WHEN ... THEN ... END)``), all on one read connection. Date
+conditions are half-open ranges on the bare column (``stat_date >= :week_start
+AND stat_date < :tomorrow``) so they can use the primary key, and when every
+metric of a table has a lower bound the pass is narrowed with a WHERE on it.
+
+Results are cached for a short TTL and concurrent requests for the same
+metric set share one computation, so several admins refreshing at once cost
+one query.
+"""
+import asyncio
+import sqlite3
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import Config
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+
+class Metric:
+    """A scalar dashboard metric computed by conditional aggregation"""
+
+    __slots__ = ("table", "value", "condition", "distinct", "since")
+
+    def __init__(self, table: str, value: str = "1", condition: str = "1 = 1",
+                 distinct: Optional[str] = None, since: Optional[Tuple[str, str]] = None):
+        """
+        Args:
+            table: Table scanned for this metric
+            value: Expression summed over matching rows
+            condition: SQL condition, may use the range parameters (``:today``, ...)
+            distinct: Count distinct values of this expression instead of summing
+            since: (column, range parameter) lower bound implied by ``condition``,
+                used to narrow the pass when every metric of the table has one
+        """
+        self.table = table
+        self.value = value
+        self.condition = condition
+        self.distinct = distinct
+        self.since = since
+
+    def aggregate(self) -> str:
+        """SQL aggregate expression of this metric"""
+        if self.distinct:
+            return f"COUNT(DISTINCT CASE WHEN {self.condition} THEN {self.distinct} END)"
+        return f"COALESCE(SUM(CASE WHEN {self.condition} THEN {self.value} ELSE 0 END), 0)"
+
+
+def _date_range(column: str, start: str, end: str = "tomorrow") -> str:
+    """Half-open range condition on a bare date column"""
+    return f"{column} >= :{start} AND {column} < :{end}"
+
+
+# Metrics read from the statistics rollups (see database/stats_repository.py)
+METRICS: Dict[str, Metric] = {
+    "users.total": Metric("stats_user_segments", value="user_count"),
+    "users.active": Metric("stats_user_segments", value="user_count",
+                           condition="status = 'active'"),
+    "users.vip": Metric("stats_user_segments", value="user_count", condition="vip_level > 0"),
+    "users.new_today": Metric("stats_users_daily", value="new_users",
+                              condition=_date_range("stat_date", "today"),
+                              since=("stat_date", "today")),
+    "users.new_7d": Metric("stats_users_daily", value="new_users",
+                           condition=_date_range("stat_date", "week_start"),
+                           since=("stat_date", "week_start")),
+    "users.new_30d": Metric("stats_users_daily", value="new_users",
+                            condition=_date_range("stat_date", "month_start"),
+                            since=("stat_date", "month_start")),
+    "users.active_7d": Metric("stats_active_users_daily", distinct="user_id",
+                              condition=f"{_date_range('stat_date', 'week_start')} AND tx_count > 0",
+                              since=("stat_date", "week_start")),
+}
+
+
+def range_params(now: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    Range boundaries (UTC dates, like the rollup buckets).
+
+    ``week_start`` and ``month_start`` match the original
+    ``DATE('now', '-7 days')`` and ``DATE('now', '-30 days')`` filters.
+    """
+    today = (now or datetime.utcnow()).date()
+    return {
+        'today': today.isoformat(),
+        'tomorrow': (today + timedelta(days=1)).isoformat(),
+        'week_start': (today - timedelta(days=7)).isoformat(),
+        'month_start': (today - timedelta(days=30)).isoformat(),
+    }
+
+
+def plan(names: Iterable[str]) -> List[Tuple[str, List[str]]]:
+    """
+    Build one aggregate query per table.
+
+    Args:
+        names: Metric names (keys of ``METRICS``)
+
+    Returns:
+        List of (SQL, metric names in column order)
+    """
+    by_table: Dict[str, List[str]] = {}
+    for name in names:
+        if name not in METRICS:
+            raise KeyError(f"Unknown dashboard metric: {name}")
+        by_table.setdefault(METRICS[name].table, []).append(name)
+
+    queries = []
+    for table, table_names in by_table.items():
+        metrics = [METRICS[name] for name in table_names]
+        columns = ",\n       ".join(metric.aggregate() for metric in metrics)
+        sql = f"SELECT {columns}\nFROM {table}"
+
+        bounds = {metric.since for metric in metrics}
+        if None not in bounds and len({column for column, _ in bounds}) == 1:
+            column = next(iter(bounds))[0]
+            # Every metric needs rows on or after its own bound, so the
+            # earliest bound covers them all
+            params = sorted(f":{param}" for _, param in bounds)
+            lower = params[0] if len(params) == 1 else f"MIN({', '.join(params)})"
+            sql += f"\nWHERE {column} >= {lower}"
+        queries.append((sql, table_names))
+    return queries
+
+
+class DashboardMetrics:
+    """Computes and briefly caches dashboard metric sets"""
+
+    def __init__(self, ttl: float = 10.0):
+        """
+        Initialize metrics service.
+
+        Args:
+            ttl: Seconds a computed metric set is reused (0 disables caching)
+        """
+        self.ttl = ttl
+        self._cache: Dict[Tuple[str, ...], Tuple[float, Dict[str, int]]] = {}
+        self._inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+
+    async def get(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Get metric values.
+
+        Args:
+            names: Metric names (keys of ``METRICS``)
+
+        Returns:
+            Dictionary of metric name -> value
+        """
+        key = tuple(sorted(set(names)))
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._compute(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return dict(await asyncio.shield(future))
+
+    async def _compute(self, key: Tuple[str, ...]) -> Dict[str, int]:
+        """Run the planned queries on one read connection"""
+        queries = plan(key)
+        params = range_params()
+
+        def _fetch(conn: sqlite3.Connection) -> Dict[str, int]:
+            values = {}
+            for sql, names in queries:
+                row = conn.execute(sql, params).fetchone()
+                values.update(zip(names, row))
+            return values
+
+        values = await db.read(_fetch)
+        if self.ttl > 0:
+            self._cache[key] = (time.monotonic() + self.ttl, values)
+        return values
+
+    def invalidate(self):
+        """Drop cached metric sets"""
+        self._cache.clear()
+
+
+# Global dashboard metrics instance
+dashboard_metrics = DashboardMetrics(ttl=Config.DASHBOARD_CACHE_TTL)
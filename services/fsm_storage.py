@@ -0,0 +1,288 @@
+"""
+FSM storages for the bot's multi-step flows (payment, calculator).
+
+Both storages expire a key ``ttl`` seconds after its last write, so a flow
+the user abandons is reclaimed instead of staying in memory for the life of
+the process, and neither creates a record when a key is only read (every
+update reads its key's state).
+
+- ``TTLMemoryStorage`` keeps everything in process memory, bounded by
+  ``capacity`` keys (the least recently written are dropped first).
+- ``SQLiteStorage`` keeps the states in the ``fsm_states`` table, so flows
+  survive restarts and are shared by processes. Writes are buffered and
+  flushed in one transaction every ``flush_interval`` seconds (0 writes
+  through before the setter returns); expired rows are purged with a flush
+  at most every ``PURGE_INTERVAL`` seconds.
+"""
+import asyncio
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from config import Config
+from database.fsm_repository import FSMRepository
+
+logger = logging.getLogger(__name__)
+
+# Seconds between purges of expired rows
+PURGE_INTERVAL = 60.0
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+def storage_key_name(key: StorageKey) -> str:
+    """Flatten an aiogram storage key into the fsm_states primary key"""
+    return (f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:"
+            f"{key.business_connection_id or ''}:{key.destiny}")
+
+
+class _Record:
+    """State and data of one key"""
+
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self, state: Optional[str], data: Any, expires_at: float):
+        self.state = state
+        self.data = data
+        self.expires_at = expires_at
+
+
+class TTLMemoryStorage(BaseStorage):
+    """In-memory FSM storage with per-key expiry and a capacity bound"""
+
+    def __init__(self, ttl: float = 1800, capacity: int = 100_000):
+        """
+        Initialize storage.
+
+        Args:
+            ttl: Seconds a key is kept after its last write
+            capacity: Maximum keys kept; the least recently written go first
+        """
+        self.ttl = ttl
+        self.capacity = capacity
+        # Ordered by last write; with one TTL for all keys that is also expiry order
+        self._records: "OrderedDict[StorageKey, _Record]" = OrderedDict()
+        self.stats = {"expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _get(self, key: StorageKey) -> Optional[_Record]:
+        record = self._records.get(key)
+        if record is not None and record.expires_at <= time.monotonic():
+            del self._records[key]
+            self.stats["expired"] += 1
+            return None
+        return record
+
+    def _put(self, key: StorageKey, state: Optional[str], data: Dict[str, Any]):
+        if state is None and not data:
+            # Flow finished: nothing left to keep
+            self._records.pop(key, None)
+            return
+        now = time.monotonic()
+        self._records[key] = _Record(state, data, now + self.ttl)
+        self._records.move_to_end(key)
+        self._purge(now)
+
+    def _purge(self, now: float):
+        """Drop expired keys from the front, then keys over capacity"""
+        records = self._records
+        while records:
+            oldest = next(iter(records.values()))
+            if oldest.expires_at > now:
+                break
+            records.popitem(last=False)
+            self.stats["expired"] += 1
+        while len(records) > self.capacity:
+            records.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._get(key)
+        self._put(key, _state_name(state), record.data if record else {})
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise TypeError(f"FSM data must be a dict, not {type(data).__name__}")
+        record = self._get(key)
+        self._put(key, record.state if record else None, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record else {}
+
+    async def close(self) -> None:
+        self._records.clear()
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage in the ``fsm_states`` table with batched writes.
+
+    Data is stored as JSON, so flows must only keep JSON values in it.
+    Written records stay readable from the write buffer until flushed. With
+    ``cache_size`` above 0, records read or written are also kept in a
+    process-local cache; use it only when all updates of a chat are handled
+    by this process (a single process, or chat-partitioned dispatch workers).
+    Processes that share chats also need ``flush_interval=0``, so a write is
+    stored before the handler that made it returns.
+    """
+
+    def __init__(self, ttl: float = 1800, flush_interval: float = 0.05, cache_size: int = 10000):
+        """
+        Initialize storage.
+
+        Args:
+            ttl: Seconds a key is kept after its last write
+            flush_interval: Seconds writes are buffered before one transaction stores them
+                (0 stores each write before ``set_state``/``set_data`` return)
+            cache_size: Records kept in the process-local cache (0 disables it)
+        """
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        # Key name -> record, None meaning "no record"
+        self._dirty: Dict[str, Optional[_Record]] = {}
+        self._flushing: Dict[str, Optional[_Record]] = {}
+        self._cache: "OrderedDict[str, Optional[_Record]]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+        # One flush at a time, so a batch being stored is always in _flushing
+        self._flush_lock = asyncio.Lock()
+        self._purged_at = time.time()
+        self.stats = {"reads": 0, "cache_hits": 0, "flushes": 0, "rows_written": 0, "purged": 0}
+
+    def _remember(self, name: str, record: Optional[_Record]):
+        if self.cache_size <= 0:
+            return
+        self._cache[name] = record
+        self._cache.move_to_end(name)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _get(self, key: StorageKey) -> Optional[_Record]:
+        name = storage_key_name(key)
+        if name in self._dirty:
+            record = self._dirty[name]
+        elif name in self._flushing:
+            record = self._flushing[name]
+        elif name in self._cache:
+            record = self._cache[name]
+            self._cache.move_to_end(name)
+            self.stats["cache_hits"] += 1
+        else:
+            row = await FSMRepository.load(name)
+            self.stats["reads"] += 1
+            record = _Record(row['state'], row['data'], row['expires_at']) if row else None
+            # A write made while the row was loading is newer than the row
+            newer = self._dirty.get(name, self._flushing.get(name, self._cache.get(name, record)))
+            if newer is record:
+                self._remember(name, record)
+            record = newer
+        if record is not None and record.expires_at <= time.time():
+            return None
+        return record
+
+    def _put(self, key: StorageKey, state: Optional[str], data_json: str):
+        name = storage_key_name(key)
+        if state is None and data_json == "{}":
+            record = None
+        else:
+            record = _Record(state, data_json, time.time() + self.ttl)
+        self._dirty[name] = record
+        self._remember(name, record)
+        if self.flush_interval <= 0:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing FSM states: {e}", exc_info=True)
+            if self._dirty:
+                self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Store the buffered writes now (and purge expired rows when due)"""
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._dirty:
+            return
+        batch, self._dirty = self._dirty, {}
+        self._flushing = batch
+        upserts = [(name, record.state, record.data, record.expires_at)
+                   for name, record in batch.items() if record is not None]
+        deletes = [name for name, record in batch.items() if record is None]
+
+        now = time.time()
+        purge_before = now if now - self._purged_at >= PURGE_INTERVAL else None
+        try:
+            purged = await FSMRepository.save(upserts, deletes, purge_before)
+        except Exception:
+            # Keep the writes for the next flush unless newer ones replaced them
+            for name, record in batch.items():
+                self._dirty.setdefault(name, record)
+            raise
+        finally:
+            self._flushing = {}
+        if purge_before is not None:
+            self._purged_at = now
+            self.stats["purged"] += purged
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(batch)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(key)
+        self._put(key, _state_name(state), record.data if record else "{}")
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise TypeError(f"FSM data must be a dict, not {type(data).__name__}")
+        # Serialized here so that non-JSON data fails in the handler, not in the flush
+        data_json = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        record = await self._get(key)
+        self._put(key, record.state if record else None, data_json)
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get(key)
+        return json.loads(record.data) if record else {}
+
+    async def close(self) -> None:
+        """Store the buffered writes"""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Create the FSM storage configured by ``Config.FSM_STORAGE``"""
+    if Config.FSM_STORAGE == "memory":
+        return TTLMemoryStorage(ttl=Config.FSM_TTL, capacity=Config.FSM_MEMORY_CAPACITY)
+    # Webhook workers sharing a port see any chat's updates, so they read and
+    # write through: the next update of a chat may reach another worker
+    if Config.WEBHOOK_WORKERS > 1:
+        return SQLiteStorage(ttl=Config.FSM_TTL, flush_interval=0, cache_size=0)
+    return SQLiteStorage(ttl=Config.FSM_TTL, flush_interval=Config.FSM_FLUSH_INTERVAL,
+                         cache_size=Config.FSM_CACHE_SIZE)
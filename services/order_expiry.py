@@ -0,0 +1,147 @@
+"""
+Periodic expiry of pending orders.
+
+Orders are created with ``expired_at = now + 30 min``; every ``interval``
+seconds the sweeper moves due ``pending`` orders to ``expired`` in chunks of
+``batch_size`` (each chunk its own short write transaction, so the writer is
+never held for long) and tells the owners of orders that expired recently.
+Older backlog (first sweep after downtime or an upgrade) is expired silently.
+"""
+import asyncio
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from aiogram import Bot
+from config import Config
+from database.transaction_repository import TransactionRepository
+from utils.text_utils import escape_markdown_v2, format_money_markdown
+
+logger = logging.getLogger(__name__)
+
+# Pause between expiry notices, keeps bursts under Telegram's ~30 messages/s
+NOTIFY_INTERVAL = 0.05
+
+# Orders that expired more than this many sweep intervals ago get no notice
+NOTIFY_WINDOW_SWEEPS = 3
+
+
+class OrderExpirySweeper:
+    """Background task expiring stale pending orders"""
+
+    def __init__(self, interval: float = 60.0, batch_size: int = 500, notify: bool = True):
+        """
+        Initialize sweeper.
+
+        Args:
+            interval: Seconds between sweeps (0 disables the periodic run)
+            batch_size: Orders expired per write transaction
+            notify: Send users a notice for each recently expired order
+        """
+        self.interval = interval
+        # Seconds after expired_at during which a notice is still sent
+        self.notify_window = NOTIFY_WINDOW_SWEEPS * (interval or 60.0)
+        self.batch_size = batch_size
+        self.notify = notify
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"runs": 0, "expired": 0, "chunks": 0, "notified": 0,
+                      "notify_failed": 0, "notify_skipped": 0, "last_expired": 0,
+                      "last_duration_ms": 0.0}
+
+    async def run_once(self) -> int:
+        """
+        Expire all due orders now.
+
+        Returns:
+            Number of orders expired
+        """
+        start = time.perf_counter()
+        utcnow = datetime.utcnow()
+        now = utcnow.strftime("%Y-%m-%d %H:%M:%S")
+        expired: List[dict] = []
+        while True:
+            chunk = await TransactionRepository.expire_pending(now, self.batch_size)
+            if chunk:
+                self.stats["chunks"] += 1
+                expired.extend(chunk)
+            if len(chunk) < self.batch_size:
+                break
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.stats["runs"] += 1
+        self.stats["expired"] += len(expired)
+        self.stats["last_expired"] = len(expired)
+        self.stats["last_duration_ms"] = round(duration_ms, 1)
+        if expired:
+            logger.info(f"Expired {len(expired)} pending orders in {duration_ms:.1f} ms")
+
+        if self.notify and self._bot and expired:
+            # Same string format as expired_at, so plain comparison orders them
+            cutoff = (utcnow - timedelta(seconds=self.notify_window)).strftime("%Y-%m-%d %H:%M:%S")
+            recent = [order for order in expired if order['expired_at'] >= cutoff]
+            self.stats["notify_skipped"] += len(expired) - len(recent)
+            if recent:
+                await self._notify(recent)
+        return len(expired)
+
+    async def _notify(self, orders: List[dict]):
+        """Tell users their orders expired"""
+        for order in orders:
+            type_text = "收款" if order['transaction_type'] == 'receive' else "付款"
+            channel_text = "支付宝" if order['payment_channel'] == 'alipay' else "微信"
+            text = (
+                f"*⌛ 订单已过期*\n\n"
+                f"订单号：`{escape_markdown_v2(order['order_id'])}`\n"
+                f"类型：{type_text}\n"
+                f"通道：{channel_text}\n"
+                f"金额：{format_money_markdown(order['amount_minor'], order['currency'])}\n\n"
+                f"{escape_markdown_v2('订单超过支付时限未完成，已自动关闭。如需继续，请重新下单。')}"
+            )
+            try:
+                await self._bot.send_message(order['user_id'], text, parse_mode="MarkdownV2")
+                self.stats["notified"] += 1
+            except Exception as e:
+                # Blocked the bot, deleted account, ...
+                self.stats["notify_failed"] += 1
+                logger.debug(f"Could not notify user {order['user_id']} of expired order: {e}")
+            await asyncio.sleep(NOTIFY_INTERVAL)
+
+    async def _run(self):
+        """Sweep periodically"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error in order expiry sweep: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self, bot: Optional[Bot] = None):
+        """
+        Start the background task.
+
+        Args:
+            bot: Bot used for expiry notices
+        """
+        self._bot = bot
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Order expiry sweeper started (every {self.interval}s)")
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global sweeper instance
+order_expiry_sweeper = OrderExpirySweeper(
+    interval=Config.ORDER_EXPIRY_INTERVAL,
+    batch_size=Config.ORDER_EXPIRY_BATCH,
+    notify=Config.ORDER_EXPIRY_NOTIFY
+)
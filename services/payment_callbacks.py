@@ -0,0 +1,258 @@
+"""
+Ingestion of payment gateway status callbacks.
+
+The gateway signs every notification with HMAC-SHA256 over
+``"<timestamp>.<raw body>"`` and sends the hex digest and the Unix timestamp
+in headers; stale timestamps are rejected so a captured request cannot be
+replayed later.
+
+Verified callbacks are queued and a single worker applies them in batches,
+one write transaction per batch (group commit). Each request waits until
+its batch has committed, so an acknowledged callback is durable, yet a burst
+of thousands costs a handful of commits. When the queue is full
+``CallbackQueueFull`` is raised and the endpoint answers 503, which makes
+the gateway back off and retry.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+from config import Config
+from database.payment_callback_repository import Callback, PaymentCallbackRepository
+
+logger = logging.getLogger(__name__)
+
+# Statuses a gateway may report
+CALLBACK_STATUSES = frozenset({'paid', 'failed', 'cancelled', 'refunded'})
+
+
+class InvalidCallback(ValueError):
+    """Callback with a bad signature or payload"""
+
+
+class InvalidSignature(InvalidCallback):
+    """Callback that is unsigned, badly signed or stale"""
+
+
+class CallbackQueueFull(Exception):
+    """The apply queue is full; the gateway should retry later"""
+
+
+def sign(body: bytes, timestamp: str, secret: str) -> str:
+    """
+    Compute the signature of a callback.
+
+    Args:
+        body: Raw request body
+        timestamp: Unix timestamp header value
+        secret: Shared secret
+
+    Returns:
+        Hex HMAC-SHA256 digest
+    """
+    message = timestamp.encode() + b"." + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, timestamp: Optional[str], signature: Optional[str],
+                     secret: str, max_skew: int = 300, now: Optional[float] = None) -> bool:
+    """
+    Check a callback's signature and timestamp freshness.
+
+    Args:
+        body: Raw request body
+        timestamp: Unix timestamp header value
+        signature: Hex signature header value
+        secret: Shared secret
+        max_skew: Maximum age (or clock skew) of the timestamp in seconds
+        now: Current Unix time (defaults to the clock)
+
+    Returns:
+        True if the callback is authentic and fresh
+    """
+    if not secret or not timestamp or not signature:
+        return False
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        return False
+    if abs((now if now is not None else time.time()) - sent_at) > max_skew:
+        return False
+    return hmac.compare_digest(sign(body, timestamp, secret), signature.lower())
+
+
+def parse_callback(body: bytes) -> Callback:
+    """
+    Parse a callback body.
+
+    ``{"order_id": "WS...", "status": "paid", "paid_at": "YYYY-MM-DD HH:MM:SS"}``,
+    ``paid_at`` is optional (UTC).
+
+    Returns:
+        (order_id, status, paid_at)
+
+    Raises:
+        InvalidCallback: If the payload is malformed
+    """
+    try:
+        payload = json.loads(body)
+        order_id = payload['order_id']
+        status = payload['status']
+        paid_at = payload.get('paid_at')
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidCallback(f"Malformed callback: {e}") from e
+
+    if not isinstance(order_id, str) or not order_id:
+        raise InvalidCallback("order_id must be a non-empty string")
+    if status not in CALLBACK_STATUSES:
+        raise InvalidCallback(f"Unsupported status: {status!r}")
+    if paid_at is not None:
+        try:
+            datetime.strptime(paid_at, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError) as e:
+            raise InvalidCallback(f"Invalid paid_at: {paid_at!r}") from e
+    return order_id, status, paid_at
+
+
+class PaymentCallbackProcessor:
+    """Applies queued payment callbacks in grouped transactions"""
+
+    def __init__(self, batch_size: int = 200, max_delay: float = 0.005, queue_size: int = 5000):
+        """
+        Initialize processor.
+
+        Args:
+            batch_size: Maximum callbacks per write transaction
+            max_delay: Seconds a lone callback waits for others to share its commit
+            queue_size: Queued callbacks before submit raises CallbackQueueFull
+        """
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"received": 0, "batches": 0, "largest_batch": 0, "queue_full": 0,
+                      "applied": 0, "duplicate": 0, "unchanged": 0, "rejected": 0,
+                      "unknown_order": 0, "error": 0}
+
+    async def submit(self, callback: Callback) -> str:
+        """
+        Queue a callback and wait until its batch is committed.
+
+        Args:
+            callback: (order_id, status, paid_at)
+
+        Returns:
+            Result of ``PaymentCallbackRepository.apply_batch`` for this callback
+
+        Raises:
+            CallbackQueueFull: If the queue is full or the processor is not running
+        """
+        if self._queue is None:
+            raise CallbackQueueFull("Payment callback processor is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((callback, future))
+        except asyncio.QueueFull:
+            self.stats["queue_full"] += 1
+            raise CallbackQueueFull(f"{self.queue_size} callbacks queued") from None
+        self.stats["received"] += 1
+        return await future
+
+    async def ingest(self, body: bytes, timestamp: Optional[str], signature: Optional[str]) -> str:
+        """
+        Verify, parse and apply one callback request.
+
+        Args:
+            body: Raw request body
+            timestamp: Timestamp header value
+            signature: Signature header value
+
+        Returns:
+            Result for the callback
+
+        Raises:
+            InvalidSignature: If the signature is invalid or stale
+            InvalidCallback: If the payload is invalid
+            CallbackQueueFull: If the gateway should retry later
+        """
+        if not verify_signature(body, timestamp, signature, Config.PAYMENT_CALLBACK_SECRET,
+                                Config.PAYMENT_CALLBACK_MAX_SKEW):
+            raise InvalidSignature("Invalid signature")
+        return await self.submit(parse_callback(body))
+
+    def _next_batch(self, first: Tuple[Callback, asyncio.Future]) -> List[Tuple[Callback, asyncio.Future]]:
+        """Take up to batch_size queued callbacks, starting with ``first``"""
+        batch = [first]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        """Apply queued callbacks batch by batch"""
+        while True:
+            first = await self._queue.get()
+            # Under load the queue refills while the previous batch commits;
+            # when idle, give concurrent callbacks a moment to share the commit
+            if self.max_delay > 0 and self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.max_delay)
+            batch = self._next_batch(first)
+
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            try:
+                results = await PaymentCallbackRepository.apply_batch([callback for callback, _ in batch])
+            except asyncio.CancelledError:
+                # Stopped mid-batch: the outcome is unknown, so have the gateway
+                # retry; callbacks are idempotent, a committed one comes back "duplicate"
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(CallbackQueueFull("Shutting down"))
+                raise
+            except Exception as e:
+                logger.error(f"Error applying payment callback batch: {e}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                self.stats[result] += 1
+                if not future.done():
+                    future.set_result(result)
+
+    def start(self):
+        """Start the worker"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Payment callback processor started (batches of {self.batch_size})")
+
+    async def stop(self):
+        """Stop the worker; callbacks still queued are refused so the gateway retries them"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            queue, self._queue = self._queue, None
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                if not future.done():
+                    future.set_exception(CallbackQueueFull("Shutting down"))
+
+
+# Global processor instance
+payment_callbacks = PaymentCallbackProcessor(
+    batch_size=Config.PAYMENT_CALLBACK_BATCH,
+    max_delay=Config.PAYMENT_CALLBACK_MAX_DELAY,
+    queue_size=Config.PAYMENT_CALLBACK_QUEUE
+)
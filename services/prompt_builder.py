@@ -0,0 +1,156 @@
+"""
+Token-budgeted prompt assembly for the AI providers
+"""
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.token_utils import estimate_message_tokens, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Role of the history entry that carries the rolling summary of older turns
+SUMMARY_ROLE = "summary"
+# Characters of each earlier question kept in the summary
+SUMMARY_SNIPPET_CHARS = 60
+
+
+def summarize_turns(messages: List[Dict[str, str]], previous_summary: str = "",
+                    max_tokens: int = 200) -> str:
+    """
+    Fold older turns into a rolling extractive summary.
+
+    Keeps a short snippet of every earlier user question (answers follow
+    from the knowledge base and are dropped). When the summary exceeds
+    ``max_tokens`` the oldest lines go first.
+
+    Args:
+        messages: Turns leaving the recent window, oldest first
+        previous_summary: Summary of even older turns
+        max_tokens: Maximum estimated tokens of the summary
+
+    Returns:
+        Summary text, one earlier question per line
+    """
+    lines = [line for line in previous_summary.splitlines() if line]
+    for msg in messages:
+        if msg.get("role") != "user":
+            continue
+        content = " ".join(msg.get("content", "").split())
+        if not content:
+            continue
+        if len(content) > SUMMARY_SNIPPET_CHARS:
+            content = content[:SUMMARY_SNIPPET_CHARS] + "…"
+        lines.append(f"- {content}")
+
+    total = sum(estimate_tokens(line) + 1 for line in lines)
+    while lines and total > max_tokens:
+        total -= estimate_tokens(lines.pop(0)) + 1
+    return "\n".join(lines)
+
+
+class Prompt:
+    """Prompt parts after budgeting"""
+
+    __slots__ = ("system", "summary", "history", "user_message", "tokens")
+
+    def __init__(self, system: str, summary: str, history: List[Dict[str, str]],
+                 user_message: str, tokens: int):
+        self.system = system
+        self.summary = summary
+        self.history = history
+        self.user_message = user_message
+        self.tokens = tokens
+
+
+class PromptBuilder:
+    """
+    Builds provider prompts within a token budget.
+
+    The system prompt (knowledge base plus language instruction) is built
+    and measured once per language. Recent history is kept verbatim, newest
+    first, as long as it fits; everything older is collapsed into the rolling
+    summary.
+    """
+
+    def __init__(self, knowledge_base: str, language_instruction: Callable[[Optional[str]], str],
+                 token_budget: int = 1200, summary_tokens: int = 200):
+        """
+        Initialize prompt builder.
+
+        Args:
+            knowledge_base: Static system prompt shared by every request
+            language_instruction: Returns the reply-language instruction for a language code
+            token_budget: Maximum estimated tokens of a whole prompt
+            summary_tokens: Maximum estimated tokens of the rolling summary
+        """
+        self.knowledge_base = knowledge_base
+        self.language_instruction = language_instruction
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        # language -> (system prompt, estimated tokens)
+        self._system_prompts: Dict[str, Tuple[str, int]] = {}
+
+    def system_prompt(self, user_language: Optional[str]) -> Tuple[str, int]:
+        """
+        Get the cached system prompt of a language.
+
+        The knowledge base comes first so every language shares the same
+        prompt prefix (providers cache identical prefixes).
+
+        Args:
+            user_language: Normalized language code
+
+        Returns:
+            (system prompt, estimated tokens)
+        """
+        key = user_language or ""
+        cached = self._system_prompts.get(key)
+        if cached is None:
+            text = self.knowledge_base + "\n\n" + self.language_instruction(user_language)
+            cached = (text, estimate_message_tokens(text))
+            self._system_prompts[key] = cached
+        return cached
+
+    def build(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]],
+              user_language: Optional[str]) -> Prompt:
+        """
+        Build a prompt within the token budget.
+
+        Args:
+            user_message: User's message
+            conversation_history: Previous messages, optionally led by a summary entry
+            user_language: Normalized language code
+
+        Returns:
+            Budgeted prompt parts
+        """
+        system, system_tokens = self.system_prompt(user_language)
+        used = system_tokens + estimate_message_tokens(user_message)
+
+        summary = ""
+        turns: List[Dict[str, str]] = []
+        for msg in conversation_history or []:
+            if msg.get("role") == SUMMARY_ROLE:
+                summary = msg.get("content", "")
+            else:
+                turns.append(msg)
+
+        # Keep the newest turns that fit next to a full-size summary,
+        # turns[:split] are summarized
+        history_budget = self.token_budget - used - self.summary_tokens
+        split = len(turns)
+        history_tokens = 0
+        while split > 0:
+            cost = estimate_message_tokens(turns[split - 1].get("content", ""))
+            if history_tokens + cost > history_budget:
+                break
+            history_tokens += cost
+            split -= 1
+
+        if split:
+            summary = summarize_turns(turns[:split], summary, self.summary_tokens)
+        history = turns[split:]
+
+        tokens = used + history_tokens + (estimate_message_tokens(summary) if summary else 0)
+        logger.debug(f"Prompt: {tokens} tokens, {len(history)} recent turns, "
+                     f"{split} turns summarized")
+        return Prompt(system, summary, history, user_message, tokens)
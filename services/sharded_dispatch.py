@@ -0,0 +1,320 @@
+"""
+Chat-partitioned multi-process dispatch.
+
+A supervisor process receives updates (long polling or webhook) and routes
+each raw update to one of N worker processes by chat id. Every worker runs
+the full dispatcher with all routers on its own event loop, so handler CPU
+work (MarkdownV2 rendering, keyboards, SQLite calls) spreads over the cores.
+
+All updates of a chat go to the same worker in arrival order, and a worker
+handles one update per chat at a time while different chats run
+concurrently; per-chat ordering is therefore the same as in a single
+process, and the FSM storage of a worker can cache the flows of its chats
+(``services/fsm_storage``). Caches of shared tables are kept coherent
+through the database (``database/cache_generations``).
+"""
+import asyncio
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for workers to start, and for a stopping worker that
+# makes no progress on its queued updates before it is killed
+WORKER_START_TIMEOUT = 60
+WORKER_STOP_TIMEOUT = 30
+
+
+def chat_key(update: dict) -> int:
+    """
+    Partition key of a raw update: its chat id, else its user id.
+
+    Args:
+        update: Update as received from Telegram
+
+    Returns:
+        Chat (or user) id, 0 for updates without either
+    """
+    for field, payload in update.items():
+        if field == "update_id" or not isinstance(payload, dict):
+            continue
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+class ChatOrderedRunner:
+    """Feeds updates to a dispatcher, one at a time per chat"""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, progress: Optional[Any] = None):
+        """
+        Initialize runner.
+
+        Args:
+            dispatcher: Dispatcher handling the updates
+            bot: Bot the updates belong to
+            progress: Shared array receiving the handled and failed counts
+                after every update (readable even if the process is killed)
+        """
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.progress = progress
+        self._chats: Dict[int, Deque[dict]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"handled": 0, "failed": 0}
+
+    def submit(self, update: dict):
+        """Queue a raw update behind earlier updates of its chat"""
+        key = chat_key(update)
+        pending = self._chats.get(key)
+        if pending is not None:
+            pending.append(update)
+            return
+        self._chats[key] = deque([update])
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: int):
+        """Handle a chat's queued updates in order"""
+        pending = self._chats[key]
+        try:
+            while pending:
+                data = pending.popleft()
+                try:
+                    update = Update.model_validate(data, context={"bot": self.bot})
+                    await self.dispatcher.feed_update(self.bot, update)
+                    self.stats["handled"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(f"Error handling update {data.get('update_id')}: {e}", exc_info=True)
+                if self.progress is not None:
+                    self.progress[0] = self.stats["handled"]
+                    self.progress[1] = self.stats["failed"]
+        finally:
+            del self._chats[key]
+
+    async def join(self):
+        """Wait until every queued update is handled"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _worker_main(index: int, inbox, ready, results, progress,
+                 create_bot: Callable[[], Bot], create_dispatcher: Callable[[], Dispatcher]):
+    """Worker process: handle the updates of its chats until told to stop"""
+    # The supervisor decides when workers stop (it sends None after the last update)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    async def _serve():
+        bot = create_bot()
+        dispatcher = create_dispatcher()
+        dispatcher["worker"] = index
+        workflow_data = {"dispatcher": dispatcher, "bot": bot, **dispatcher.workflow_data}
+        await dispatcher.emit_startup(**workflow_data)
+
+        runner = ChatOrderedRunner(dispatcher, bot, progress)
+        loop = asyncio.get_running_loop()
+        finished = asyncio.Event()
+
+        def _receive():
+            # Blocking reads stay off the event loop
+            while True:
+                batch = inbox.get()
+                if batch is None:
+                    loop.call_soon_threadsafe(finished.set)
+                    return
+                loop.call_soon_threadsafe(_submit, batch)
+
+        def _submit(batch: List[dict]):
+            for update in batch:
+                runner.submit(update)
+
+        threading.Thread(target=_receive, name=f"dispatch-inbox-{index}", daemon=True).start()
+        ready.release()
+        try:
+            await finished.wait()
+            await runner.join()
+        finally:
+            await dispatcher.emit_shutdown(**workflow_data)
+            await bot.session.close()
+            results.put((index, runner.stats))
+
+    asyncio.run(_serve())
+
+
+class ShardedDispatcher:
+    """Supervisor side: routes updates to chat-partitioned worker processes"""
+
+    def __init__(self, workers: int, create_bot: Callable[[], Bot],
+                 create_dispatcher: Callable[[], Dispatcher]):
+        """
+        Initialize supervisor.
+
+        Args:
+            workers: Number of worker processes
+            create_bot: Picklable factory creating a worker's Bot
+            create_dispatcher: Picklable factory creating a worker's Dispatcher
+        """
+        self.workers = workers
+        self.create_bot = create_bot
+        self.create_dispatcher = create_dispatcher
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes: List[Any] = []
+        self._processes: List[Any] = []
+        self._results = None
+        self._progress: List[Any] = []
+        self._pending: List[List[dict]] = []
+        # Updates handed to each worker's inbox
+        self._sent: List[int] = []
+        self._flush_scheduled = False
+        self.stats = {"routed": 0, "batches": 0, "dropped": 0}
+        self.worker_stats: Dict[int, dict] = {}
+
+    def start(self):
+        """Start the workers and wait until all of them are ready"""
+        ready = self._context.Semaphore(0)
+        self._results = self._context.Queue()
+        self._inboxes = [self._context.Queue() for _ in range(self.workers)]
+        # Handled and failed counts, written by the worker only
+        self._progress = [self._context.RawArray("q", 2) for _ in range(self.workers)]
+        self._pending = [[] for _ in range(self.workers)]
+        self._sent = [0] * self.workers
+        self._processes = [
+            self._context.Process(
+                target=_worker_main, name=f"dispatch-worker-{i}",
+                args=(i, self._inboxes[i], ready, self._results, self._progress[i],
+                      self.create_bot, self.create_dispatcher)
+            )
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        for _ in self._processes:
+            if not ready.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise RuntimeError("Dispatch workers did not start in time")
+        logger.info(f"Started {self.workers} dispatch workers")
+
+    def route(self, update: dict):
+        """
+        Send a raw update to the worker owning its chat.
+
+        Updates routed in the same event loop iteration are sent as one
+        batch per worker.
+        """
+        self._pending[chat_key(update) % self.workers].append(update)
+        self.stats["routed"] += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        """Send the updates routed since the last flush"""
+        self._flush_scheduled = False
+        for index, batch in enumerate(self._pending):
+            if batch:
+                self._inboxes[index].put(batch)
+                self._pending[index] = []
+                self._sent[index] += len(batch)
+                self.stats["batches"] += 1
+
+    def _done(self, index: int) -> int:
+        """Updates a worker finished (handled or failed)"""
+        return self._progress[index][0] + self._progress[index][1]
+
+    def stop(self):
+        """
+        Let the workers finish their queued updates, then stop them.
+
+        Call it after updates stopped arriving. Workers are waited for as
+        long as they keep finishing updates; one that makes no progress for
+        ``WORKER_STOP_TIMEOUT`` seconds is killed, and the updates it never
+        finished are logged and counted in ``stats["dropped"]``.
+        """
+        if not self._processes:
+            return
+        self._flush()
+        for inbox in self._inboxes:
+            inbox.put(None)
+
+        running = set(range(self.workers))
+        done = sum(self._done(i) for i in running)
+        progress_at = time.monotonic()
+        while running and time.monotonic() - progress_at < WORKER_STOP_TIMEOUT:
+            try:
+                index, stats = self._results.get(timeout=0.5)
+                self.worker_stats[index] = stats
+                running.discard(index)
+            except queue.Empty:
+                pass
+            now_done = sum(self._done(i) for i in range(self.workers))
+            if now_done != done:
+                done, progress_at = now_done, time.monotonic()
+
+        for index, process in enumerate(self._processes):
+            if index in running:
+                logger.warning(f"{process.name} made no progress for {WORKER_STOP_TIMEOUT}s, killing it")
+                process.kill()
+                self.worker_stats[index] = {"handled": self._progress[index][0],
+                                            "failed": self._progress[index][1]}
+            process.join()
+            dropped = self._sent[index] - self._done(index)
+            if dropped:
+                self.stats["dropped"] += dropped
+                logger.error(f"{process.name} dropped {dropped} of the {self._sent[index]} updates "
+                             f"routed to it")
+        self._processes = []
+        logger.info(f"Dispatch workers stopped: {self.worker_stats}")
+
+
+async def poll_updates(bot: Bot, shards: ShardedDispatcher, allowed_updates: Optional[List[str]],
+                       stop: asyncio.Event, timeout: int = 30):
+    """
+    Long-poll updates and route them to the workers until ``stop`` is set.
+
+    Args:
+        bot: Bot to poll for
+        shards: Supervisor routing the updates
+        allowed_updates: Update types to receive
+        stop: Set to stop polling
+        timeout: Long polling timeout in seconds
+    """
+    offset = None
+    backoff = 1.0
+    while not stop.is_set():
+        request = asyncio.create_task(
+            bot.get_updates(offset=offset, timeout=timeout, allowed_updates=allowed_updates)
+        )
+        stopping = asyncio.create_task(stop.wait())
+        await asyncio.wait({request, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not request.done():
+            request.cancel()
+            break
+        try:
+            updates = request.result()
+        except Exception as e:
+            logger.error(f"Error polling updates: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+
+        backoff = 1.0
+        for update in updates:
+            shards.route(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+            offset = update.update_id + 1
@@ -8,6 +8,7 @@ from database.transaction_repository import TransactionRepository
 from database.user_repository import UserRepository
 from database.rate_repository import RateRepository
 from database.db import db
+from utils.money import to_minor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,7 +24,8 @@ class TransactionService:
     
     @staticmethod
     def create_transaction(user_id: int, transaction_type: str, payment_channel: str,
-                          amount: float, description: Optional[str] = None) -> dict:
+                          amount: float, description: Optional[str] = None,
+                          vip_level: Optional[int] = None) -> dict:
         """
         Create a new transaction.
         
@@ -33,17 +35,20 @@ class TransactionService:
             payment_channel: alipay, wechat
             amount: Transaction amount
             description: Transaction description
+            vip_level: VIP level the order was quoted at (looked up if omitted)
             
         Returns:
             Transaction data dictionary
         """
         try:
-            # Get user VIP level
-            user = UserRepository.get_user(user_id)
-            vip_level = user.get('vip_level', 0) if user else 0
+            # Get user VIP level unless the caller already quoted the order
+            if vip_level is None:
+                user = UserRepository.get_user(user_id)
+                vip_level = user.get('vip_level', 0) if user else 0
             
-            # Calculate fee
-            fee, actual_amount = RateRepository.calculate_fee(amount, payment_channel, vip_level)
+            # Calculate fee in integer fen
+            amount_minor = to_minor(amount)
+            fee_minor, actual_minor = RateRepository.calculate_fee(amount_minor, payment_channel, vip_level)
             
             # Generate order ID
             order_id = TransactionService.generate_order_id()
@@ -54,9 +59,9 @@ class TransactionService:
                 order_id=order_id,
                 transaction_type=transaction_type,
                 payment_channel=payment_channel,
-                amount=amount,
-                fee=fee,
-                actual_amount=actual_amount,
+                amount_minor=amount_minor,
+                fee_minor=fee_minor,
+                actual_amount_minor=actual_minor,
                 currency="CNY",
                 description=description
             )
@@ -82,44 +87,18 @@ class TransactionService:
         return TransactionRepository.get_transaction(order_id)
     
     @staticmethod
-    def update_transaction_status(order_id: str, status: str):
-        """Update transaction status"""
-        TransactionRepository.update_transaction_status(order_id, status, datetime.utcnow())
+    def update_transaction_status(order_id: str, status: str) -> str:
+        """
+        Update transaction status.
         
-        # Update user statistics if paid
-        if status == "paid":
-            transaction = TransactionRepository.get_transaction(order_id)
-            if transaction:
-                user_id = transaction['user_id']
-                amount = float(transaction['amount'])
-                
-                # Update user statistics
-                UserRepository.update_statistics(user_id, amount)
-                
-                # Check if this is user's first transaction and trigger referral rewards
-                try:
-                    from database.referral_repository import ReferralRepository
-                    from database.transaction_repository import TransactionRepository as TR
-                    
-                    # Check if this is first successful transaction
-                    previous_paid = TR.get_user_transactions(
-                        user_id, limit=1, status='paid'
-                    )
-                    
-                    # If this is the only paid transaction, it's the first one
-                    if len(previous_paid) == 1 and previous_paid[0]['order_id'] == order_id:
-                        # Trigger referral rewards
-                        ReferralRepository.update_referral_status(
-                            user_id, 'rewarded', amount
-                        )
-                        
-                        # Give new user reward (5 USDT)
-                        ReferralRepository.create_reward(
-                            user_id, 'new_user_bonus', 5.0, None,
-                            "新用户首次交易红包"
-                        )
-                        
-                        logger.info(f"Triggered referral rewards for user {user_id}, first transaction {order_id}")
-                except Exception as e:
-                    logger.error(f"Error triggering referral rewards: {e}", exc_info=True)
-
+        The ledger, user statistics and first-transaction rewards are
+        applied in the same commit (see
+        ``TransactionRepository.apply_status_change``).
+        
+        Returns:
+            "applied", "unchanged", "rejected" or "unknown_order"
+        """
+        result = TransactionRepository.update_transaction_status(order_id, status, datetime.utcnow())
+        if result != "applied":
+            logger.info(f"Status change of {order_id} to {status}: {result}")
+        return result
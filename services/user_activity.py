@@ -0,0 +1,199 @@
+"""
+Write-coalescing user activity tracker.
+
+Keeps the last persisted profile and activity time per user in memory and
+only touches the database when something actually changed. Unknown users are
+upserted immediately (so handlers can read them straight away); profile
+changes and ``last_active_at`` bumps for known users are buffered and flushed
+in one ``executemany`` transaction every ``flush_interval`` seconds or once
+``flush_batch_size`` users are dirty.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from aiogram.types import User
+from config import Config
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+# (username, first_name, last_name, language_code, is_premium)
+Profile = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], int]
+
+
+class UserActivityTracker:
+    """In-memory buffer of user profile and activity updates"""
+
+    def __init__(self, flush_interval: float = 10.0, flush_batch_size: int = 500,
+                 activity_resolution: float = 60.0, max_known_users: int = 100000):
+        """
+        Initialize tracker.
+
+        Args:
+            flush_interval: Seconds between periodic flushes
+            flush_batch_size: Flush as soon as this many users are dirty
+            activity_resolution: Minimum seconds between ``last_active_at``
+                writes for a user whose profile did not change
+            max_known_users: Maximum number of users remembered in memory
+        """
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.activity_resolution = activity_resolution
+        self.max_known_users = max_known_users
+
+        # user_id -> (profile, monotonic time of last persisted activity)
+        self._known: "OrderedDict[int, Tuple[Profile, float]]" = OrderedDict()
+        # user_id -> (profile, last_active_at timestamp string)
+        self._dirty: Dict[int, Tuple[Profile, str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        self.stats = {"tracked": 0, "skipped": 0, "inserted": 0, "flushed_rows": 0, "flushes": 0}
+
+    @staticmethod
+    def _profile(user: User) -> Profile:
+        """Extract persisted profile fields from Telegram user"""
+        is_premium = getattr(user, "is_premium", False)
+        return (
+            user.username,
+            user.first_name,
+            user.last_name,
+            getattr(user, "language_code", None),
+            1 if is_premium else 0
+        )
+
+    def _remember(self, user_id: int, profile: Profile, seen_at: float):
+        """Record persisted state, evicting least recently seen users"""
+        self._known[user_id] = (profile, seen_at)
+        self._known.move_to_end(user_id)
+        # Evicted users are simply upserted again the next time they show up
+        while len(self._known) > self.max_known_users:
+            self._known.popitem(last=False)
+
+    async def track(self, user: User):
+        """
+        Record activity of a Telegram user.
+
+        Args:
+            user: Telegram User object
+        """
+        self.stats["tracked"] += 1
+        user_id = user.id
+        profile = self._profile(user)
+        now = time.monotonic()
+        now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+        known = self._known.get(user_id)
+        if known is None:
+            await self._upsert(user_id, profile, now_str)
+            self._remember(user_id, profile, now)
+            self.stats["inserted"] += 1
+            return
+
+        persisted_profile, last_written = known
+        if profile == persisted_profile and now - last_written < self.activity_resolution:
+            self._known.move_to_end(user_id)
+            self.stats["skipped"] += 1
+            return
+
+        self._dirty[user_id] = (profile, now_str)
+        self._remember(user_id, profile, now)
+
+        if len(self._dirty) >= self.flush_batch_size:
+            await self.flush()
+
+    async def _upsert(self, user_id: int, profile: Profile, now_str: str):
+        """Insert a user seen for the first time (or refresh it after a restart)"""
+        username, first_name, last_name, language_code, is_premium = profile
+        await db.execute_async("""
+            INSERT INTO users
+            (user_id, username, first_name, last_name, language_code,
+             is_premium, created_at, updated_at, last_active_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                username = excluded.username,
+                first_name = excluded.first_name,
+                last_name = excluded.last_name,
+                language_code = excluded.language_code,
+                is_premium = excluded.is_premium,
+                updated_at = excluded.updated_at,
+                last_active_at = excluded.last_active_at
+        """, (user_id, username, first_name, last_name, language_code,
+              is_premium, now_str, now_str, now_str))
+
+    async def flush(self) -> int:
+        """
+        Write all buffered updates in a single transaction.
+
+        Returns:
+            Number of user rows written
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+
+            batch, self._dirty = self._dirty, {}
+            rows = [
+                (username, first_name, last_name, language_code, is_premium,
+                 last_active_at, last_active_at, user_id)
+                for user_id, ((username, first_name, last_name, language_code, is_premium), last_active_at)
+                in batch.items()
+            ]
+
+            try:
+                await db.executemany_async("""
+                    UPDATE users
+                    SET username = ?, first_name = ?, last_name = ?,
+                        language_code = ?, is_premium = ?,
+                        last_active_at = ?, updated_at = ?
+                    WHERE user_id = ?
+                """, rows)
+            except Exception as e:
+                logger.error(f"Error flushing user activity ({len(rows)} users): {e}")
+                # Put the batch back unless a newer update arrived meanwhile
+                for user_id, update in batch.items():
+                    self._dirty.setdefault(user_id, update)
+                return 0
+
+            self.stats["flushes"] += 1
+            self.stats["flushed_rows"] += len(rows)
+            logger.debug(f"Flushed activity of {len(rows)} users")
+            return len(rows)
+
+    async def _run(self):
+        """Periodic flush loop"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error in user activity flush loop: {e}", exc_info=True)
+
+    def start(self):
+        """Start the periodic flush task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"User activity tracker started (flush every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the periodic flush task and flush remaining updates"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        flushed = await self.flush()
+        logger.info(f"User activity tracker stopped, flushed {flushed} users")
+
+
+# Global tracker instance
+activity_tracker = UserActivityTracker(
+    flush_interval=Config.USER_ACTIVITY_FLUSH_INTERVAL,
+    flush_batch_size=Config.USER_ACTIVITY_FLUSH_BATCH
+)
@@ -67,8 +67,7 @@ class UserService:
         Args:
             user_id: Telegram user ID
         """
-        # Message count is not tracked separately in database
-        pass
+        UserRepository.increment_message_count(user_id)
     
     @classmethod
     def get_total_users(cls) -> int:
@@ -17,12 +17,14 @@ class VerificationService:
     
     @staticmethod
     def get_random_question(group_id: int, difficulty: Optional[str] = None) -> Optional[dict]:
-        """Get a random verification question for a group"""
-        questions = VerificationRepository.get_questions(group_id=group_id, difficulty=difficulty, limit=1)
-        if not questions:
-            # Fallback to global questions
-            questions = VerificationRepository.get_questions(group_id=None, difficulty=difficulty, limit=1)
-        return questions[0] if questions else None
+        """
+        Get a random verification question for a group.
+        
+        Drawn in O(1) from the group's in-memory pool (its own and the
+        global questions), weighted by Config.VERIFICATION_QUESTION_WEIGHTING.
+        """
+        question = VerificationRepository.get_question_pool(group_id).sample(difficulty)
+        return dict(question) if question else None
     
     @staticmethod
     def format_question_message(question: dict) -> str:
@@ -0,0 +1,77 @@
+"""
+Periodic reconciliation of the wallet ledger against ``transactions``.
+
+On start the ledger is built from scratch if it is empty (first deploy of the
+ledger tables); afterwards every ``interval`` seconds users whose ledger
+balance drifted from a full recomputation are rebuilt.
+"""
+import asyncio
+import logging
+from typing import Optional
+from config import Config
+from database.wallet_repository import WalletRepository
+
+logger = logging.getLogger(__name__)
+
+
+class WalletReconciler:
+    """Background task keeping the wallet ledger consistent"""
+
+    def __init__(self, interval: float = 86400.0):
+        """
+        Initialize reconciler.
+
+        Args:
+            interval: Seconds between reconciliation runs (0 disables the periodic run)
+        """
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """
+        Reconcile now.
+
+        Returns:
+            Number of users whose ledger was repaired
+        """
+        repaired = await WalletRepository.reconcile()
+        if repaired:
+            logger.warning(f"Wallet reconciliation repaired {repaired} users")
+        else:
+            logger.info("Wallet reconciliation found no drift")
+        return repaired
+
+    async def _run(self):
+        """Bootstrap, then reconcile periodically"""
+        try:
+            if await WalletRepository.is_empty():
+                await WalletRepository.rebuild()
+        except Exception as e:
+            logger.error(f"Error bootstrapping wallet ledger: {e}", exc_info=True)
+
+        while self.interval > 0:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error in wallet reconciliation: {e}", exc_info=True)
+
+    def start(self):
+        """Start the background task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Wallet reconciler started (every {self.interval}s)")
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global reconciler instance
+wallet_reconciler = WalletReconciler(interval=Config.WALLET_RECONCILE_INTERVAL)
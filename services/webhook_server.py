@@ -0,0 +1,201 @@
+"""
+Webhook delivery of Telegram updates.
+
+An aiohttp server receives the updates Telegram POSTs, checks the secret
+token header, drops redeliveries by ``update_id`` and hands each update to
+``Dispatcher.feed_update`` in a background task, so Telegram gets its 200
+right away instead of waiting for the handler (and its AI or database calls).
+
+Several worker processes can share the listening port (``SO_REUSEPORT``)
+behind nginx. A retry may then reach a different worker than the original
+delivery, so the workers dedupe through the ``telegram_updates`` table; a
+single process only needs its in-memory window. Payment and calculator
+flows are shared through the SQLite FSM storage (``services/fsm_storage``),
+which then reads every state from the database; the in-memory FSM storage
+does not work with several workers. Chat-partitioned dispatch workers
+(``services/sharded_dispatch``) keep per-chat caches and ordering instead.
+"""
+import asyncio
+import hmac
+import signal
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional, Set
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from database.update_repository import UpdateRepository
+
+logger = logging.getLogger(__name__)
+
+# Header carrying the secret_token given to setWebhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateDeduplicator:
+    """Remembers recent update ids, optionally shared between processes"""
+
+    def __init__(self, window: int = 10000, shared: bool = False):
+        """
+        Initialize deduplicator.
+
+        Args:
+            window: Recent update ids remembered
+            shared: Also claim ids in the database (several worker processes)
+        """
+        self.window = window
+        self.shared = shared
+        self._recent: OrderedDict = OrderedDict()
+
+    def _remember(self, update_id: int):
+        self._recent[update_id] = None
+        if len(self._recent) > self.window:
+            self._recent.popitem(last=False)
+
+    async def claim(self, update_id: int) -> bool:
+        """
+        Claim an update for processing.
+
+        Args:
+            update_id: Telegram update id
+
+        Returns:
+            True if the update was not seen before
+        """
+        if update_id in self._recent:
+            return False
+        # Remembered only once claimed: if the database claim fails, the
+        # request errors and Telegram's retry must not be dropped here
+        claimed = not self.shared or await UpdateRepository.claim(update_id, self.window)
+        self._remember(update_id)
+        return claimed
+
+
+class WebhookHandler:
+    """aiohttp handler feeding webhook updates to the dispatcher"""
+
+    def __init__(self, dispatcher: Optional[Dispatcher], bot: Optional[Bot], secret: str,
+                 deduplicator: UpdateDeduplicator,
+                 forward: Optional[Callable[[dict], None]] = None):
+        """
+        Initialize handler.
+
+        Args:
+            dispatcher: Dispatcher handling the updates (unused when forwarding)
+            bot: Bot the updates belong to (unused when forwarding)
+            secret: Expected secret token (the one given to setWebhook)
+            deduplicator: Update id deduplicator
+            forward: Hand raw updates to this callable instead of the dispatcher
+        """
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.secret = secret
+        self.deduplicator = deduplicator
+        self.forward = forward
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"received": 0, "duplicates": 0, "unauthorized": 0, "invalid": 0,
+                      "handled": 0, "failed": 0}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Accept one update"""
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret.encode()):
+            self.stats["unauthorized"] += 1
+            return web.Response(status=401)
+
+        try:
+            data = await request.json()
+            if self.forward is not None:
+                update_id = int(data["update_id"])
+            else:
+                update = Update.model_validate(data, context={"bot": self.bot})
+                update_id = update.update_id
+        except Exception as e:
+            self.stats["invalid"] += 1
+            logger.warning(f"Invalid webhook update: {e}")
+            return web.Response(status=400)
+
+        self.stats["received"] += 1
+        if not await self.deduplicator.claim(update_id):
+            self.stats["duplicates"] += 1
+            return web.Response()
+
+        if self.forward is not None:
+            self.forward(data)
+            return web.Response()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        """Run the handlers for an update"""
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+            self.stats["handled"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Error handling update {update.update_id}: {e}", exc_info=True)
+
+    async def close(self, app: Optional[web.Application] = None):
+        """Wait for updates still being handled"""
+        if self._tasks:
+            logger.info(f"Waiting for {len(self._tasks)} updates in progress")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def create_app(dispatcher: Optional[Dispatcher], bot: Optional[Bot], secret: str, path: str,
+               deduplicator: UpdateDeduplicator,
+               forward: Optional[Callable[[dict], None]] = None) -> web.Application:
+    """
+    Build the webhook application.
+
+    The dispatcher's startup/shutdown handlers run with the application's,
+    after in-progress updates have finished on shutdown.
+
+    Args:
+        dispatcher: Dispatcher handling the updates (None when forwarding)
+        bot: Bot the updates belong to
+        secret: Expected secret token
+        path: URL path Telegram posts to
+        deduplicator: Update id deduplicator
+        forward: Hand raw updates to this callable instead of the dispatcher
+
+    Returns:
+        aiohttp application
+    """
+    app = web.Application()
+    handler = WebhookHandler(dispatcher, bot, secret, deduplicator, forward)
+    app["webhook_handler"] = handler
+    app.router.add_post(path, handler.handle)
+    app.on_shutdown.append(handler.close)
+    if dispatcher is not None:
+        setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def serve(app: web.Application, host: str, port: int, reuse_port: bool = False):
+    """
+    Serve the webhook application until SIGINT/SIGTERM.
+
+    Args:
+        app: Application from ``create_app``
+        host: Listen address
+        port: Listen port
+        reuse_port: Share the port with other worker processes
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, host, port, reuse_port=reuse_port or None)
+        await site.start()
+        logger.info(f"Webhook server listening on {host}:{port}")
+        await stop.wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,97 @@
+"""
+Aho-Corasick multi-pattern string matcher
+"""
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class AhoCorasick:
+    """
+    Automaton that finds every pattern occurring in a text in one pass.
+
+    Matching costs O(len(text) + number of matches) regardless of how many
+    patterns were compiled in.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]] = ()):
+        """
+        Build automaton.
+
+        Args:
+            patterns: Iterable of (pattern, payload) pairs; the payload is
+                returned for every pattern found in the text
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+        self._size = 0
+
+        for pattern, payload in patterns:
+            self._add(pattern, payload)
+        self._build()
+
+    def __len__(self) -> int:
+        """Number of patterns compiled in"""
+        return self._size
+
+    def _add(self, pattern: str, payload: Any):
+        """Insert a pattern into the trie"""
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(payload)
+        self._size += 1
+
+    def _build(self):
+        """Compute failure links breadth-first and merge outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                if self._out[self._fail[next_state]]:
+                    self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[Any]:
+        """
+        Find all patterns occurring in text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Payloads of matched patterns, each once, in order of first match
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        state = 0
+        found: List[Any] = []
+        seen = set()
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for payload in out[state]:
+                    key = id(payload)
+                    if key not in seen:
+                        seen.add(key)
+                        found.append(payload)
+
+        return found
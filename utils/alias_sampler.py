@@ -0,0 +1,73 @@
+"""
+Weighted random sampling in constant time (Walker/Vose alias method)
+"""
+import random
+from typing import Any, List, Optional, Sequence
+
+
+class AliasSampler:
+    """
+    Draws items with probability proportional to their weights.
+
+    Building costs O(n); every draw costs O(1) (one index and one coin
+    flip) regardless of the number of items or how skewed the weights are.
+    """
+
+    def __init__(self, items: Sequence[Any], weights: Optional[Sequence[float]] = None):
+        """
+        Build sampler.
+
+        Args:
+            items: Items to draw from (at least one)
+            weights: Non-negative weight per item, not all zero (None: uniform)
+        """
+        if not items:
+            raise ValueError("AliasSampler needs at least one item")
+        self.items: List[Any] = list(items)
+        self._prob: Optional[List[float]] = None
+        self._alias: Optional[List[int]] = None
+        if weights is not None:
+            self._build(weights)
+
+    def __len__(self) -> int:
+        """Number of items"""
+        return len(self.items)
+
+    def _build(self, weights: Sequence[float]):
+        """Split the weights into n columns of height 1, each holding at most two items"""
+        n = len(self.items)
+        if len(weights) != n:
+            raise ValueError("AliasSampler needs one weight per item")
+        total = float(sum(weights))
+        if total <= 0 or any(weight < 0 for weight in weights):
+            raise ValueError("AliasSampler weights must be non-negative and not all zero")
+
+        scaled = [weight * n / total for weight in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1 up to rounding
+        self._prob, self._alias = prob, alias
+
+    def sample(self, rng: Optional[random.Random] = None) -> Any:
+        """
+        Draw one item.
+
+        Args:
+            rng: Random generator (default: the ``random`` module's)
+
+        Returns:
+            An item, with probability weight / total weight
+        """
+        rng = rng or random
+        index = rng.randrange(len(self.items))
+        if self._prob is not None and rng.random() >= self._prob[index]:
+            index = self._alias[index]
+        return self.items[index]
@@ -0,0 +1,177 @@
+"""
+Progressive message editing for streamed bot replies
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, Message
+from utils.text_utils import escape_markdown_v2
+
+logger = logging.getLogger(__name__)
+
+# Telegram message text limit (after entity parsing, we check the escaped source)
+MAX_MESSAGE_LENGTH = 4096
+# Appended to intermediate edits to show the answer is still being written
+TYPING_CURSOR = " ▌"
+# Flood-controlled tries of the final edit before the text is sent as a new message
+FINAL_EDIT_ATTEMPTS = 3
+
+
+def _fit_markdown_v2(text: str, limit: int = MAX_MESSAGE_LENGTH) -> str:
+    """
+    Longest prefix of ``text`` whose MarkdownV2 escaping fits in ``limit``.
+
+    Args:
+        text: Raw (unescaped) text
+        limit: Maximum escaped length
+
+    Returns:
+        Raw text prefix
+    """
+    while len(escape_markdown_v2(text)) > limit:
+        overflow = len(escape_markdown_v2(text)) - limit
+        # Each raw character escapes to at most two, so this always shrinks
+        text = text[:len(text) - max(1, overflow // 2)]
+    return text
+
+
+class MessageStreamer:
+    """
+    Shows a streamed answer by editing one placeholder message.
+
+    Edits are rate-limited (Telegram allows roughly one edit per second per
+    chat), every edit is MarkdownV2-escaped, and flood-control responses
+    (``RetryAfter``) postpone the next edit instead of failing the reply.
+    The final edit carries the reply keyboard; text beyond one message is
+    sent as follow-up messages.
+    """
+
+    def __init__(self, message: Message, edit_interval: float = 1.0, min_delta: int = 20):
+        """
+        Initialize streamer.
+
+        Args:
+            message: Incoming message to reply to
+            edit_interval: Minimum seconds between two edits
+            min_delta: Minimum number of new characters worth an edit
+        """
+        self.message = message
+        self.edit_interval = edit_interval
+        self.min_delta = min_delta
+
+        self.text = ""
+        self.edits = 0
+        self.started_at = time.monotonic()
+        self.first_text_at: Optional[float] = None
+
+        self._reply: Optional[Message] = None
+        self._shown = ""
+        self._next_edit_at = 0.0
+        self._live = True
+
+    @property
+    def time_to_first_text(self) -> Optional[float]:
+        """Seconds from creation until answer text was first visible"""
+        if self.first_text_at is None:
+            return None
+        return self.first_text_at - self.started_at
+
+    async def start(self, placeholder: str = "💭 正在思考..."):
+        """
+        Send the placeholder message.
+
+        Args:
+            placeholder: Plain text shown until the first chunk arrives
+        """
+        self._reply = await self.message.answer(escape_markdown_v2(placeholder), parse_mode="MarkdownV2")
+
+    async def push(self, chunk: str):
+        """
+        Append a chunk and edit the message if the rate limit allows.
+
+        Args:
+            chunk: Next piece of answer text
+        """
+        self.text += chunk
+        if not self._live or self._reply is None:
+            return
+
+        now = time.monotonic()
+        if now < self._next_edit_at or (self._shown and len(self.text) - len(self._shown) < self.min_delta):
+            return
+
+        visible = _fit_markdown_v2(self.text, MAX_MESSAGE_LENGTH - len(TYPING_CURSOR))
+        if len(visible) < len(self.text):
+            # The message is full, the rest goes out with finish()
+            self._live = False
+        await self._edit(visible, cursor=True)
+
+    async def _edit(self, text: str, cursor: bool = False,
+                    reply_markup: Optional[InlineKeyboardMarkup] = None) -> bool:
+        """Edit the placeholder, returns False if the edit was not applied"""
+        if not text.strip():
+            return False
+        escaped = escape_markdown_v2(text) + (TYPING_CURSOR if cursor else "")
+        try:
+            await self._reply.edit_text(escaped, parse_mode="MarkdownV2", reply_markup=reply_markup)
+        except TelegramRetryAfter as e:
+            logger.debug(f"Edit rate limited, retry after {e.retry_after}s")
+            self._next_edit_at = time.monotonic() + e.retry_after
+            return False
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e).lower():
+                return True
+            raise
+
+        self.edits += 1
+        self._shown = text
+        self._next_edit_at = time.monotonic() + self.edit_interval
+        if self.first_text_at is None:
+            self.first_text_at = time.monotonic()
+        return True
+
+    async def finish(self, reply_markup: Optional[InlineKeyboardMarkup] = None):
+        """
+        Show the complete text and attach the keyboard.
+
+        Args:
+            reply_markup: Keyboard for the last message of the reply
+        """
+        parts: List[str] = []
+        rest = self.text.strip()
+        while rest:
+            part = _fit_markdown_v2(rest)
+            parts.append(part)
+            rest = rest[len(part):]
+        if not parts:
+            return
+
+        first_markup = reply_markup if len(parts) == 1 else None
+        if self._reply is None:
+            self._reply = await self.message.answer(
+                escape_markdown_v2(parts[0]), parse_mode="MarkdownV2", reply_markup=first_markup
+            )
+            self.first_text_at = self.first_text_at or time.monotonic()
+        else:
+            # The final edit must land, wait out flood control if needed
+            for _ in range(FINAL_EDIT_ATTEMPTS):
+                delay = self._next_edit_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if await self._edit(parts[0], reply_markup=first_markup):
+                    break
+            else:
+                logger.warning(f"Final edit still rate limited after {FINAL_EDIT_ATTEMPTS} tries, "
+                               f"sending the reply as a new message")
+                await self.message.answer(
+                    escape_markdown_v2(parts[0]), parse_mode="MarkdownV2", reply_markup=first_markup
+                )
+
+        for index, part in enumerate(parts[1:], start=2):
+            await self.message.answer(
+                escape_markdown_v2(part),
+                parse_mode="MarkdownV2",
+                reply_markup=reply_markup if index == len(parts) else None
+            )
@@ -0,0 +1,126 @@
+"""
+Exact money arithmetic on integer minor units.
+
+Amounts are stored and summed as integers in the smallest unit of their
+currency (fen for CNY, micro-USDT for USDT). Conversions from user input go
+through ``Decimal`` with an explicit rounding mode, fee rates are applied as
+integer parts per million, and amounts only become decimals again for
+display (see ``format_money_markdown`` in ``utils/text_utils``).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, List, Tuple, Union
+
+# Minor units per major unit of each supported currency
+MINOR_UNITS = {
+    "CNY": 100,
+    "USDT": 1_000_000,
+}
+
+# Fee rates are applied as integer parts per million (0.55% = 5500)
+RATE_SCALE = 1_000_000
+
+Number = Union[int, float, str, Decimal]
+
+
+def minor_unit(currency: str = "CNY") -> int:
+    """Minor units per major unit of a currency"""
+    try:
+        return MINOR_UNITS[currency]
+    except KeyError:
+        raise ValueError(f"Unsupported currency: {currency}") from None
+
+
+def to_minor(amount: Number, currency: str = "CNY", rounding: str = ROUND_HALF_UP) -> int:
+    """
+    Convert a major-unit amount to integer minor units.
+
+    Floats are converted through their shortest repr, so ``0.1`` becomes
+    exactly 10 fen rather than the binary value's 10.000000000000000555.
+
+    Args:
+        amount: Amount in major units (e.g. yuan)
+        currency: Currency code
+        rounding: Decimal rounding mode for sub-minor digits
+
+    Returns:
+        Amount in minor units
+    """
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    return int((value * minor_unit(currency)).to_integral_value(rounding=rounding))
+
+
+def from_minor(amount_minor: int, currency: str = "CNY") -> Decimal:
+    """
+    Convert integer minor units to an exact major-unit Decimal.
+
+    Args:
+        amount_minor: Amount in minor units
+        currency: Currency code
+
+    Returns:
+        Amount in major units
+    """
+    return Decimal(amount_minor or 0) / minor_unit(currency)
+
+
+def rate_to_ppm(rate: Number) -> int:
+    """Convert a fractional rate (0.0055) to parts per million (5500)"""
+    value = rate if isinstance(rate, Decimal) else Decimal(str(rate))
+    return int((value * RATE_SCALE).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _div_half_up(numerator: int, denominator: int) -> int:
+    """Integer division rounding half away from zero"""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def apply_rate(amount_minor: int, rate_ppm: int) -> Tuple[int, int]:
+    """
+    Split an amount into fee and remainder.
+
+    The fee is rounded half up to the minor unit.
+
+    Args:
+        amount_minor: Amount in minor units
+        rate_ppm: Fee rate in parts per million
+
+    Returns:
+        Tuple of (fee_minor, actual_minor)
+    """
+    fee = _div_half_up(amount_minor * rate_ppm, RATE_SCALE)
+    return fee, amount_minor - fee
+
+
+def apply_rate_batch(amounts_minor: Iterable[int], rate_ppm: int) -> List[Tuple[int, int]]:
+    """``apply_rate`` over many amounts with the same rate"""
+    half = RATE_SCALE // 2
+    quotes = []
+    for amount in amounts_minor:
+        if amount >= 0:
+            fee = (amount * rate_ppm + half) // RATE_SCALE
+        else:
+            fee = _div_half_up(amount * rate_ppm, RATE_SCALE)
+        quotes.append((fee, amount - fee))
+    return quotes
+
+
+def convert_minor(amount_minor: int, from_currency: str, to_currency: str,
+                  rate: Number = 1, rounding: str = ROUND_HALF_UP) -> int:
+    """
+    Convert minor units between currencies at an exchange rate.
+
+    Args:
+        amount_minor: Amount in minor units of ``from_currency``
+        from_currency: Source currency code
+        to_currency: Target currency code
+        rate: Target major units per source major unit
+        rounding: Decimal rounding mode for the result
+
+    Returns:
+        Amount in minor units of ``to_currency``
+    """
+    value = rate if isinstance(rate, Decimal) else Decimal(str(rate))
+    return to_minor(from_minor(amount_minor, from_currency) * value, to_currency, rounding)
@@ -0,0 +1,42 @@
+"""
+Opaque cursors for keyset pagination
+"""
+import base64
+import binascii
+from typing import Tuple
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    """
+    Encode a (created_at, id) sort key as an opaque, URL- and callback-safe token.
+
+    Args:
+        created_at: Sort timestamp of the row
+        row_id: Primary key of the row (tie-breaker)
+
+    Returns:
+        Cursor token
+    """
+    raw = f"{created_at}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, int]:
+    """
+    Decode a cursor token.
+
+    Args:
+        token: Token produced by ``encode_cursor``
+
+    Returns:
+        (created_at, id)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return created_at, int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
@@ -2,6 +2,8 @@
 Text utilities for message formatting and escaping
 """
 import re
+from decimal import Decimal, ROUND_HALF_UP
+from utils.money import from_minor
 
 
 def escape_markdown_v2(text: str) -> str:
@@ -51,6 +53,31 @@ def format_amount_markdown(amount: float, currency: str = "¥", decimal_places:
     return f"{currency}{escaped}"
 
 
+def format_money_markdown(amount_minor: int, currency: str = "CNY", symbol: str = None,
+                          decimal_places: int = 2) -> str:
+    """
+    Format an integer minor-unit amount for MarkdownV2.
+    
+    This is where stored money becomes a decimal again; it is rounded half
+    up to ``decimal_places``.
+    
+    Args:
+        amount_minor: Amount in minor units (fen, micro-USDT)
+        currency: Currency code of the amount
+        symbol: Displayed currency symbol (default: "¥" for CNY, else the code)
+        decimal_places: Number of decimal places (default: 2)
+        
+    Returns:
+        Formatted and escaped string (e.g., "¥1\\,000\\.50")
+    """
+    if symbol is None:
+        symbol = "¥" if currency == "CNY" else currency
+    amount = from_minor(amount_minor, currency).quantize(
+        Decimal(1).scaleb(-decimal_places), rounding=ROUND_HALF_UP
+    )
+    return format_amount_markdown(amount, symbol, decimal_places)
+
+
 def format_number_markdown(number: float, decimal_places: int = 0) -> str:
     """
     Format number for MarkdownV2 with proper escaping.
@@ -0,0 +1,43 @@
+"""
+Token count estimation for LLM prompts
+"""
+import re
+
+# CJK ideographs, kana and hangul are roughly one token per character
+_CJK = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+# Per-message overhead of chat formats (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without a tokenizer.
+
+    Counts CJK characters as one token each and the remaining text as one
+    token per four characters, which slightly overestimates for English
+    with BPE tokenizers (safe for budgeting).
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    rest = len(text) - cjk
+    return cjk + (rest + 3) // 4
+
+
+def estimate_message_tokens(content: str) -> int:
+    """
+    Estimate tokens of one chat message including format overhead.
+
+    Args:
+        content: Message content
+
+    Returns:
+        Estimated token count
+    """
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS